@@ -0,0 +1,136 @@
+import math
+
+import faiss
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+
+# ---------------------------
+# Configurable FAISS index modes
+# ---------------------------
+#   flat   exact search, full float32 vectors (the FAISS.from_documents default)
+#   hnsw   graph index, full vectors + links; fast and high recall, no deletes
+#   ivfpq  inverted lists + product quantization; needs training, ~16-32x
+#          smaller than flat, recall tuned with nprobe
+#
+# All modes use L2 distance like the LangChain default, so scores stay
+# comparable with a flat store.
+
+INDEX_MODES = ("flat", "hnsw", "ivfpq")
+
+# Training set size per IVF list (FAISS warns below ~39)
+TRAIN_POINTS_PER_LIST = 64
+# PQ codebooks have 2**nbits = 256 centroids, so smaller sets cannot be trained
+MIN_IVFPQ_VECTORS = 256
+
+
+def default_nlist(n_vectors):
+    """sqrt-rule number of IVF lists, clamped to a sensible range."""
+    return int(min(65536, max(16, 4 * math.sqrt(max(n_vectors, 1)))))
+
+
+def make_index(mode, dim, n_vectors=100_000, hnsw_m=32, ef_construction=80, nlist=None, pq_m=None, nbits=8):
+    """Create an empty FAISS index for `mode`."""
+    if mode == "flat":
+        return faiss.IndexFlatL2(dim)
+    if mode == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, hnsw_m)
+        index.hnsw.efConstruction = ef_construction
+        return index
+    if mode == "ivfpq":
+        nlist = nlist or min(default_nlist(n_vectors), max(1, n_vectors // 39))
+        # 8 dims per sub-quantizer: 384-d MiniLM vectors -> 48 bytes per vector
+        pq_m = pq_m or max(1, dim // 8)
+        if dim % pq_m:
+            raise ValueError(f"pq_m={pq_m} must divide the vector dimension {dim}")
+        return faiss.IndexIVFPQ(faiss.IndexFlatL2(dim), dim, nlist, pq_m, nbits)
+    raise ValueError(f"Unknown index mode {mode!r}, expected one of {INDEX_MODES}")
+
+
+def train_size(index):
+    """Vectors to collect before training (0 when the index needs no training)."""
+    if index.is_trained:
+        return 0
+    return TRAIN_POINTS_PER_LIST * faiss.extract_index_ivf(index).nlist
+
+
+def train_index(index, vectors, seed=0):
+    """Train on a random sample of `vectors` if the index needs it."""
+    if index.is_trained:
+        return
+    vectors = np.asarray(vectors, dtype=np.float32)
+    n = min(len(vectors), train_size(index))
+    sample = vectors[np.random.default_rng(seed).choice(len(vectors), n, replace=False)]
+    index.train(sample)
+
+
+def set_search_params(index, nprobe=None, ef_search=None):
+    """Apply query-time knobs: nprobe for IVF, efSearch for HNSW."""
+    if nprobe is not None and isinstance(index, faiss.IndexIVF):
+        index.nprobe = nprobe
+    if ef_search is not None and isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = ef_search
+
+
+def search_params(index, sel=None):
+    """SearchParameters of the right subtype for `index`, carrying its current knobs."""
+    if isinstance(index, faiss.IndexIVF):
+        return faiss.SearchParametersIVF(sel=sel, nprobe=index.nprobe)
+    if isinstance(index, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(sel=sel, efSearch=index.hnsw.efSearch)
+    return faiss.SearchParameters(sel=sel)
+
+
+def index_memory_bytes(index):
+    """Approximate in-memory size of the vectors, codes and graph/list structure."""
+    if isinstance(index, faiss.IndexIVF):
+        ivf = faiss.extract_index_ivf(index)
+        size = index.ntotal * (ivf.code_size + 8) + ivf.nlist * index.d * 4  # codes + ids + centroids
+        if isinstance(ivf, faiss.IndexIVFPQ):
+            size += ivf.pq.M * ivf.pq.ksub * ivf.pq.dsub * 4  # PQ codebooks
+        return size
+    if isinstance(index, faiss.IndexHNSW):
+        return index.ntotal * index.d * 4 + index.hnsw.neighbors.size() * 4 + index.ntotal * 12
+    if isinstance(index, faiss.IndexFlatCodes):
+        return index.ntotal * index.code_size
+    return len(faiss.serialize_index(index))
+
+
+def describe_index(index):
+    """One-line summary: index type, vector count and approximate memory."""
+    return f"{type(index).__name__}: {index.ntotal:,} vectors, {index_memory_bytes(index) / 2**20:.1f} MiB"
+
+
+def empty_vectorstore(embeddings, mode="flat", **index_kwargs):
+    """Empty LangChain FAISS store backed by an index of the given mode."""
+    dim = len(embeddings.embed_query("dimension probe"))
+    return FAISS(
+        embedding_function=embeddings,
+        index=make_index(mode, dim, **index_kwargs),
+        docstore=InMemoryDocstore(),
+        index_to_docstore_id={},
+    )
+
+
+def rebuild_vectorstore(vectorstore, mode, **index_kwargs):
+    """Copy a flat store into a new store of `mode`, keeping row order and docstore ids.
+
+    Vectors are reconstructed from the source index, so nothing is re-embedded.
+    """
+    source = vectorstore.index
+    if mode == "ivfpq" and source.ntotal < MIN_IVFPQ_VECTORS:
+        print(f"Only {source.ntotal} vectors, too few to train IVF-PQ; keeping the flat index.")
+        return vectorstore
+    vectors = source.reconstruct_n(0, source.ntotal)
+
+    index = make_index(mode, source.d, n_vectors=source.ntotal, **index_kwargs)
+    train_index(index, vectors)
+    index.add(vectors)
+
+    mapping = dict(vectorstore.index_to_docstore_id)
+    return FAISS(
+        embedding_function=vectorstore.embedding_function,
+        index=index,
+        docstore=vectorstore.docstore,
+        index_to_docstore_id=mapping,
+    )
@@ -0,0 +1,234 @@
+import re
+
+import faiss
+import numpy as np
+
+from ann_index import search_params
+from mmap_docstore import MmapDocstore
+
+# ---------------------------
+# Structured attribute index for the catalog
+# ---------------------------
+# Positions are FAISS row numbers, so a filter result can be handed straight
+# to the vector index as its candidate set.
+#   brand / category        -> inverted lists: value -> sorted int64 positions
+#   sell_price / discount   -> values sorted once + the positions in that order
+
+CATEGORICAL_FIELDS = ("brand", "category")
+NUMERIC_FIELDS = ("sell_price", "discount")
+
+# Candidate sets up to this size are scored exactly with numpy instead of
+# running a FAISS search with an id selector (when the index can reconstruct
+# its vectors; IVF-PQ always goes through the selector).
+BRUTE_FORCE_LIMIT = 4096
+
+GENDER_WORDS = {"men", "women", "boys", "girls", "kids", "unisex"}
+
+# Prices may use thousands separators: "under 2,000", "rs. 1,499"
+_NUMBER = r"(?:rs\.?|inr|₹)?\s*(\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?)"
+_UPPER = r"(?:under|below|less than|cheaper than|up to|upto|within|max(?:imum)?|<)"
+_LOWER = r"(?:over|above|more than|greater than|at least|min(?:imum)?|>)"
+
+
+def to_price(text):
+    return float(text.replace(",", ""))
+
+
+def tokenize(text):
+    return re.findall(r"[a-z0-9&]+", text.lower())
+
+
+def singularize(word):
+    """Crude singular form; idempotent, so "dress" and "dresses" both give "dress"."""
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 4 and word.endswith("ie"):  # "hoodie" and "hoodies" -> "hoody"
+        return word[:-2] + "y"
+    if len(word) > 4 and word.endswith(("sses", "shes", "ches", "xes", "zes")):
+        return word[:-2]
+    if word.endswith(("ss", "us")):
+        return word
+    if word.endswith("s") and len(word) > 3:
+        return word[:-1]
+    return word
+
+
+def parse_filters(query, brands, categories):
+    """Pull brand / category / price / discount constraints out of a question.
+
+    `brands` and `categories` are the known lowercase values to match against.
+
+    "Nike dresses under 2000" -> {"brand": ["nike"], "sell_price": (None, 2000.0)}
+    """
+    q = query.lower()
+    words = set(tokenize(q))
+    singular = {singularize(w) for w in words}
+    filters = {}
+
+    matched = [b for b in brands if b and b != "n/a" and re.search(rf"(?<!\w){re.escape(b)}(?!\w)", q)]
+    if matched:
+        filters["brand"] = matched
+
+    # Categories look like "Westernwear-Women": match on the head term and
+    # narrow by gender only when the question names one. A bare gender
+    # ("kurtas for women") selects every category of that gender.
+    genders = words & GENDER_WORDS
+    matched = []
+    for category in categories:
+        terms = set(tokenize(category))
+        head = terms - GENDER_WORDS
+        if head and head <= (words | singular) and (not genders or terms & genders):
+            matched.append(category)
+    if not matched and genders:
+        matched = [c for c in categories if set(tokenize(c)) & genders]
+    if matched:
+        filters["category"] = matched
+
+    # Discounts: "40% off", "at least 30% discount", "under 20% off"
+    match = re.search(rf"(?:(?<!\w){_UPPER}\s*)?(\d+(?:\.\d+)?)\s*%", q)
+    if match:
+        value = float(match.group(1))
+        upper = re.match(_UPPER, match.group(0))
+        filters["discount"] = (None, value) if upper else (value, None)
+        q = q.replace(match.group(0), " ")
+
+    # Prices: "between 500 and 1500", "under 2000", "above rs 999"
+    match = re.search(rf"(?<!\w)between\s*{_NUMBER}\s*(?:and|-|to)\s*{_NUMBER}", q)
+    if match:
+        filters["sell_price"] = (to_price(match.group(1)), to_price(match.group(2)))
+    else:
+        high = re.search(rf"(?<!\w){_UPPER}\s*{_NUMBER}", q)
+        low = re.search(rf"(?<!\w){_LOWER}\s*{_NUMBER}", q)
+        if high or low:
+            filters["sell_price"] = (
+                to_price(low.group(1)) if low else None,
+                to_price(high.group(1)) if high else None,
+            )
+    return filters
+
+
+class AttributeIndex:
+    def __init__(self, size, categorical, numeric):
+        """`categorical`: field -> (int code per position, distinct values; -1 = missing),
+        `numeric`: field -> float64 value per position (NaN = missing)."""
+        self.size = size
+
+        self.inverted = {}
+        for field, (codes, values) in categorical.items():
+            codes = np.asarray(codes)
+            order = np.argsort(codes, kind="stable")  # positions stay ascending within a code
+            bounds = np.searchsorted(codes[order], np.arange(-1, len(values) + 1))
+            lists = {}
+            for code, start, stop in zip(range(-1, len(values)), bounds[:-1], bounds[1:]):
+                if stop > start:
+                    value = "" if code < 0 else str(values[code]).strip().lower()
+                    lists.setdefault(value, []).append(order[start:stop].astype(np.int64))
+            self.inverted[field] = {v: p[0] if len(p) == 1 else np.sort(np.concatenate(p)) for v, p in lists.items()}
+
+        self.sorted = {}
+        for field, values in numeric.items():
+            values = np.asarray(values, dtype=np.float64)
+            known = np.flatnonzero(~np.isnan(values))
+            order = known[np.argsort(values[known], kind="stable")]
+            self.sorted[field] = (values[order], order)
+
+    @classmethod
+    def from_metadatas(cls, metadatas):
+        categorical = {}
+        for field in CATEGORICAL_FIELDS:
+            values = [str(meta.get(field, "")) for meta in metadatas]
+            codes = {v: i for i, v in enumerate(dict.fromkeys(values))}
+            categorical[field] = (np.array([codes[v] for v in values], dtype=np.int64), list(codes))
+        numeric = {
+            field: np.array([meta.get(field, np.nan) for meta in metadatas], dtype=np.float64)
+            for field in NUMERIC_FIELDS
+        }
+        return cls(len(metadatas), categorical, numeric)
+
+    @classmethod
+    def from_vectorstore(cls, vectorstore):
+        """Build the index from a LangChain FAISS store, in FAISS row order.
+
+        A memory-mapped docstore already holds its rows in FAISS order and is
+        read column by column; other docstores are read Document by Document.
+        """
+        docstore = vectorstore.docstore
+        if isinstance(docstore, MmapDocstore) and len(docstore) == vectorstore.index.ntotal:
+            categorical = {field: docstore.category_column(field) for field in CATEGORICAL_FIELDS}
+            numeric = {field: docstore.numeric_column(field) for field in NUMERIC_FIELDS}
+            if all(c is not None for c in categorical.values()) and all(v is not None for v in numeric.values()):
+                return cls(len(docstore), categorical, numeric)
+        mapping = vectorstore.index_to_docstore_id
+        metadatas = [vectorstore.docstore.search(mapping[i]).metadata for i in range(vectorstore.index.ntotal)]
+        return cls.from_metadatas(metadatas)
+
+    def lookup(self, field, values):
+        """Positions whose `field` equals any of `values` (sorted)."""
+        lists = [self.inverted[field].get(v.lower()) for v in values]
+        lists = [p for p in lists if p is not None]
+        if not lists:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(lists))
+
+    def range(self, field, low=None, high=None):
+        """Positions with low <= field <= high (sorted)."""
+        values, order = self.sorted[field]
+        start = 0 if low is None else np.searchsorted(values, low, side="left")
+        stop = len(values) if high is None else np.searchsorted(values, high, side="right")
+        return np.sort(order[start:stop])
+
+    def select(self, filters):
+        """Intersect all filters; returns None when there is nothing to filter on."""
+        selected = None
+        for field in CATEGORICAL_FIELDS:
+            if filters.get(field):
+                positions = self.lookup(field, filters[field])
+                selected = positions if selected is None else np.intersect1d(selected, positions, assume_unique=True)
+        for field in NUMERIC_FIELDS:
+            if filters.get(field):
+                positions = self.range(field, *filters[field])
+                selected = positions if selected is None else np.intersect1d(selected, positions, assume_unique=True)
+        return selected
+
+
+def filtered_search_by_vector(vectorstore, attr_index, vector, k=3, filters=None):
+    """(distance, Document) pairs for an embedded query, best first; lower distance is better."""
+    candidates = attr_index.select(filters or {})
+    if candidates is not None and len(candidates) == 0:
+        return []
+
+    index = vectorstore.index
+    q = np.asarray([vector], dtype=np.float32)
+    inner_product = index.metric_type == faiss.METRIC_INNER_PRODUCT
+
+    if candidates is None:
+        distances, rows = index.search(q, k)
+        distances, rows = distances[0], rows[0]
+    else:
+        rows = None
+        if len(candidates) <= BRUTE_FORCE_LIMIT:
+            try:
+                vectors = index.reconstruct_batch(candidates)
+            except RuntimeError:
+                vectors = None  # index without reconstruct support
+            if vectors is not None:
+                if inner_product:
+                    scores = vectors @ q[0]
+                    top = np.argsort(-scores)[:k]
+                else:
+                    scores = ((vectors - q[0]) ** 2).sum(axis=1)
+                    top = np.argsort(scores)[:k]
+                distances, rows = scores[top], candidates[top]
+        if rows is None:
+            params = search_params(index, sel=faiss.IDSelectorBatch(candidates))
+            distances, rows = index.search(q, k, params=params)
+            distances, rows = distances[0], rows[0]
+
+    if inner_product:
+        distances = -distances
+    mapping = vectorstore.index_to_docstore_id
+    return [
+        (float(d), vectorstore.docstore.search(mapping[int(i)]))
+        for d, i in zip(distances, rows) if i >= 0
+    ]
+
@@ -0,0 +1,114 @@
+"""
+Recall vs latency of the ANN index modes against the flat baseline.
+
+    python bench_ann.py                          # synthetic clustered 384-d vectors
+    python bench_ann.py --vectors chunks.npy     # real embeddings (float32, n x d)
+    python bench_ann.py --n 1000000 --json ann.json
+
+For every mode and knob value it reports build time, approximate memory,
+recall@k against exact flat search, single-query latency (p50/p95) and
+batched throughput.
+"""
+import argparse
+import json
+import time
+
+import faiss
+import numpy as np
+
+from ann_index import index_memory_bytes, make_index, set_search_params, train_index
+
+
+def synthetic_vectors(n, dim, n_clusters=256, seed=0):
+    # Clustered data behaves much more like sentence embeddings than uniform noise
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n_clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, n_clusters, size=n)
+    vectors = centers[labels] + 0.35 * rng.normal(size=(n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def recall_at_k(found, truth):
+    k = truth.shape[1]
+    hits = sum(len(set(f[:k]) & set(t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+def measure(index, queries, k):
+    latencies = []
+    for q in queries[:200]:
+        start = time.perf_counter()
+        index.search(q[None, :], k)
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    _, found = index.search(queries, k)
+    batch_seconds = time.perf_counter() - start
+
+    latencies = np.array(latencies) * 1e3
+    return found, {
+        "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 3),
+        "batch_qps": round(len(queries) / batch_seconds, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", help=".npy file of float32 vectors (synthetic if omitted)")
+    parser.add_argument("--n", type=int, default=200_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[16, 32, 64, 128])
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args()
+
+    if args.vectors:
+        data = np.load(args.vectors).astype(np.float32)
+    else:
+        data = synthetic_vectors(args.n + args.queries, args.dim)
+    rng = np.random.default_rng(1)
+    order = rng.permutation(len(data))
+    queries, base = data[order[:args.queries]], data[order[args.queries:]]
+    dim = base.shape[1]
+    print(f"{len(base):,} base vectors, {len(queries):,} queries, dim={dim}, k={args.k}\n")
+
+    results = []
+    truth = None
+    for mode, knob, values in [("flat", None, [None]), ("hnsw", "ef_search", args.ef_search), ("ivfpq", "nprobe", args.nprobe)]:
+        start = time.perf_counter()
+        index = make_index(mode, dim, n_vectors=len(base))
+        train_index(index, base)
+        index.add(base)
+        build_seconds = time.perf_counter() - start
+        memory_mb = index_memory_bytes(index) / 2**20
+
+        for value in values:
+            if knob:
+                set_search_params(index, **{knob: value})
+            found, timings = measure(index, queries, args.k)
+            if truth is None:
+                truth = found  # the flat index is exact
+            results.append({
+                "mode": mode,
+                "knob": f"{knob}={value}" if knob else "-",
+                "build_s": round(build_seconds, 2),
+                "memory_mb": round(memory_mb, 1),
+                f"recall@{args.k}": round(recall_at_k(found, truth), 4),
+                **timings,
+            })
+
+    header = ["mode", "knob", "build_s", "memory_mb", f"recall@{args.k}", "p50_ms", "p95_ms", "batch_qps"]
+    print("".join(f"{h:>14}" for h in header))
+    for row in results:
+        print("".join(f"{row[h]!s:>14}" for h in header))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"n": len(base), "dim": dim, "k": args.k, "threads": faiss.omp_get_max_threads(), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
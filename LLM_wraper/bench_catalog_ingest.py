@@ -0,0 +1,173 @@
+"""
+Catalog ingestion benchmark: rows/sec and peak RSS for 1k, 10k and 50k rows.
+
+    python bench_catalog_ingest.py --csv FashionDataset.csv
+    python bench_catalog_ingest.py --fake-embeddings   # offline, no encoder cost
+
+Modes:
+  legacy          the original ecommerce.py path (whole CSV, iterrows, from_documents)
+  streamed        one IncrementalIndex fed by catalog_units
+  sharded         ShardedCatalogIndex, as ecommerce.py builds it now
+  sharded-resync  startup against an existing, unchanged sharded index (the
+                  build runs in a separate process and is not measured)
+
+Without --csv a synthetic FashionDataset-shaped CSV is generated. Every
+(size, mode) pair runs in a fresh subprocess so peak RSS is measured per run.
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench_utils import peak_rss_mb
+
+SIZES = [1_000, 10_000, 50_000]
+MODES = ["legacy", "streamed", "sharded", "sharded-resync"]
+
+
+def write_synthetic_csv(path, n_rows, seed=0):
+    import pandas as pd
+
+    rng = random.Random(seed)
+    brands = ["Nike", "Puma", "Biba", "W", "Zara", "Levis", "H&M", "Libas", "Aurelia", "Roadster"]
+    categories = ["Westernwear-Women", "Indianwear-Women", "Lingerie&Nightwear-Women", "Footwear-Men", "Jeans-Men"]
+    words = "indigo black white floral printed cotton kurta dress shirt top solid slim fit a-line maxi".split()
+
+    rows = []
+    for _ in range(n_rows):
+        mrp = rng.randrange(499, 9999)
+        discount = rng.choice([0, 10, 20, 30, 40, 50, 60, 70])
+        rows.append({
+            "BrandName": rng.choice(brands),
+            "Deatils": " ".join(rng.choices(words, k=6)),
+            "Sizes": "Size:" + ",".join(rng.sample(["XS", "S", "M", "L", "XL", "XXL"], 3)),
+            "MRP": f"Rs\n{mrp}",
+            "SellPrice": mrp * (100 - discount) // 100,
+            "Discount": f"{discount}% off",
+            "Category": rng.choice(categories),
+        })
+    pd.DataFrame(rows).to_csv(path, index=False)
+
+
+def load_embeddings(fake):
+    if fake:
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+        return DeterministicFakeEmbedding(size=384)
+
+    from langchain_huggingface import HuggingFaceEmbeddings
+    return HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+
+
+def run_legacy(csv_path, n_rows, embeddings):
+    # The original ecommerce.py path: whole CSV in memory, iterrows, one from_documents call
+    import pandas as pd
+    from langchain_community.vectorstores import FAISS
+    from langchain_core.documents import Document
+
+    df = pd.read_csv(csv_path, nrows=n_rows).fillna("N/A")
+    documents = []
+    for _, row in df.iterrows():
+        content = (
+            f"Brand: {row['BrandName']}. "
+            f"Category: {row['Category']}. "
+            f"Product: {row['Deatils']}. "
+            f"Available Sizes: {row['Sizes']}. "
+            f"MRP: {row['MRP']}. "
+            f"Selling Price: {row['SellPrice']}. "
+            f"Discount: {row['Discount']}."
+        )
+        documents.append(Document(page_content=content, metadata={"brand": row["BrandName"], "category": row["Category"]}))
+    FAISS.from_documents(documents, embeddings)
+
+
+def run_streamed(csv_path, n_rows, embeddings, chunksize, batch_size):
+    from catalog_ingest import catalog_units
+    from incremental_index import IncrementalIndex
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = IncrementalIndex(os.path.join(tmp, "catalog"), embeddings)
+        index.sync(catalog_units(csv_path, chunksize=chunksize, nrows=n_rows), batch_size=batch_size)
+
+
+def run_sharded(csv_path, n_rows, embeddings, chunksize, batch_size, index_dir):
+    from catalog_ingest import catalog_units
+    from sharded_index import ShardedCatalogIndex
+
+    index = ShardedCatalogIndex(index_dir, embeddings)
+    index.sync(catalog_units(csv_path, chunksize=chunksize, nrows=n_rows), batch_size=batch_size)
+
+
+def run_one(args):
+    embeddings = load_embeddings(args.fake_embeddings)
+    with tempfile.TemporaryDirectory() as tmp:
+        index_dir = os.path.join(tmp, "shards")
+        if args.mode == "sharded-resync":
+            # Build in another process so only the startup sync is timed and measured
+            subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--csv", args.csv, "--mode", "sharded",
+                 "--rows", str(args.rows), "--chunksize", str(args.chunksize), "--batch-size", str(args.batch_size),
+                 "--index-dir", index_dir] + (["--fake-embeddings"] if args.fake_embeddings else []),
+                capture_output=True, check=True,
+            )
+        start = time.perf_counter()
+        if args.mode == "legacy":
+            run_legacy(args.csv, args.rows, embeddings)
+        elif args.mode == "streamed":
+            run_streamed(args.csv, args.rows, embeddings, args.chunksize, args.batch_size)
+        else:
+            run_sharded(args.csv, args.rows, embeddings, args.chunksize, args.batch_size,
+                        args.index_dir or index_dir)
+        elapsed = time.perf_counter() - start
+    print(json.dumps({
+        "mode": args.mode,
+        "rows": args.rows,
+        "seconds": round(elapsed, 3),
+        "rows_per_sec": round(args.rows / elapsed, 1),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", help="FashionDataset.csv (synthetic data if omitted)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES)
+    parser.add_argument("--fake-embeddings", action="store_true", help="skip the encoder to isolate builder cost")
+    parser.add_argument("--chunksize", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--rows", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--index-dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        run_one(args)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = args.csv
+        if csv_path is None:
+            csv_path = os.path.join(tmp, "synthetic_catalog.csv")
+            write_synthetic_csv(csv_path, max(args.sizes))
+
+        print(f"{'mode':<16}{'rows':>8}{'rows/sec':>12}{'peak RSS MiB':>14}")
+        for n_rows in args.sizes:
+            for mode in args.modes:
+                cmd = [
+                    sys.executable, os.path.abspath(__file__),
+                    "--csv", csv_path, "--mode", mode, "--rows", str(n_rows),
+                    "--chunksize", str(args.chunksize), "--batch-size", str(args.batch_size),
+                ]
+                if args.fake_embeddings:
+                    cmd.append("--fake-embeddings")
+                out = subprocess.run(cmd, capture_output=True, text=True, check=True).stdout
+                result = json.loads(out.strip().splitlines()[-1])
+                print(f"{mode:<16}{n_rows:>8}{result['rows_per_sec']:>12}{result['peak_rss_mb']:>14}")
+
+
+if __name__ == "__main__":
+    main()
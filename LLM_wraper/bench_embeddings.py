@@ -0,0 +1,77 @@
+"""
+Embedding throughput: PyTorch HuggingFaceEmbeddings vs the ONNX backends.
+
+    python bench_embeddings.py
+    python bench_embeddings.py --chunks 5000 --backends torch onnx-int8 --json emb.json
+
+Embeds RAG-style chunks (500-character pieces of synthetic pages) with each
+backend and reports load time, chunks/sec for embed_documents, and
+single-query latency p50/p95/p99 for embed_query. Run
+`pytest tests/test_onnx_embeddings.py` to confirm the vectors agree before
+switching backends.
+"""
+import argparse
+import json
+import time
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from bench_rag import pdf_corpus
+from bench_utils import latency_summary, peak_rss_mb
+from onnx_embeddings import BACKENDS, default_threads, load_embeddings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="sentence-transformers/all-MiniLM-L6-v2")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=BACKENDS)
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args()
+
+    pages, questions = pdf_corpus(args.chunks // 2 + 1, args.queries)
+    splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
+    chunks = [c.page_content for c in splitter.split_documents(pages)][:args.chunks]
+    queries = [q["question"] for q in questions]
+    print(f"{len(chunks)} chunks, {len(queries)} queries, {default_threads()} physical cores available\n")
+
+    results = []
+    print(f"{'backend':<11}{'load s':>8}{'chunks/s':>10}{'query p50':>11}{'p95':>8}{'p99':>8}")
+    for backend in args.backends:
+        start = time.perf_counter()
+        embeddings = load_embeddings(args.model, backend)
+        embeddings.embed_documents(chunks[:32])  # warm up
+        load_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        embeddings.embed_documents(chunks)
+        seconds = time.perf_counter() - start
+
+        latencies = []
+        for q in queries:
+            t0 = time.perf_counter()
+            embeddings.embed_query(q)
+            latencies.append(time.perf_counter() - t0)
+        latency = latency_summary(latencies)
+
+        row = {
+            "backend": backend,
+            "load_seconds": round(load_seconds, 2),
+            "chunks_per_sec": round(len(chunks) / seconds, 1),
+            "query_latency": latency,
+        }
+        results.append(row)
+        print(
+            f"{backend:<11}{row['load_seconds']:>8}{row['chunks_per_sec']:>10}"
+            f"{latency['p50_ms']:>9.2f}ms{latency['p95_ms']:>8.2f}{latency['p99_ms']:>8.2f}"
+        )
+
+    print(f"\npeak RSS {peak_rss_mb():.0f} MiB")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
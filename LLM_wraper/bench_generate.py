@@ -0,0 +1,81 @@
+"""
+Local generation throughput: LLMWrapper.generate_batch vs one generate_text call per prompt.
+
+    python bench_generate.py                       # gpt2 on CPU, 64 prompts
+    python bench_generate.py --prompts 128 --batch-sizes 4 8 16 32 --json gen.json
+
+Greedy decoding with a fixed number of new tokens, so every mode does the same
+work. Prompts have mixed lengths; batching is run with and without length
+bucketing to show what padding costs.
+"""
+import argparse
+import json
+import random
+import time
+
+import torch
+
+from bench_utils import peak_rss_mb
+from program_1 import LLMWrapper
+
+SUBJECTS = ["a lighthouse keeper", "the city council", "a small robot", "two old friends", "the last train"]
+OPENINGS = [
+    "Once upon a time,",
+    "In the morning",
+    "Nobody expected that {s} would",
+    "The report about {s} began with a long description of the weather, the crowds and",
+    "After years of careful planning, countless meetings, several failed attempts and a great deal of luck, {s}",
+]
+
+
+def make_prompts(n, seed=0):
+    rng = random.Random(seed)
+    return [rng.choice(OPENINGS).format(s=rng.choice(SUBJECTS)) for _ in range(n)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="gpt2")
+    parser.add_argument("--prompts", type=int, default=64)
+    parser.add_argument("--new-tokens", type=int, default=32)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[4, 8, 16])
+    parser.add_argument("--threads", type=int, help="torch intra-op threads (default: torch's choice)")
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args()
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    llm = LLMWrapper(model_name=args.model, task="text-generation", device="cpu")
+    prompts = make_prompts(args.prompts)
+    gen = dict(max_new_tokens=args.new_tokens, do_sample=False)
+    llm.generate_batch(prompts[:2], batch_size=2, **gen)  # warm up
+
+    runs = [("per-prompt loop", None, None)]
+    runs += [(f"batch {b}, unsorted", b, False) for b in args.batch_sizes]
+    runs += [(f"batch {b}, bucketed", b, True) for b in args.batch_sizes]
+
+    results = []
+    baseline = None
+    print(f"{len(prompts)} prompts, {args.new_tokens} new tokens each, {torch.get_num_threads()} threads\n")
+    print(f"{'mode':<22}{'seconds':>9}{'prompts/s':>11}{'speedup':>9}")
+    for name, batch_size, bucket in runs:
+        start = time.perf_counter()
+        if batch_size is None:
+            for prompt in prompts:
+                llm.generate_text(prompt, **gen)
+        else:
+            llm.generate_batch(prompts, batch_size=batch_size, bucket=bucket, **gen)
+        seconds = time.perf_counter() - start
+        rate = len(prompts) / seconds
+        baseline = baseline or rate
+        results.append({"mode": name, "seconds": round(seconds, 2), "prompts_per_sec": round(rate, 2)})
+        print(f"{name:<22}{seconds:>9.2f}{rate:>11.2f}{rate / baseline:>8.1f}x")
+
+    print(f"\npeak RSS {peak_rss_mb():.0f} MiB")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
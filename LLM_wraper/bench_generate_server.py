@@ -0,0 +1,142 @@
+"""
+Load generator for generate_server.py: micro-batched vs one-request-at-a-time serving.
+
+    python bench_generate_server.py                          # gpt2, local servers
+    python bench_generate_server.py --concurrency 32 --requests 256 --batches 4 8 16 --json serve.json
+    python bench_generate_server.py --url http://127.0.0.1:8001 --requests 200
+
+Without --url, a server is started in-process for every configuration (first
+max_batch=1 with no wait, i.e. one request at a time, then each --batches
+value) on the same loaded model. `concurrency` clients send requests back to
+back over keep-alive connections. The report shows throughput, latency
+percentiles, 503 / 504 counts and the server's mean batch size.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from urllib.parse import urlparse
+
+from bench_generate import make_prompts
+from bench_utils import latency_summary, peak_rss_mb
+from generate_server import serve
+
+
+async def call(reader, writer, host, method, path, payload=None):
+    body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body
+    )
+    await writer.drain()
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split(" ")[1])
+    length = next(int(line.split(":", 1)[1]) for line in lines if line.lower().startswith("content-length:"))
+    return status, json.loads(await reader.readexactly(length))
+
+
+async def run_load(host, port, prompts, concurrency, new_tokens, timeout):
+    """Send every prompt once from `concurrency` clients; returns (seconds, latencies, status counts)."""
+    queue = list(prompts)
+    latencies, statuses = [], {}
+
+    async def client():
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            while queue:
+                prompt = queue.pop()
+                start = time.perf_counter()
+                status, _ = await call(reader, writer, host, "POST", "/generate",
+                                       {"prompt": prompt, "max_new_tokens": new_tokens, "timeout": timeout})
+                statuses[status] = statuses.get(status, 0) + 1
+                if status == 200:
+                    latencies.append(time.perf_counter() - start)
+        finally:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return time.perf_counter() - start, latencies, statuses
+
+
+async def health(host, port):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        return (await call(reader, writer, host, "GET", "/health"))[1]
+    finally:
+        writer.close()
+
+
+async def bench(args):
+    prompts = make_prompts(args.requests, seed=1)
+    random.Random(1).shuffle(prompts)
+
+    if args.url:
+        url = urlparse(args.url)
+        configs = [("external", url.hostname, url.port or 80, None)]
+        llm = None
+    else:
+        from program_1 import LLMWrapper
+
+        llm = LLMWrapper(model_name=args.model, task="text-generation", quantize=args.quantize, device="cpu")
+        llm.generate_batch(prompts[:2], batch_size=2, max_new_tokens=2, do_sample=False)  # warm up
+        configs = [("one at a time", "127.0.0.1", args.port, (1, 0))]
+        configs += [
+            (f"batch {b}, wait {args.max_wait_ms:g} ms", "127.0.0.1", args.port + 1 + i, (b, args.max_wait_ms))
+            for i, b in enumerate(args.batches)
+        ]
+
+    results, baseline = [], None
+    print(f"{len(prompts)} requests, {args.concurrency} concurrent clients, {args.new_tokens} new tokens\n")
+    print(f"{'server':<22}{'req/s':>8}{'speedup':>9}{'p50':>9}{'p95':>8}{'p99':>8}{'batch':>7}{'503':>6}{'504':>6}")
+    for name, host, port, batching in configs:
+        server = None
+        if batching is not None:
+            ready = asyncio.Event()
+            server = asyncio.create_task(serve(llm, host, port, max_batch=batching[0], max_wait_ms=batching[1],
+                                               max_queue=args.max_queue, ready=ready))
+            await ready.wait()
+
+        seconds, latencies, statuses = await run_load(host, port, prompts, args.concurrency, args.new_tokens,
+                                                      args.timeout)
+        stats = await health(host, port)
+        if server is not None:
+            server.cancel()
+            await asyncio.gather(server, return_exceptions=True)
+
+        rate = statuses.get(200, 0) / seconds
+        baseline = baseline or rate
+        latency = latency_summary(latencies)
+        results.append({"server": name, "seconds": round(seconds, 2), "requests_per_sec": round(rate, 2),
+                         "latency": latency, "statuses": statuses, "server_stats": stats})
+        print(f"{name:<22}{rate:>8.2f}{rate / baseline:>8.1f}x{latency.get('p50_ms', 0):>7.0f}ms"
+              f"{latency.get('p95_ms', 0):>8.0f}{latency.get('p99_ms', 0):>8.0f}"
+              f"{stats.get('mean_batch_size') or 0:>7.1f}{statuses.get(503, 0):>6}{statuses.get(504, 0):>6}")
+
+    print(f"\npeak RSS {peak_rss_mb():.0f} MiB")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="benchmark a running server instead of starting local ones")
+    parser.add_argument("--model", default="gpt2")
+    parser.add_argument("--quantize", default="fp32")
+    parser.add_argument("--requests", type=int, default=128)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--new-tokens", type=int, default=16)
+    parser.add_argument("--batches", type=int, nargs="+", default=[4, 8, 16])
+    parser.add_argument("--max-wait-ms", type=float, default=10)
+    parser.add_argument("--max-queue", type=int, default=256)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--port", type=int, default=8101, help="first port for the local servers")
+    parser.add_argument("--json", help="also write results to this file")
+    asyncio.run(bench(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
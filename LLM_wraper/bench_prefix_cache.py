@@ -0,0 +1,100 @@
+"""
+Per-request generation latency with and without the prompt-prefix KV cache.
+
+    python bench_prefix_cache.py                         # gpt2 on CPU
+    python bench_prefix_cache.py --prefix-tokens 0 128 512 960 --requests 20 --json prefix.json
+
+Every request is <shared prefix> + a short question, decoded greedily for a
+few tokens, so the prompt (prefill) dominates. For each prefix length the
+same requests run on a wrapper whose PrefixCache stays empty and on one whose
+prefix was cached with cache_prefix(). Both take the same model.generate path
+(a wrapper without any cache goes through the pipeline instead, which would
+add its overhead to the comparison) and share the loaded model through the
+registry.
+"""
+import argparse
+import json
+import time
+
+import torch
+
+from bench_utils import latency_summary, peak_rss_mb
+from prefix_cache import PrefixCache
+from program_1 import LLMWrapper
+
+INSTRUCTIONS = "You are a helpful assistant for an online store. Answer briefly and politely.\n"
+EXAMPLE = "Q: Do you ship to {city}?\nA: Yes, delivery to {city} takes three to five working days.\n"
+CITIES = ["Pune", "Delhi", "Chennai", "Kolkata", "Jaipur", "Mumbai", "Indore", "Surat"]
+QUESTIONS = ["Q: Can I return a kurta?\nA:", "Q: Is cash on delivery available?\nA:", "Q: Do you sell shoes?\nA:"]
+
+
+def make_prefix(tokenizer, n_tokens):
+    """Instructions plus as many few-shot examples as fit in about `n_tokens` tokens."""
+    if n_tokens <= 0:
+        return ""
+    prefix, i = INSTRUCTIONS, 0
+    while True:
+        more = prefix + EXAMPLE.format(city=CITIES[i % len(CITIES)])
+        if len(tokenizer(more)["input_ids"]) > n_tokens:
+            return prefix
+        prefix, i = more, i + 1
+
+
+def time_requests(llm, prompts, new_tokens):
+    seconds = []
+    for prompt in prompts:
+        start = time.perf_counter()
+        llm.generate_text(prompt, max_new_tokens=new_tokens, do_sample=False)
+        seconds.append(time.perf_counter() - start)
+    return seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="gpt2")
+    parser.add_argument("--prefix-tokens", type=int, nargs="+", default=[0, 64, 256, 512, 896])
+    parser.add_argument("--requests", type=int, default=12)
+    parser.add_argument("--new-tokens", type=int, default=8)
+    parser.add_argument("--cache-mb", type=float, default=256)
+    parser.add_argument("--threads", type=int, help="torch intra-op threads (default: torch's choice)")
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args()
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    # Empty cache: every lookup misses, so only the cached prefix differs
+    plain = LLMWrapper(model_name=args.model, task="text-generation", device="cpu",
+                       prefix_cache=PrefixCache(max_mb=args.cache_mb))
+    cached = LLMWrapper(model_name=args.model, task="text-generation", device="cpu",
+                        prefix_cache=PrefixCache(max_mb=args.cache_mb))
+    tokenizer = plain.pipe.tokenizer
+    plain.generate_text(QUESTIONS[0], max_new_tokens=2, do_sample=False)  # warm up
+
+    results = []
+    print(f"{args.requests} requests per row, {args.new_tokens} new tokens, {torch.get_num_threads()} threads\n")
+    print(f"{'prefix tok':>10}{'no cache p50':>14}{'cached p50':>12}{'speedup':>9}{'cache MiB':>11}")
+    for n_tokens in args.prefix_tokens:
+        prefix = make_prefix(tokenizer, n_tokens)
+        prompts = [prefix + QUESTIONS[i % len(QUESTIONS)] for i in range(args.requests)]
+        prefix_len = len(tokenizer(prefix)["input_ids"]) if prefix else 0
+
+        cached.prefix_cache.clear()
+        if prefix:
+            cached.cache_prefix(prefix)
+        off = latency_summary(time_requests(plain, prompts, args.new_tokens))
+        on = latency_summary(time_requests(cached, prompts, args.new_tokens))
+        speedup = off["p50_ms"] / on["p50_ms"]
+        memory = cached.prefix_cache.stats()["memory_mib"]
+        results.append({"prefix_tokens": prefix_len, "no_cache": off, "cached": on,
+                        "speedup_p50": round(speedup, 2), "cache_mib": memory})
+        print(f"{prefix_len:>10}{off['p50_ms']:>12.1f}ms{on['p50_ms']:>10.1f}ms{speedup:>8.1f}x{memory:>11.1f}")
+
+    print(f"\ncache: {cached.prefix_cache.stats()}")
+    print(f"peak RSS {peak_rss_mb():.0f} MiB")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+Quantized CPU inference vs fp32: quality check plus latency / throughput / RSS.
+
+    python bench_quantization.py                        # fp32 vs int8, both models
+    python bench_quantization.py --modes fp32 int8 bf16 --json quant.json
+
+Each mode runs in a fresh process, so load time and RSS are its own.
+  classifier  distilbert-base-uncased-finetuned-sst-2-english on a fixed
+              labelled set: accuracy and agreement with fp32, per-sentence
+              latency, sentences/sec in batches
+  generator   gpt2: perplexity of a fixed reference text, greedy continuations
+              of fixed prompts (token agreement with fp32), per-prompt
+              latency, new tokens/sec
+Exits non-zero when a mode misses the quality thresholds, so it can gate
+switching LLMWrapper(quantize=...) or SENTIMENT_QUANTIZE.
+"""
+import argparse
+import json
+import multiprocessing
+import sys
+import time
+
+from quantization import QUANTIZE_MODES
+
+SENTENCES = [
+    ("This restaurant is awesome", "POSITIVE"),
+    ("The food was cold and the waiter was rude.", "NEGATIVE"),
+    ("I would happily come back here every week.", "POSITIVE"),
+    ("Worst purchase I have made this year.", "NEGATIVE"),
+    ("The kurta fits perfectly and the fabric feels great.", "POSITIVE"),
+    ("Delivery took three weeks and the box was damaged.", "NEGATIVE"),
+    ("Customer support solved my problem in minutes.", "POSITIVE"),
+    ("The shoes fell apart after two days.", "NEGATIVE"),
+    ("A charming little film with a wonderful cast.", "POSITIVE"),
+    ("The plot is dull and the acting is even worse.", "NEGATIVE"),
+    ("Great value for the price, highly recommended.", "POSITIVE"),
+    ("I want a refund, this is not what was advertised.", "NEGATIVE"),
+    ("The hotel staff went out of their way to help us.", "POSITIVE"),
+    ("Noisy room, dirty bathroom and a broken heater.", "NEGATIVE"),
+    ("Battery life is excellent and charging is fast.", "POSITIVE"),
+    ("The app crashes every time I open it.", "NEGATIVE"),
+]
+PROMPTS = [
+    "Once upon a time in a futuristic city,",
+    "The best way to learn a new language is",
+    "Our online store offers a wide range of",
+    "In the morning, the old lighthouse keeper",
+]
+REFERENCE_TEXT = (
+    "The city council met on Tuesday to discuss the new budget. After a long debate, the members agreed "
+    "to spend more on public transport and less on road construction. The mayor said the decision would "
+    "reduce traffic and improve air quality over the next few years."
+)
+
+CLASSIFIER = "distilbert-base-uncased-finetuned-sst-2-english"
+# Largest acceptable drop vs fp32
+MAX_AGREEMENT_DROP = {"int8": 0.07, "bf16": 0.07}  # classifier label agreement
+MAX_PPL_RATIO = {"int8": 1.10, "bf16": 1.05}  # generator perplexity
+
+
+def run_classifier(mode, repeats, batch_size):
+    import torch
+
+    from bench_utils import latency_summary, peak_rss_mb
+    from model_registry import ModelRegistry
+
+    start = time.perf_counter()
+    pipe = ModelRegistry().get("text-classification", CLASSIFIER, quantize=mode, device="cpu")
+    texts = [text for text, _ in SENTENCES]
+    pipe(texts[:2])  # warm up
+    load_seconds = time.perf_counter() - start
+
+    predictions = [out["label"] for out in pipe(texts)]
+    latencies = []
+    for _ in range(repeats):
+        for text in texts:
+            t0 = time.perf_counter()
+            pipe(text)
+            latencies.append(time.perf_counter() - t0)
+    batch = texts * repeats
+    t0 = time.perf_counter()
+    pipe(batch, batch_size=batch_size)
+    throughput = len(batch) / (time.perf_counter() - t0)
+    return {
+        "load_seconds": round(load_seconds, 2),
+        "predictions": predictions,
+        "latency": latency_summary(latencies),
+        "per_sec": round(throughput, 1),
+        "peak_rss_mib": round(peak_rss_mb()),
+        "threads": torch.get_num_threads(),
+    }
+
+
+def run_generator(mode, model_name, new_tokens):
+    import torch
+
+    from bench_utils import latency_summary, peak_rss_mb
+    from model_registry import ModelRegistry
+    from program_1 import LLMWrapper
+
+    start = time.perf_counter()
+    llm = LLMWrapper(model_name=model_name, registry=ModelRegistry(), quantize=mode, device="cpu")
+    llm.generate_text(PROMPTS[0], max_new_tokens=2, do_sample=False)  # warm up
+    load_seconds = time.perf_counter() - start
+    tokenizer, model = llm.pipe.tokenizer, llm.pipe.model
+
+    ids = tokenizer(REFERENCE_TEXT, return_tensors="pt")["input_ids"]
+    with torch.inference_mode():
+        loss = model(input_ids=ids, labels=ids).loss.float()
+    perplexity = float(torch.exp(loss))
+
+    continuations, latencies = [], []
+    for prompt in PROMPTS:
+        inputs = tokenizer(prompt, return_tensors="pt")
+        t0 = time.perf_counter()
+        with torch.inference_mode():
+            output = model.generate(**inputs, max_new_tokens=new_tokens, min_new_tokens=new_tokens,
+                                    do_sample=False, pad_token_id=tokenizer.eos_token_id)
+        latencies.append(time.perf_counter() - t0)
+        continuations.append(output[0, inputs["input_ids"].shape[1]:].tolist())
+    return {
+        "load_seconds": round(load_seconds, 2),
+        "perplexity": round(perplexity, 3),
+        "continuations": continuations,
+        "latency": latency_summary(latencies),
+        "per_sec": round(new_tokens * len(PROMPTS) / sum(latencies), 1),
+        "peak_rss_mib": round(peak_rss_mb()),
+        "threads": torch.get_num_threads(),
+    }
+
+
+def in_child(fn, *args):
+    """Run fn(*args) in a fresh process and return its result."""
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        return pool.apply(fn, args)
+
+
+def token_agreement(a, b):
+    """Fraction of positions where two greedy continuations pick the same token."""
+    pairs = [(x, y) for seq_a, seq_b in zip(a, b) for x, y in zip(seq_a, seq_b)]
+    return sum(x == y for x, y in pairs) / max(1, len(pairs))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", choices=QUANTIZE_MODES, default=["fp32", "int8"])
+    parser.add_argument("--models", nargs="+", choices=["classifier", "generator"],
+                        default=["classifier", "generator"])
+    parser.add_argument("--generator", default="gpt2")
+    parser.add_argument("--new-tokens", type=int, default=32)
+    parser.add_argument("--repeats", type=int, default=5, help="classifier latency passes over the set")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args()
+    modes = ["fp32"] + [m for m in args.modes if m != "fp32"]  # fp32 is the reference
+
+    results, failed = {}, False
+    if "classifier" in args.models:
+        labels = [label for _, label in SENTENCES]
+        rows = {mode: in_child(run_classifier, mode, args.repeats, args.batch_size) for mode in modes}
+        reference = rows["fp32"]["predictions"]
+        print(f"classifier: {CLASSIFIER}, {len(SENTENCES)} labelled sentences\n")
+        print(f"{'mode':<6}{'accuracy':>9}{'agree':>7}{'p50':>9}{'p95':>8}{'sent/s':>8}{'RSS MiB':>9}{'load s':>8}")
+        for mode, row in rows.items():
+            row["accuracy"] = round(sum(p == l for p, l in zip(row["predictions"], labels)) / len(labels), 3)
+            row["agreement"] = round(sum(p == r for p, r in zip(row["predictions"], reference)) / len(labels), 3)
+            row["ok"] = mode == "fp32" or 1 - row["agreement"] <= MAX_AGREEMENT_DROP[mode]
+            failed |= not row["ok"]
+            print(f"{mode:<6}{row['accuracy']:>9}{row['agreement']:>7}{row['latency']['p50_ms']:>7.1f}ms"
+                  f"{row['latency']['p95_ms']:>8.1f}{row['per_sec']:>8}{row['peak_rss_mib']:>9}"
+                  f"{row['load_seconds']:>8}{'' if row['ok'] else '  FAIL'}")
+        results["classifier"] = rows
+
+    if "generator" in args.models:
+        rows = {mode: in_child(run_generator, mode, args.generator, args.new_tokens) for mode in modes}
+        reference = rows["fp32"]
+        print(f"\ngenerator: {args.generator}, {len(PROMPTS)} prompts x {args.new_tokens} greedy tokens\n")
+        print(f"{'mode':<6}{'ppl':>8}{'ratio':>7}{'agree':>7}{'p50':>10}{'tok/s':>8}{'RSS MiB':>9}{'load s':>8}")
+        for mode, row in rows.items():
+            row["ppl_ratio"] = round(row["perplexity"] / reference["perplexity"], 3)
+            row["token_agreement"] = round(token_agreement(row["continuations"], reference["continuations"]), 3)
+            row["ok"] = mode == "fp32" or row["ppl_ratio"] <= MAX_PPL_RATIO[mode]
+            failed |= not row["ok"]
+            print(f"{mode:<6}{row['perplexity']:>8}{row['ppl_ratio']:>7}{row['token_agreement']:>7}"
+                  f"{row['latency']['p50_ms']:>8.0f}ms{row['per_sec']:>8}{row['peak_rss_mib']:>9}"
+                  f"{row['load_seconds']:>8}{'' if row['ok'] else '  FAIL'}")
+        results["generator"] = rows
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+    if failed:
+        print("\nquality check FAILED")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
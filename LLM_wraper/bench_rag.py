@@ -0,0 +1,399 @@
+"""
+Retrieval quality and latency benchmark for the RAG pipelines, fully offline.
+
+    python bench_rag.py                                   # synthetic PDF-like pages, MiniLM
+    python bench_rag.py --embeddings hashing              # no model download at all
+    python bench_rag.py --corpus catalog --k 1 3 10       # ecommerce.py-style product rows
+    python bench_rag.py --chunk-tokens 96 --json run.json
+    python bench_rag.py --splitter chars --chunk-size 300   # the old character splitter
+    python bench_rag.py --json new.json --compare run.json
+
+A synthetic corpus is generated with a known answer location for every
+question. It is ingested (split, embedded, indexed) the way rag.py /
+ecommerce.py do it (PDF pages go through rag.py's default token splitter,
+sized in the embedding model's tokens; with --embeddings hashing it counts
+regex tokens so nothing is downloaded), and every question is answered with a stubbed LLM. The
+report contains recall@k, MRR, and the share of answers that survive context
+assembly. It also gives p50/p95/p99 latency for ingestion batches, query
+embedding, search, context assembly and the stubbed generation step.
+
+PDF corpus: a retrieved chunk counts as relevant when it contains the whole
+answer text, so answers cut in half by a chunk boundary count as misses.
+
+Catalog corpus: every question is written from one product's attributes (a
+few of its detail words in another order, brand, section, a price ceiling),
+never from its text, and only that product row (by metadata["page"]) counts
+as relevant; its answer survives assembly when the row was passed to
+assemble_context and its "Product: ..." field is in the context. Rows are
+synced into a ShardedCatalogIndex and searched with the attribute filters
+parsed from the question, the way ecommerce.py retrieves.
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import tempfile
+import time
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from ann_index import describe_index, empty_vectorstore, rebuild_vectorstore, set_search_params
+from bench_utils import latency_summary, peak_rss_mb
+from context_builder import assemble_context
+from hybrid_search import BM25Index, reciprocal_rank_fusion
+from sharded_index import ShardedCatalogIndex
+from token_splitter import TokenTextSplitter
+
+FILLER = (
+    "system report data value process model table section figure result method "
+    "review policy update network service access record summary budget quarter "
+    "analysis customer design storage cluster release support version region team"
+).split()
+ENTITIES = "Aldebaran Borealis Cygnus Draco Eridanus Fornax Grus Hydra Indus Lyra Mensa Norma Orion Pavo".split()
+FACTS = [
+    # (statement, question) templates; {v} is the answer value
+    ("The access code for project {e} is {v}.", "What is the access code of project {e}?"),
+    ("Project {e} was assigned the budget reference {v}.", "Which budget reference does project {e} use?"),
+    ("Maintenance of the {e} cluster is handled under ticket {v}.", "Under which ticket is the {e} cluster maintained?"),
+    ("The {e} release ships with firmware build {v}.", "What firmware build comes with the {e} release?"),
+]
+CATALOG_QUESTIONS = [
+    # {words}: some of the product's detail words, shuffled; {section}: "westernwear for women"
+    "{words} from {brand} under {price}",
+    "do you have any {brand} {words} in {section}?",
+    "{section}: {words} by {brand}, below Rs. {price}",
+    "looking for {words} in {section} under {price}",
+]
+
+_HASH_TOKEN = re.compile(r"\w+")
+
+
+class HashingEmbeddings(Embeddings):
+    """Signed feature hashing of words and word bigrams: a lexical stand-in for an encoder."""
+
+    def __init__(self, size=384):
+        self.size = size
+
+    def _embed(self, text):
+        vector = np.zeros(self.size, dtype=np.float32)
+        words = _HASH_TOKEN.findall(text.lower())
+        for feature in words + [a + " " + b for a, b in zip(words, words[1:])]:
+            h = int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "little")
+            vector[h % self.size] += 1.0 if h >> 63 else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts):
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+def load_embeddings(kind, model):
+    if kind == "hashing":
+        return HashingEmbeddings()
+    from langchain_huggingface import HuggingFaceEmbeddings
+    return HuggingFaceEmbeddings(model_name=model)
+
+
+# ---------------------------
+# Synthetic corpora
+# ---------------------------
+def pdf_corpus(n_pages, n_questions, words_per_page=350, seed=0):
+    """Pages of filler text with one planted fact per question; returns (documents, questions)."""
+    rng = random.Random(seed)
+    pages = [[" ".join(rng.choices(FILLER, k=rng.randint(8, 16))).capitalize() + "."
+              for _ in range(words_per_page // 12)] for _ in range(n_pages)]
+
+    questions = []
+    for n in range(n_questions):
+        statement, question = rng.choice(FACTS)
+        entity = f"{rng.choice(ENTITIES)}-{n}"
+        value = f"{rng.choice('ABCDEFGHJKLMNPQRSTUVWXYZ')}{rng.choice('ABCDEFGHJKLMNPQRSTUVWXYZ')}-{rng.randint(1000, 9999)}"
+        fact = statement.format(e=entity, v=value)
+        page = rng.randrange(n_pages)
+        pages[page].insert(rng.randrange(len(pages[page]) + 1), fact)
+        questions.append({"question": question.format(e=entity), "answer": fact, "page": page})
+
+    documents = [
+        Document(page_content=" ".join(sentences), metadata={"source": "synthetic.pdf", "page": i})
+        for i, sentences in enumerate(pages)
+    ]
+    return documents, questions
+
+
+def catalog_corpus(n_rows, n_questions, seed=0):
+    """Product documents in ecommerce.py's format (row number in metadata["page"]) and
+    questions paraphrased from one product's attributes; returns (documents, questions)."""
+    import pandas as pd
+    from bench_catalog_ingest import write_synthetic_csv
+    from catalog_ingest import build_catalog_frame
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "catalog.csv")
+        write_synthetic_csv(path, n_rows, seed=seed)
+        frame = build_catalog_frame(pd.read_csv(path))
+
+    metadata_columns = [c for c in frame.columns if c != "text"]
+    documents = [
+        Document(page_content=text, metadata=dict(zip(metadata_columns, values), page=row))
+        for row, (text, *values) in enumerate(frame[["text"] + metadata_columns].itertuples(index=False))
+    ]
+
+    rng = random.Random(seed + 1)
+    questions = []
+    for row in rng.sample(range(len(documents)), min(n_questions, len(documents))):
+        meta = documents[row].metadata
+        details = re.search(r"Product: (.+?)\.", documents[row].page_content).group(1)
+        words = list(dict.fromkeys(details.split()))
+        section, _, gender = meta["category"].partition("-")
+        question = rng.choice(CATALOG_QUESTIONS).format(
+            words=" ".join(rng.sample(words, min(3, len(words)))),
+            brand=meta["brand"],
+            section=f"{section.lower()} for {gender.lower()}" if gender else section.lower(),
+            price=f"{500 * math.ceil((meta['sell_price'] + 1) / 500):,}",
+        )
+        questions.append({"question": question, "answer": f"Product: {details}.", "row": row})
+    return documents, questions
+
+
+# ---------------------------
+# Pipeline stages
+# ---------------------------
+def ingest(documents, embeddings, splitter, index_mode, batch_size):
+    """Split, embed and add in batches of source documents, timing each batch."""
+    vectorstore = empty_vectorstore(embeddings, "flat")
+    batch_seconds = []
+    n_chunks = 0
+    start = time.perf_counter()
+    for i in range(0, len(documents), batch_size):
+        t0 = time.perf_counter()
+        chunks = splitter.split_documents(documents[i:i + batch_size]) if splitter else documents[i:i + batch_size]
+        texts = [c.page_content for c in chunks]
+        vectorstore.add_embeddings(
+            list(zip(texts, embeddings.embed_documents(texts))),
+            metadatas=[c.metadata for c in chunks],
+        )
+        batch_seconds.append(time.perf_counter() - t0)
+        n_chunks += len(chunks)
+    build_seconds = time.perf_counter() - start
+
+    rebuild_seconds = 0.0
+    if index_mode != "flat":
+        t0 = time.perf_counter()
+        vectorstore = rebuild_vectorstore(vectorstore, index_mode)
+        rebuild_seconds = time.perf_counter() - t0
+
+    stats = {
+        "documents": len(documents),
+        "chunks": n_chunks,
+        "seconds": round(build_seconds + rebuild_seconds, 3),
+        "chunks_per_sec": round(n_chunks / build_seconds, 1) if build_seconds else None,
+        "rebuild_seconds": round(rebuild_seconds, 3),
+        "batch_latency": latency_summary(batch_seconds),
+        "index": describe_index(vectorstore.index),
+    }
+    return vectorstore, stats
+
+
+def ingest_sharded(documents, embeddings, root, index_mode, batch_size, nprobe, ef_search):
+    """Sync product rows into a ShardedCatalogIndex as ecommerce.py does, then open every shard."""
+    index = ShardedCatalogIndex(root, embeddings, index_mode=index_mode, nprobe=nprobe, ef_search=ef_search)
+    t0 = time.perf_counter()
+    index.sync(((f"row-{doc.metadata['page']}", doc) for doc in documents), batch_size=batch_size)
+    build_seconds = time.perf_counter() - t0
+    # Opened up front so the first questions do not pay for it in the search timings
+    t0 = time.perf_counter()
+    for key in index.shards:
+        index.shard(key)
+    open_seconds = time.perf_counter() - t0
+
+    stats = {
+        "documents": len(documents),
+        "chunks": len(documents),
+        "seconds": round(build_seconds, 3),
+        "chunks_per_sec": round(len(documents) / build_seconds, 1) if build_seconds else None,
+        "open_seconds": round(open_seconds, 3),
+        "index": f"{len(index.shards)} {index.shard_by} shards ({index_mode})",
+    }
+    return index, stats
+
+
+def dense_search(vectorstore, retrieval, fetch_k):
+    """search(question, vector, k) over one FAISS store, optionally fused with BM25."""
+    bm25 = BM25Index.from_vectorstore(vectorstore) if retrieval == "hybrid" else None
+    mapping = vectorstore.index_to_docstore_id
+
+    def search(question, vector, k):
+        _, rows = vectorstore.index.search(vector[None], max(k, fetch_k) if bm25 is not None else k)
+        rows = rows[0][rows[0] >= 0]
+        if bm25 is not None:
+            rows = reciprocal_rank_fusion([rows, bm25.search(question, fetch_k)])
+        return [vectorstore.docstore.search(mapping[int(r)]) for r in rows[:k]]
+
+    return search
+
+
+def sharded_search(index):
+    """search(question, vector, k) through ShardedCatalogIndex with the question's filters."""
+
+    def search(question, vector, k):
+        return index.search_by_vector(vector, k, index.parse_filters(question))
+
+    return search
+
+
+def is_relevant(q, doc):
+    """Catalog: the document is the asked-about row; pdf: the chunk holds the whole answer."""
+    if "row" in q:
+        return doc.metadata.get("page") == q["row"]
+    return q["answer"] in doc.page_content
+
+
+def run_queries(search, embeddings, questions, ks, context_k, context_tokens):
+    llm = FakeListChatModel(responses=["stub answer"])
+    chain = ChatPromptTemplate.from_template("Context:\n{context}\n\nQuestion:\n{question}") | llm
+    depth = max(max(ks), context_k)
+
+    timings = {"query_embedding": [], "search": [], "context_assembly": [], "llm_stub": [], "end_to_end": []}
+    ranks = []  # 1-based rank of the first relevant chunk, or None
+    context_hits = 0
+    for q in questions:
+        t0 = time.perf_counter()
+        vector = np.asarray(embeddings.embed_query(q["question"]), dtype=np.float32)
+        t1 = time.perf_counter()
+        docs = search(q["question"], vector, depth)
+        t2 = time.perf_counter()
+        context, _ = assemble_context(docs[:context_k], max_tokens=context_tokens)
+        t3 = time.perf_counter()
+        chain.invoke({"context": context, "question": q["question"]})
+        t4 = time.perf_counter()
+
+        timings["query_embedding"].append(t1 - t0)
+        timings["search"].append(t2 - t1)
+        timings["context_assembly"].append(t3 - t2)
+        timings["llm_stub"].append(t4 - t3)
+        timings["end_to_end"].append(t4 - t0)
+
+        rank = next((n for n, doc in enumerate(docs[:max(ks)], 1) if is_relevant(q, doc)), None)
+        ranks.append(rank)
+        # Catalog rows are rewritten by assembly, so the row must also have been passed in
+        context_hits += q["answer"] in context and ("row" not in q or rank is not None and rank <= context_k)
+
+    quality = {f"recall@{k}": round(sum(r is not None and r <= k for r in ranks) / len(ranks), 4) for k in ks}
+    quality[f"mrr@{max(ks)}"] = round(sum(1 / r for r in ranks if r) / len(ranks), 4)
+    quality["answer_in_context"] = round(context_hits / len(ranks), 4)
+    return quality, {name: latency_summary(values) for name, values in timings.items()}
+
+
+def compare(current, baseline_path):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    print(f"\nvs {baseline_path}:")
+    for key, value in current["quality"].items():
+        old = baseline.get("quality", {}).get(key)
+        if old is not None:
+            print(f"  {key:<18}{old:>10.4f} -> {value:<10.4f}({value - old:+.4f})")
+    for stage, summary in current["latency"].items():
+        old = baseline.get("latency", {}).get(stage, {}).get("p95_ms")
+        if old:
+            new = summary["p95_ms"]
+            print(f"  {stage + ' p95':<18}{old:>8.2f}ms -> {new:.2f}ms ({100 * (new - old) / old:+.0f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", choices=["pdf", "catalog"], default="pdf")
+    parser.add_argument("--docs", type=int, default=300, help="pages (pdf) or product rows (catalog)")
+    parser.add_argument("--questions", type=int, default=200)
+    parser.add_argument("--embeddings", choices=["hf", "hashing"], default="hf")
+    parser.add_argument("--model", default="sentence-transformers/all-MiniLM-L6-v2")
+    parser.add_argument("--splitter", choices=["tokens", "chars"], default="tokens",
+                        help="pdf corpus only (catalog rows are not split); rag.py defaults to tokens")
+    parser.add_argument("--chunk-tokens", type=int, default=128)
+    parser.add_argument("--chunk-overlap-tokens", type=int, default=16)
+    parser.add_argument("--chunk-size", type=int, default=500, help="characters, --splitter chars")
+    parser.add_argument("--chunk-overlap", type=int, default=50)
+    parser.add_argument("--index-mode", choices=["flat", "hnsw", "ivfpq"], default="flat")
+    parser.add_argument("--nprobe", type=int, default=16)
+    parser.add_argument("--ef-search", type=int, default=64)
+    parser.add_argument("--retrieval", choices=["dense", "hybrid"], default="dense",
+                        help="pdf corpus only (catalog questions use ecommerce.py's filtered sharded search)")
+    parser.add_argument("--fetch-k", type=int, default=20, help="candidates per search before fusion (hybrid)")
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 3, 5, 10])
+    parser.add_argument("--context-k", type=int, default=3, help="chunks passed to context assembly (rag.py uses 3)")
+    parser.add_argument("--context-tokens", type=int, default=800)
+    parser.add_argument("--batch-size", type=int, default=16, help="source documents per ingestion batch (catalog: rows per shard embedding batch)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--compare", metavar="BASELINE_JSON", help="print deltas against an earlier --json run")
+    args = parser.parse_args()
+    args.k = sorted(set(args.k))
+    if args.corpus == "catalog" and args.retrieval == "hybrid":
+        parser.error("--retrieval hybrid applies to the pdf corpus only")
+
+    if args.corpus == "pdf":
+        documents, questions = pdf_corpus(args.docs, args.questions, seed=args.seed)
+        if args.splitter == "tokens":
+            splitter = TokenTextSplitter(
+                chunk_tokens=args.chunk_tokens,
+                overlap_tokens=args.chunk_overlap_tokens,
+                tokenizer_name=args.model if args.embeddings == "hf" else None,
+            )
+        else:
+            splitter = RecursiveCharacterTextSplitter(chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap)
+    else:
+        documents, questions = catalog_corpus(args.docs, args.questions, seed=args.seed)
+        splitter = None
+    print(f"{args.corpus} corpus: {len(documents)} documents, {len(questions)} questions")
+
+    embeddings = load_embeddings(args.embeddings, args.model)
+    with tempfile.TemporaryDirectory() as shard_root:
+        if args.corpus == "pdf":
+            vectorstore, ingest_stats = ingest(documents, embeddings, splitter, args.index_mode, args.batch_size)
+            set_search_params(vectorstore.index, nprobe=args.nprobe, ef_search=args.ef_search)
+            search = dense_search(vectorstore, args.retrieval, args.fetch_k)
+        else:
+            index, ingest_stats = ingest_sharded(documents, embeddings, shard_root, args.index_mode,
+                                                 args.batch_size, args.nprobe, args.ef_search)
+            search = sharded_search(index)
+        print(f"ingested {ingest_stats['chunks']} chunks in {ingest_stats['seconds']}s ({ingest_stats['index']})")
+
+        quality, latency = run_queries(search, embeddings, questions, args.k, args.context_k, args.context_tokens)
+    if "batch_latency" in ingest_stats:
+        latency["ingest_batch"] = ingest_stats.pop("batch_latency")
+
+    results = {
+        "config": {k: v for k, v in vars(args).items() if k not in ("json", "compare")},
+        "ingest": ingest_stats,
+        "quality": quality,
+        "latency": latency,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+    print()
+    for key, value in quality.items():
+        print(f"{key:<18}{value:.4f}")
+    print(f"\n{'stage':<18}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for stage, summary in latency.items():
+        print(f"{stage:<18}{summary['p50_ms']:>10.2f}{summary['p95_ms']:>10.2f}{summary['p99_ms']:>10.2f}")
+
+    if args.compare:
+        compare(results, args.compare)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, default=str)
+        print(f"\nwrote {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Chunking benchmark: RecursiveCharacterTextSplitter vs the token-aware splitter.
+
+    python bench_splitter.py                         # synthetic pages
+    python bench_splitter.py --pdf sample.pdf --repeat 20
+    python bench_splitter.py --tokenizer none        # word/punctuation tokens, no download
+
+For each splitter it reports chunks/sec and pages/sec, and how chunk sizes
+land against the token target. Sizes are measured with the embedding model's
+tokenizer: mean, p5/p95, and the share of chunks within 10% of the target and
+over the target (text the encoder would truncate if the target is its limit).
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from token_splitter import TokenTextSplitter, token_offsets
+
+
+def load_pages(pdf_path, n_pages, repeat):
+    if pdf_path:
+        from langchain_community.document_loaders import PyPDFLoader
+        pages = PyPDFLoader(pdf_path).load()
+    else:
+        from bench_rag import pdf_corpus
+        pages, _ = pdf_corpus(n_pages, n_questions=n_pages)
+    return [Document(page_content=p.page_content, metadata=dict(p.metadata)) for p in pages * repeat]
+
+
+def size_report(chunks, target, tokenizer_name):
+    sizes = np.array([len(token_offsets(c.page_content, tokenizer_name)) for c in chunks])
+    return {
+        "mean_tokens": round(float(sizes.mean()), 1),
+        "p5_tokens": int(np.percentile(sizes, 5)),
+        "p95_tokens": int(np.percentile(sizes, 95)),
+        "within_10pct": round(float(np.mean(np.abs(sizes - target) <= 0.1 * target)), 3),
+        "over_target": round(float(np.mean(sizes > target)), 3),
+        "mean_abs_error": round(float(np.mean(np.abs(sizes - target))), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", help="PDF to split (synthetic pages if omitted)")
+    parser.add_argument("--pages", type=int, default=500, help="synthetic pages")
+    parser.add_argument("--repeat", type=int, default=1, help="split the page list this many times over")
+    parser.add_argument("--tokenizer", default="sentence-transformers/all-MiniLM-L6-v2", help='"none" for regex tokens')
+    parser.add_argument("--chunk-tokens", type=int, default=128)
+    parser.add_argument("--overlap-tokens", type=int, default=16)
+    parser.add_argument("--chunk-size", type=int, default=500, help="RecursiveCharacterTextSplitter characters")
+    parser.add_argument("--chunk-overlap", type=int, default=50)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args()
+    tokenizer = None if args.tokenizer == "none" else args.tokenizer
+
+    pages = load_pages(args.pdf, args.pages, args.repeat)
+    print(f"{len(pages)} pages, {sum(len(p.page_content) for p in pages):,} characters, target {args.chunk_tokens} tokens\n")
+
+    splitters = {
+        f"recursive_chars({args.chunk_size})": RecursiveCharacterTextSplitter(
+            chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap
+        ),
+    }
+    for workers in args.workers:
+        splitters[f"tokens({args.chunk_tokens}) x{workers}"] = TokenTextSplitter(
+            chunk_tokens=args.chunk_tokens,
+            overlap_tokens=args.overlap_tokens,
+            tokenizer_name=tokenizer,
+            workers=workers,
+            min_parallel_chars=0,
+        )
+    if tokenizer:
+        token_offsets("warm up", tokenizer)  # tokenizer load is not part of the timing
+
+    results = []
+    print(f"{'splitter':<26}{'chunks':>8}{'chunks/s':>11}{'pages/s':>10}{'mean tok':>10}{'p5-p95':>11}{'±10%':>7}{'over':>7}")
+    for name, splitter in splitters.items():
+        start = time.perf_counter()
+        chunks = splitter.split_documents(pages)
+        seconds = time.perf_counter() - start
+        row = {
+            "splitter": name,
+            "chunks": len(chunks),
+            "seconds": round(seconds, 3),
+            "chunks_per_sec": round(len(chunks) / seconds, 1),
+            "pages_per_sec": round(len(pages) / seconds, 1),
+            **size_report(chunks, args.chunk_tokens, tokenizer),
+        }
+        results.append(row)
+        print(
+            f"{name:<26}{row['chunks']:>8}{row['chunks_per_sec']:>11}{row['pages_per_sec']:>10}"
+            f"{row['mean_tokens']:>10}{row['p5_tokens']:>6}-{row['p95_tokens']:<4}"
+            f"{row['within_10pct']:>7}{row['over_target']:>7}"
+        )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
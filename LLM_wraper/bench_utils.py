@@ -0,0 +1,34 @@
+import sys
+
+# ---------------------------
+# Small helpers shared by the bench_*.py scripts
+# ---------------------------
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MiB."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        import psutil
+        return psutil.Process().memory_info().peak_wset / 2**20
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux but bytes on macOS
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def latency_summary(seconds):
+    """p50/p95/p99/mean in milliseconds for a list of durations in seconds."""
+    import numpy as np
+
+    ms = np.asarray(seconds, dtype=np.float64) * 1e3
+    if not len(ms):
+        return {}
+    return {
+        "n": int(len(ms)),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "mean_ms": round(float(ms.mean()), 3),
+    }
@@ -0,0 +1,67 @@
+import pandas as pd
+from langchain_core.documents import Document
+
+from incremental_index import stable_unit_ids
+
+# ---------------------------
+# FashionDataset catalog -> Documents
+# ---------------------------
+# The CSV is read in chunks and every chunk is turned into page_content and
+# metadata column-wise with pandas string ops, instead of formatting one
+# row at a time with iterrows().
+
+CATALOG_COLUMNS = ["BrandName", "Deatils", "Sizes", "MRP", "SellPrice", "Discount", "Category"]
+
+# Source column -> numeric metadata key ("Rs\n1699" / "Rs. 1,699" -> 1699.0, "40% off" -> 40.0)
+NUMERIC_COLUMNS = {"MRP": "mrp", "SellPrice": "sell_price", "Discount": "discount"}
+
+
+def read_catalog(csv_path, chunksize=5000, nrows=None):
+    """Iterate over the catalog CSV in DataFrame chunks."""
+    return pd.read_csv(csv_path, usecols=CATALOG_COLUMNS, chunksize=chunksize, nrows=nrows)
+
+
+def to_number(values):
+    """Parse price / discount strings into floats (NaN when there is no number)."""
+    # Drop the currency prefix first, or the "." of "Rs." ends up in front of the digits
+    text = values.astype(str).str.replace(r"(?i)^\s*(?:rs\.?|inr|₹)", "", regex=True)
+    text = text.str.replace(",", "", regex=False)  # thousands separators
+    return pd.to_numeric(text.str.extract(r"(\d+(?:\.\d+)?)", expand=False), errors="coerce")
+
+
+def build_catalog_frame(df):
+    """Return a frame with a `text` column plus metadata columns for each row."""
+    df = df.fillna("N/A")
+    col = {c: df[c].astype(str) for c in CATALOG_COLUMNS}
+
+    out = pd.DataFrame(index=df.index)
+    out["text"] = (
+        "Brand: " + col["BrandName"] + ". "
+        + "Category: " + col["Category"] + ". "
+        + "Product: " + col["Deatils"] + ". "
+        + "Available Sizes: " + col["Sizes"] + ". "
+        + "MRP: " + col["MRP"] + ". "
+        + "Selling Price: " + col["SellPrice"] + ". "
+        + "Discount: " + col["Discount"] + "."
+    )
+    out["brand"] = col["BrandName"]
+    out["category"] = col["Category"]
+    for source, key in NUMERIC_COLUMNS.items():
+        out[key] = to_number(col[source])
+    return out
+
+
+def catalog_units(csv_path, chunksize=5000, nrows=None):
+    """Yield (unit_id, Document) for every catalog row, one CSV chunk at a time.
+
+    A row is identified by brand + details + category, so a price edit shows
+    up as a modified row instead of a delete and an add.
+    """
+    seen = {}
+    for df in read_catalog(csv_path, chunksize=chunksize, nrows=nrows):
+        df = df.fillna("N/A")
+        frame = build_catalog_frame(df)
+        unit_ids = stable_unit_ids(zip(df["BrandName"], df["Deatils"], df["Category"]), seen=seen)
+        metadatas = frame.drop(columns="text").to_dict("records")
+        for unit_id, text, metadata in zip(unit_ids, frame["text"], metadatas):
+            yield unit_id, Document(page_content=text, metadata=metadata)
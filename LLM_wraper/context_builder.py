@@ -0,0 +1,150 @@
+import re
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+# ---------------------------
+# Context assembly before prompting
+# ---------------------------
+# Retrieved chunks (most relevant first) are turned into a compact context:
+#   1. chunks of the same page whose text overlaps (chunk_overlap) are merged
+#   2. near-duplicate sentences are dropped (token-set Jaccard)
+#   3. "Label: value." fields shared by every item (e.g. the same Category on
+#      all retrieved products) are written once in a header
+#   4. sentences are packed block by block into a token budget
+
+MIN_OVERLAP_CHARS = 20
+# Sentences shorter than this are fields like "MRP: 999." and never deduped
+MIN_DEDUPE_TOKENS = 5
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_FIELD = re.compile(r"^([A-Z][\w ]{0,30}):\s*(.+?)\.?$", re.S)
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+
+
+def approx_tokens(text):
+    """Rough LLM token count: words and punctuation marks."""
+    return len(_TOKEN.findall(text))
+
+
+@dataclass
+class ContextStats:
+    tokens_in: int
+    tokens_out: int
+
+    @property
+    def saved(self):
+        return self.tokens_in - self.tokens_out
+
+    def __str__(self):
+        pct = 100 * self.saved / self.tokens_in if self.tokens_in else 0
+        return f"context {self.tokens_in} -> {self.tokens_out} tokens ({self.saved} saved, {pct:.0f}%)"
+
+
+def _overlap(a, b):
+    """Length of the longest suffix of `a` that is also a prefix of `b`."""
+    for n in range(min(len(a), len(b)), MIN_OVERLAP_CHARS - 1, -1):
+        if a.endswith(b[:n]):
+            return n
+    return 0
+
+
+def merge_overlapping(docs):
+    """Merge chunks of the same source page that overlap or contain each other."""
+    blocks = []  # [key, text], in order of first (best) appearance
+    for doc in docs:
+        key = (doc.metadata.get("source"), doc.metadata.get("page"))
+        text = doc.page_content
+        for block in blocks:
+            if block[0] != key or key == (None, None):
+                continue
+            if text in block[1]:
+                break
+            if block[1] in text:
+                block[1] = text
+                break
+            n = _overlap(block[1], text)
+            if n:
+                block[1] += text[n:]
+                break
+            n = _overlap(text, block[1])
+            if n:
+                block[1] = text + block[1][n:]
+                break
+        else:
+            blocks.append([key, text])
+    return [text for _, text in blocks]
+
+
+def _token_set(sentence):
+    return set(re.findall(r"\w+", sentence.lower()))
+
+
+def assemble_context(docs, max_tokens=800, count_tokens=approx_tokens, dedupe_threshold=0.8):
+    """Build a deduplicated context within `max_tokens`; returns (text, ContextStats)."""
+    tokens_in = count_tokens("\n\n".join(doc.page_content for doc in docs))
+
+    blocks = [[s.strip() for s in _SENTENCE_END.split(text) if s.strip()] for text in merge_overlapping(docs)]
+
+    # Near-duplicate sentences: keep the first (most relevant) occurrence
+    kept = []
+    deduped = []
+    for sentences in blocks:
+        out = []
+        for sentence in sentences:
+            tokens = _token_set(sentence)
+            if len(tokens) >= MIN_DEDUPE_TOKENS and any(
+                len(tokens & other) / len(tokens | other) >= dedupe_threshold for other in kept
+            ):
+                continue
+            if len(tokens) >= MIN_DEDUPE_TOKENS:
+                kept.append(tokens)
+            out.append(sentence)
+        deduped.append(out)
+    blocks = [b for b in deduped if b]
+
+    # Fields with the same value in every block go into one header line
+    header = []
+    if len(blocks) > 1:
+        fields = [dict(m.groups() for m in map(_FIELD.match, b) if m) for b in blocks]
+        common = {k: v for k, v in fields[0].items() if all(f.get(k) == v for f in fields[1:])}
+        if common:
+            header = ["All items - " + " ".join(f"{k}: {v}." for k, v in common.items())]
+            shared = {f"{k}: {v}" for k, v in common.items()}
+            blocks = [
+                [s for s in b if not ((m := _FIELD.match(s)) and f"{m.group(1)}: {m.group(2)}" in shared)]
+                for b in blocks
+            ]
+
+    # Pack into the budget in relevance order
+    parts = []
+    used = 0
+    for sentences in ([header] if header else []) + blocks:
+        taken = []
+        for sentence in sentences:
+            cost = count_tokens(sentence) + 1
+            if used + cost > max_tokens:
+                break
+            taken.append(sentence)
+            used += cost
+        if taken:
+            parts.append(" ".join(taken))
+
+    context = "\n\n".join(parts)
+    return context, ContextStats(tokens_in, count_tokens(context))
+
+
+class ContextAssemblingRetriever(BaseRetriever):
+    """Wraps a retriever and returns its hits as one assembled context Document."""
+
+    base: Any
+    max_tokens: int = 800
+    last_stats: Optional[Any] = None
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun):
+        docs = self.base.invoke(query)
+        context, self.last_stats = assemble_context(docs, max_tokens=self.max_tokens)
+        return [Document(page_content=context, metadata={"tokens_saved": self.last_stats.saved})]
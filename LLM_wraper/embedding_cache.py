@@ -0,0 +1,180 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+try:
+    import fcntl
+except ImportError:  # Windows: only in-process locking
+    fcntl = None
+
+# ---------------------------
+# Shared on-disk embedding cache
+# ---------------------------
+# One directory per embedding model, shared by rag.py and ecommerce.py:
+#   vectors.f32   capacity x dim float32 matrix (memory-mapped)
+#   keys.bin      capacity x 16-byte text hashes, row i belongs to vectors[i]
+#   ticks.i64     last-use clock per row, for LRU eviction
+#   header.i64    [rows in use, clock]
+#   meta.json     dim / capacity / model
+# The hash -> row dict is rebuilt from keys.bin on open, and every hit is
+# checked against keys.bin, so a row recycled by another process is just a miss.
+
+DEFAULT_CACHE_DIR = os.getenv(
+    "EMBEDDING_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "llm_rag", "embeddings")
+)
+DEFAULT_CAPACITY = 100_000
+
+KEY_BYTES = 16
+
+
+def text_key(kind, text):
+    """16-byte hash of a text; `kind` keeps query and document vectors apart."""
+    return hashlib.blake2b(f"{kind}:{text}".encode(), digest_size=KEY_BYTES).digest()
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that serves repeated texts from a memory-mapped cache."""
+
+    def __init__(self, embeddings, namespace, cache_dir=DEFAULT_CACHE_DIR, capacity=DEFAULT_CAPACITY):
+        self.embeddings = embeddings
+        self.path = os.path.join(cache_dir, re.sub(r"[^\w.-]+", "_", namespace))
+        self.namespace = namespace
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._rows = None  # opened lazily once the dimension is known
+
+        if os.path.exists(os.path.join(self.path, "meta.json")):
+            with open(os.path.join(self.path, "meta.json"), encoding="utf-8") as f:
+                meta = json.load(f)
+            self._open(meta["dim"], meta["capacity"], create=False)
+
+    # ---- storage ----
+
+    def _open(self, dim, capacity, create):
+        mode = "w+" if create else "r+"
+        self.dim, self.capacity = dim, capacity
+        self.vectors = np.memmap(os.path.join(self.path, "vectors.f32"), np.float32, mode, shape=(capacity, dim))
+        self.keys = np.memmap(os.path.join(self.path, "keys.bin"), np.uint8, mode, shape=(capacity, KEY_BYTES))
+        self.ticks = np.memmap(os.path.join(self.path, "ticks.i64"), np.int64, mode, shape=(capacity,))
+        self.header = np.memmap(os.path.join(self.path, "header.i64"), np.int64, mode, shape=(2,))
+        if create:
+            with open(os.path.join(self.path, "meta.json"), "w", encoding="utf-8") as f:
+                json.dump({"dim": dim, "capacity": capacity, "model": self.namespace}, f)
+
+        used = int(self.header[0])
+        self._rows = {self.keys[i].tobytes(): i for i in range(used)}
+
+    def _create(self, dim):
+        os.makedirs(self.path, exist_ok=True)
+        with self._file_lock():
+            meta_path = os.path.join(self.path, "meta.json")
+            if os.path.exists(meta_path):  # another process created it meanwhile
+                with open(meta_path, encoding="utf-8") as f:
+                    meta = json.load(f)
+                self._open(meta["dim"], meta["capacity"], create=False)
+            else:
+                self._open(dim, self.capacity, create=True)
+
+    @contextmanager
+    def _file_lock(self):
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.path, ".lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _lookup(self, key):
+        if self._rows is None:
+            return None
+        row = self._rows.get(key)
+        if row is not None and self.keys[row].tobytes() == key:
+            return row
+        return None
+
+    def _store(self, keys, vectors):
+        """Write new vectors, evicting the least recently used rows when full.
+
+        A batch larger than the whole cache keeps its last `capacity` vectors.
+        """
+        keys, vectors = keys[-self.capacity:], vectors[-self.capacity:]
+        with self._file_lock():
+            used, clock = int(self.header[0]), int(self.header[1])
+            free = min(len(keys), self.capacity - used)
+            rows = list(range(used, used + free))
+            if len(keys) > free:
+                # Recycle the least recently used rows
+                n_evict = len(keys) - free
+                rows += np.argpartition(self.ticks[:used], n_evict - 1)[:n_evict].tolist()
+            for row, key, vector in zip(rows, keys, vectors):
+                self._rows.pop(self.keys[row].tobytes(), None)
+                self.vectors[row] = vector
+                self.keys[row] = np.frombuffer(key, dtype=np.uint8)
+                self.ticks[row] = clock
+                self._rows[key] = row
+            self.header[0] = used + free
+            self.header[1] = clock + 1
+            for array in (self.vectors, self.keys, self.ticks, self.header):
+                array.flush()
+
+    # ---- Embeddings interface ----
+
+    def _embed(self, kind, texts, encode):
+        keys = [text_key(kind, t) for t in texts]
+        with self._lock:
+            # Copy hits out first: storing the misses may recycle old rows.
+            out = [None] * len(texts)
+            missing = {}
+            clock = int(self.header[1]) if self._rows is not None else 0
+            for i, (key, text) in enumerate(zip(keys, texts)):
+                row = self._lookup(key)
+                if row is None:
+                    missing.setdefault(key, text)
+                else:
+                    self.ticks[row] = clock
+                    out[i] = self.vectors[row].tolist()
+            self.hits += len(texts) - sum(v is None for v in out)
+            self.misses += len(missing)
+
+        if missing:
+            # Encode without the lock, so other threads keep hitting the cache meanwhile
+            encoded = np.asarray(encode(list(missing.values())), dtype=np.float32)
+            new_vectors = dict(zip(missing, encoded))
+            with self._lock:
+                if self._rows is None:
+                    self._create(encoded.shape[1])
+                # Another thread may have stored some of these while we encoded
+                fresh = [key for key in missing if self._lookup(key) is None]
+                if fresh:
+                    self._store(fresh, np.stack([new_vectors[key] for key in fresh]))
+            for i, key in enumerate(keys):
+                if out[i] is None:
+                    out[i] = new_vectors[key].tolist()
+        return out
+
+    def embed_documents(self, texts):
+        return self._embed("doc", texts, self.embeddings.embed_documents)
+
+    def embed_query(self, text):
+        return self._embed("query", [text], lambda t: [self.embeddings.embed_query(t[0])])[0]
+
+    def embed_queries(self, texts):
+        """Batched embed_query: one encoder call for all uncached questions."""
+        # The wrapped model's batch path; for sentence-transformers models
+        # embed_query is the same encoder call with a single text.
+        return self._embed("query", texts, self.embeddings.embed_documents)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / total if total else 0.0}
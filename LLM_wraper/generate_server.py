@@ -0,0 +1,230 @@
+import argparse
+import asyncio
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from rag_server import HttpError, parse_json_object, serve_connection
+
+# ---------------------------
+# Micro-batching generation server
+# ---------------------------
+# One model forward pass over many short prompts costs little more than over
+# one, so concurrent requests are queued and run together:
+#   POST /generate  {"prompt", "max_new_tokens"?, "timeout"?} -> {"text", "batch_size", "queue_ms", "latency_s"}
+#   GET  /health                                              -> queue and batch metrics
+#
+# The batcher takes the first waiting request, then collects more for up to
+# `max_wait_ms` or until it has `max_batch`, and runs them through
+# LLMWrapper.generate_batch on a single worker thread (the model already uses
+# every core). Requests that arrive while a batch is running form the next one,
+# so under load batches fill up without waiting at all. Requests with different
+# max_new_tokens are run as separate groups of the same batch.
+#
+# Backpressure: at most `max_queue` requests wait; beyond that the server
+# answers 503 at once. A request that is not answered within its timeout gets
+# 504 and is dropped from its batch if that has not started yet.
+# max_batch=1 / max_wait_ms=0 gives one-request-at-a-time serving, for
+# comparison (see bench_generate_server.py).
+
+
+class QueueFull(Exception):
+    pass
+
+
+class MicroBatcher:
+    def __init__(self, llm, max_batch=8, max_wait_ms=10, max_queue=256, default_new_tokens=32):
+        self.llm = llm
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.max_queue = max_queue
+        self.default_new_tokens = default_new_tokens
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="generate")
+        self.queue = None
+        self._task = None
+
+        self.served = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.errors = 0
+        self.batches = 0
+        self.batch_sizes = Counter()
+        self.max_depth = 0
+        self.queue_wait = 0.0
+
+    def start(self):
+        self.queue = asyncio.Queue(maxsize=self.max_queue)
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        self.executor.shutdown(wait=False)
+
+    async def submit(self, prompt, max_new_tokens=None, timeout=None):
+        """Queue one prompt and wait for its text; raises QueueFull or asyncio.TimeoutError."""
+        future = asyncio.get_running_loop().create_future()
+        item = (prompt, max_new_tokens or self.default_new_tokens, future, time.perf_counter())
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise QueueFull()
+        self.max_depth = max(self.max_depth, self.queue.qsize())
+        try:
+            # shield: a timeout must not cancel a future the batch will still resolve
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            future.cancel()
+            raise
+
+    async def _collect(self):
+        batch = [await self.queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self.queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [item for item in await self._collect() if not item[2].done()]  # drop timed-out requests
+            if not batch:
+                continue
+            self.batches += 1
+            self.batch_sizes[len(batch)] += 1
+            started = time.perf_counter()
+            self.queue_wait += sum(started - item[3] for item in batch)
+
+            groups = {}
+            for item in batch:
+                groups.setdefault(item[1], []).append(item)
+            for new_tokens, items in groups.items():
+                prompts = [item[0] for item in items]
+                try:
+                    texts = await loop.run_in_executor(
+                        self.executor,
+                        lambda: self.llm.generate_batch(
+                            prompts, batch_size=len(prompts), max_new_tokens=new_tokens, do_sample=False
+                        ),
+                    )
+                except Exception as e:
+                    self.errors += len(items)
+                    for item in items:
+                        if not item[2].done():
+                            item[2].set_exception(e)
+                    continue
+                for item, text in zip(items, texts):
+                    if not item[2].done():
+                        item[2].set_result({"text": text[0], "batch_size": len(batch),
+                                            "queue_ms": round((started - item[3]) * 1e3, 1)})
+                        self.served += 1
+
+    def stats(self):
+        batched = sum(size * n for size, n in self.batch_sizes.items())
+        return {
+            "queue_depth": self.queue.qsize() if self.queue else 0,
+            "max_queue_depth": self.max_depth,
+            "max_queue": self.max_queue,
+            "served": self.served,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "errors": self.errors,
+            "batches": self.batches,
+            "mean_batch_size": round(batched / self.batches, 2) if self.batches else None,
+            "batch_sizes": dict(sorted(self.batch_sizes.items())),
+            "mean_queue_ms": round(self.queue_wait / batched * 1e3, 1) if batched else None,
+        }
+
+
+class GenerateServer:
+    def __init__(self, batcher, default_timeout=30.0):
+        self.batcher = batcher
+        self.default_timeout = default_timeout
+
+    async def generate(self, payload):
+        prompt = payload.get("prompt")
+        if not isinstance(prompt, str) or not prompt:
+            raise HttpError(400, '"prompt" must be a non-empty string')
+        new_tokens = payload.get("max_new_tokens")
+        if new_tokens is not None and (not isinstance(new_tokens, int) or new_tokens < 1):
+            raise HttpError(400, '"max_new_tokens" must be a positive integer')
+        timeout = payload.get("timeout", self.default_timeout)
+        if not isinstance(timeout, (int, float)) or timeout <= 0:
+            raise HttpError(400, '"timeout" must be a positive number of seconds')
+
+        start = time.perf_counter()
+        try:
+            result = await self.batcher.submit(prompt, new_tokens, timeout)
+        except QueueFull:
+            raise HttpError(503, "server busy, retry later")
+        except asyncio.TimeoutError:
+            raise HttpError(504, f"no result within {timeout}s")
+        return dict(result, latency_s=round(time.perf_counter() - start, 3))
+
+    async def dispatch(self, method, path, body):
+        routes = {"/generate": "POST", "/health": "GET"}
+        if path not in routes:
+            raise HttpError(404, f"no route {path}")
+        if method != routes[path]:
+            raise HttpError(405, f"{path} expects {routes[path]}")
+        if path == "/health":
+            return dict(self.batcher.stats(), status="ok")
+        return await self.generate(parse_json_object(body))
+
+    async def handle(self, reader, writer):
+        await serve_connection(reader, writer, self.dispatch)
+
+
+async def serve(llm, host="127.0.0.1", port=8001, max_batch=8, max_wait_ms=10, max_queue=256,
+                default_timeout=30.0, ready=None):
+    batcher = MicroBatcher(llm, max_batch=max_batch, max_wait_ms=max_wait_ms, max_queue=max_queue)
+    batcher.start()
+    server = GenerateServer(batcher, default_timeout=default_timeout)
+    listener = await asyncio.start_server(server.handle, host, port)
+    print(f"Generate server on http://{host}:{port} (batch {max_batch}, wait {max_wait_ms} ms, queue {max_queue})")
+    if ready is not None:
+        ready.set()
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        await batcher.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-batching text generation server")
+    parser.add_argument("--model", default="gpt2")
+    parser.add_argument("--quantize", default="fp32")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--max-batch", type=int, default=8)
+    parser.add_argument("--max-wait-ms", type=float, default=10)
+    parser.add_argument("--max-queue", type=int, default=256)
+    parser.add_argument("--timeout", type=float, default=30.0, help="default per-request timeout in seconds")
+    args = parser.parse_args()
+
+    from model_registry import default_registry
+    from program_1 import LLMWrapper
+
+    default_registry.preload_from_env()
+    llm = LLMWrapper(model_name=args.model, task="text-generation", quantize=args.quantize, device="cpu")
+    asyncio.run(serve(llm, args.host, args.port, args.max_batch, args.max_wait_ms, args.max_queue, args.timeout))
+
+
+if __name__ == "__main__":
+    main()
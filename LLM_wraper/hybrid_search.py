@@ -0,0 +1,182 @@
+import hashlib
+import os
+import re
+import tempfile
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.retrievers import BaseRetriever
+
+# ---------------------------
+# BM25 + vector hybrid retrieval
+# ---------------------------
+# The BM25 index is built from the same chunks as the FAISS store, with doc
+# ids equal to FAISS row numbers, and kept in CSR form:
+#   indptr[t] : indptr[t + 1]   slice of postings for term t
+#   doc_ids / tfs               int32 doc ids and uint16 term frequencies
+# Only the term -> id vocabulary is a Python dict.
+#
+# Dense and BM25 searches run concurrently on a thread pool (FAISS, the
+# encoder and numpy all release the GIL) and are merged with reciprocal rank
+# fusion, so hybrid latency is close to the slower of the two. The pool is
+# shared by every HybridRetriever in the process: /reload builds a new
+# retriever each time and must not leave another pool of threads behind.
+_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix="hybrid")
+
+# Identifiers like "ISO-9001", "v2.3.1" or "AB_1234" are kept whole and also
+# indexed by their parts.
+_TOKEN = re.compile(r"[a-z0-9]+(?:[-_./][a-z0-9]+)*")
+_PART = re.compile(r"[a-z0-9]+")
+
+
+def bm25_tokenize(text):
+    tokens = []
+    for token in _TOKEN.findall(text.lower()):
+        tokens.append(token)
+        parts = _PART.findall(token)
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+
+class BM25Index:
+    def __init__(self, vocab, indptr, doc_ids, tfs, doc_len, k1=1.5, b=0.75):
+        self.vocab = vocab
+        self.indptr = indptr
+        self.doc_ids = doc_ids
+        self.tfs = tfs
+        self.doc_len = doc_len
+        self.k1 = k1
+        self.b = b
+
+        n_docs = len(doc_len)
+        df = np.diff(indptr).astype(np.float32)
+        self.idf = np.log1p((n_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+        avgdl = float(doc_len.mean()) if n_docs else 1.0
+        # Per-document part of the BM25 denominator, computed once
+        self.doc_norm = (k1 * (1 - b + b * doc_len / avgdl)).astype(np.float32)
+
+    @classmethod
+    def build(cls, texts, **kwargs):
+        vocab = {}
+        term_ids, doc_ids, tfs = [], [], []
+        doc_len = np.zeros(len(texts), dtype=np.int32)
+        for doc, text in enumerate(texts):
+            counts = Counter(bm25_tokenize(text))
+            doc_len[doc] = sum(counts.values())
+            for term, tf in counts.items():
+                term_ids.append(vocab.setdefault(term, len(vocab)))
+                doc_ids.append(doc)
+                tfs.append(min(tf, 65535))
+
+        term_ids = np.asarray(term_ids, dtype=np.int32)
+        order = np.argsort(term_ids, kind="stable")
+        indptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term_ids, minlength=len(vocab)), out=indptr[1:])
+        return cls(
+            vocab,
+            indptr,
+            np.asarray(doc_ids, dtype=np.int32)[order],
+            np.asarray(tfs, dtype=np.uint16)[order],
+            doc_len,
+            **kwargs,
+        )
+
+    @classmethod
+    def from_vectorstore(cls, vectorstore, **kwargs):
+        """Index the store's chunks in FAISS row order."""
+        mapping = vectorstore.index_to_docstore_id
+        texts = [vectorstore.docstore.search(mapping[i]).page_content for i in range(vectorstore.index.ntotal)]
+        return cls.build(texts, **kwargs)
+
+    def save(self, path):
+        terms = np.array(sorted(self.vocab, key=self.vocab.get), dtype=object)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".npz")
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, terms=terms.astype(str), indptr=self.indptr, doc_ids=self.doc_ids, tfs=self.tfs, doc_len=self.doc_len)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        data = np.load(path)
+        vocab = {term: i for i, term in enumerate(data["terms"].tolist())}
+        return cls(vocab, data["indptr"], data["doc_ids"], data["tfs"], data["doc_len"], **kwargs)
+
+    @classmethod
+    def load_or_build(cls, path, vectorstore, **kwargs):
+        if os.path.exists(path):
+            return cls.load(path, **kwargs)
+        index = cls.from_vectorstore(vectorstore, **kwargs)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        index.save(path)
+        return index
+
+    def search(self, query, k=20):
+        """Row numbers of the top-k BM25 matches, best first."""
+        scores = np.zeros(len(self.doc_len), dtype=np.float32)
+        for term in set(bm25_tokenize(query)):
+            t = self.vocab.get(term)
+            if t is None:
+                continue
+            start, stop = self.indptr[t], self.indptr[t + 1]
+            docs = self.doc_ids[start:stop]
+            tf = self.tfs[start:stop].astype(np.float32)
+            scores[docs] += self.idf[t] * tf * (self.k1 + 1) / (tf + self.doc_norm[docs])
+
+        matched = np.flatnonzero(scores)
+        if len(matched) > k:
+            matched = matched[np.argpartition(-scores[matched], k)[:k]]
+        return matched[np.argsort(-scores[matched], kind="stable")]
+
+
+def row_order_key(vectorstore):
+    """Hash of the docstore ids in FAISS row order.
+
+    BM25 results are row numbers, so a saved BM25Index is only valid for a
+    store with exactly this row order; an incremental index can reach the same
+    content version with its rows in a different order.
+    """
+    mapping = vectorstore.index_to_docstore_id
+    h = hashlib.sha256()
+    for row in range(vectorstore.index.ntotal):
+        h.update(mapping[row].encode("utf-8") + b"\0")
+    return h.hexdigest()[:16]
+
+
+def dense_search(vectorstore, query, k=20):
+    """Row numbers of the top-k vector matches, best first."""
+    q = np.asarray([vectorstore.embeddings.embed_query(query)], dtype=np.float32)
+    _, rows = vectorstore.index.search(q, k)
+    return rows[0][rows[0] >= 0]
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+    """Fuse ranked lists of row numbers: score = sum of 1 / (k + rank)."""
+    scores = {}
+    for ranking in rankings:
+        for rank, row in enumerate(ranking, 1):
+            scores[int(row)] = scores.get(int(row), 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+class HybridRetriever(BaseRetriever):
+    """Dense + BM25 retrieval run in parallel and merged with reciprocal rank fusion."""
+
+    vectorstore: Any
+    bm25: Any
+    k: int = 3
+    fetch_k: int = 20
+    rrf_k: int = 60
+    executor: Any = None  # defaults to the module-wide pool
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun):
+        executor = self.executor or _EXECUTOR
+        dense = executor.submit(dense_search, self.vectorstore, query, self.fetch_k)
+        sparse = executor.submit(self.bm25.search, query, self.fetch_k)
+        rows = reciprocal_rank_fusion([dense.result(), sparse.result()], k=self.rrf_k)[: self.k]
+
+        mapping = self.vectorstore.index_to_docstore_id
+        return [self.vectorstore.docstore.search(mapping[row]) for row in rows]
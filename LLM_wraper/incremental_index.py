@@ -0,0 +1,183 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+from ann_index import empty_vectorstore
+from index_cache import DOCSTORE_DIR, load_index
+from mmap_docstore import write_vectorstore_docstore
+
+# ---------------------------
+# Incremental FAISS ingestion
+# ---------------------------
+# A "unit" is the smallest piece of source we can re-read on its own: a PDF
+# page or a catalog row. The manifest remembers the content hash of every unit
+# and the docstore ids of the chunks it produced, so a sync only embeds units
+# that are new or whose hash changed, and deletes the vectors of units that
+# disappeared.
+
+MANIFEST_FILE = "manifest.json"
+
+
+def unit_hash(doc):
+    """Hash a unit's text and metadata."""
+    h = hashlib.sha256(doc.page_content.encode())
+    h.update(json.dumps(doc.metadata, sort_keys=True, default=str).encode())
+    return h.hexdigest()
+
+
+def stable_unit_ids(keys, seen=None):
+    """Turn identity keys into short unique ids, numbering repeats ("id", "id#1", ...).
+
+    Pass the same `seen` dict across calls to keep numbering consistent when
+    the keys arrive in several chunks.
+    """
+    seen = {} if seen is None else seen
+    ids = []
+    for key in keys:
+        key = hashlib.sha1(str(key).encode()).hexdigest()[:16]
+        n = seen.get(key, 0)
+        seen[key] = n + 1
+        ids.append(key if n == 0 else f"{key}#{n}")
+    return ids
+
+
+class IncrementalIndex:
+    def __init__(self, path, embeddings, chunk_fn=None):
+        self.path = path
+        self.embeddings = embeddings
+        self.chunk_fn = chunk_fn or (lambda docs: docs)
+        self._vectorstore = None
+
+        # Only the manifest is read here; the FAISS index and docstore are
+        # opened the first time a sync has something to change (or on access)
+        if os.path.exists(os.path.join(path, MANIFEST_FILE)):
+            with open(os.path.join(path, MANIFEST_FILE), encoding="utf-8") as f:
+                self.manifest = json.load(f)
+        else:
+            self.manifest = {}
+
+    @property
+    def vectorstore(self):
+        if self._vectorstore is None:
+            if os.path.exists(os.path.join(self.path, MANIFEST_FILE)):
+                self._vectorstore = load_index(self.path, self.embeddings, mmap=False)
+            else:
+                self._vectorstore = empty_vectorstore(self.embeddings)
+        return self._vectorstore
+
+    @property
+    def rows(self):
+        """Number of indexed chunks, from the manifest alone."""
+        return sum(len(entry["ids"]) for entry in self.manifest.values())
+
+    def writer(self, batch_size=256):
+        """Start a sync fed one unit at a time: writer.add(unit_id, doc) ..., then writer.close()."""
+        return IncrementalSync(self, batch_size)
+
+    def sync(self, units, batch_size=256):
+        """Bring the index in line with `units`, an iterable of (unit_id, Document).
+
+        Units are consumed as a stream: changed ones are embedded and added in
+        batches of `batch_size` chunks, so memory does not grow with the source.
+        Unit ids must be unique within one sync.
+        """
+        writer = self.writer(batch_size)
+        for unit_id, doc in units:
+            writer.add(unit_id, doc)
+        return writer.close()
+
+    @property
+    def version(self):
+        """Fingerprint of the indexed content; changes whenever a unit does."""
+        h = hashlib.sha256()
+        for unit_id in sorted(self.manifest):
+            h.update(f"{unit_id}={self.manifest[unit_id]['hash']};".encode())
+        return h.hexdigest()[:16]
+
+    def save(self):
+        """Write index, docstore and manifest together, swapping the directory in one step."""
+        parent = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(parent, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(dir=parent, prefix=".tmp-")
+        self.vectorstore.save_local(tmp_dir)
+        # Read-only copy for serving processes (load_index(mmap=True))
+        write_vectorstore_docstore(self.vectorstore, os.path.join(tmp_dir, DOCSTORE_DIR))
+        with open(os.path.join(tmp_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f)
+
+        old_dir = None
+        if os.path.exists(self.path):
+            old_dir = tmp_dir + ".old"
+            os.replace(self.path, old_dir)
+        os.replace(tmp_dir, self.path)
+        if old_dir:
+            shutil.rmtree(old_dir, ignore_errors=True)
+
+
+class IncrementalSync:
+    """One sync of an IncrementalIndex in progress; see IncrementalIndex.writer."""
+
+    def __init__(self, index, batch_size=256):
+        self.index = index
+        self.batch_size = batch_size
+        self.stats = {"added": 0, "modified": 0, "removed": 0, "embedded_chunks": 0}
+        self.seen = set()
+        self.stale_ids, self.new_chunks, self.new_ids = [], [], []
+
+    def flush(self):
+        # Drop stale vectors first: a modified unit re-uses its chunk ids.
+        if self.stale_ids:
+            self.index.vectorstore.delete(self.stale_ids)
+            self.stale_ids.clear()
+        if self.new_chunks:
+            self.index.vectorstore.add_documents(self.new_chunks, ids=self.new_ids)
+            self.stats["embedded_chunks"] += len(self.new_chunks)
+            self.new_chunks.clear()
+            self.new_ids.clear()
+
+    def add(self, unit_id, doc):
+        manifest = self.index.manifest
+        self.seen.add(unit_id)
+        h = unit_hash(doc)
+        entry = manifest.get(unit_id)
+        if entry is not None and entry["hash"] == h:
+            return
+
+        if entry is None:
+            self.stats["added"] += 1
+        else:
+            self.stats["modified"] += 1
+            self.stale_ids.extend(entry["ids"])
+
+        chunks = self.index.chunk_fn([doc])
+        ids = [f"{unit_id}:{i}" for i in range(len(chunks))]
+        manifest[unit_id] = {"hash": h, "ids": ids}
+        self.new_chunks.extend(chunks)
+        self.new_ids.extend(ids)
+        if len(self.new_chunks) >= self.batch_size:
+            self.flush()
+
+    @property
+    def changed(self):
+        return bool(self.stats["added"] or self.stats["modified"] or self.stats["removed"])
+
+    def close(self):
+        """Remove units that were not seen, apply what is pending and save if anything changed."""
+        manifest = self.index.manifest
+        removed = [u for u in manifest if u not in self.seen]
+        for u in removed:
+            self.stale_ids.extend(manifest.pop(u)["ids"])
+        self.stats["removed"] = len(removed)
+        self.flush()
+
+        if self.changed:
+            self.index.save()
+
+        stats = self.stats
+        print(
+            f"Incremental sync: +{stats['added']} ~{stats['modified']} -{stats['removed']} units, "
+            f"{stats['embedded_chunks']} chunks embedded."
+        )
+        return stats
@@ -0,0 +1,105 @@
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import tempfile
+
+import faiss
+from langchain_community.vectorstores import FAISS
+
+from mmap_docstore import MmapDocstore, RowIds, write_vectorstore_docstore
+
+# ---------------------------
+# On-disk FAISS index cache
+# ---------------------------
+# Each entry lives in <cache_dir>/<key>/ and holds the files written by
+# FAISS.save_local (index.faiss + index.pkl). The key is a hash of the
+# source file contents plus every setting that changes the chunks or vectors,
+# so a stale entry can never be served.
+#
+# A copy of the docstore is also written as a memory-mapped store in
+# docstore/ (see mmap_docstore.py). Read-only loads (mmap=True) use it instead
+# of unpickling index.pkl, so chunk text and metadata stay on disk and in the
+# page cache instead of becoming Python objects in every process.
+
+DOCSTORE_DIR = "docstore"
+
+
+def file_digest(path, block_size=1 << 20):
+    """Return the sha256 hex digest of a file's contents."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def cache_key(sources, **settings):
+    """Build a cache key from source file contents and ingestion settings."""
+    h = hashlib.sha256()
+    for path in sources:
+        h.update(file_digest(path).encode())
+    h.update(json.dumps(settings, sort_keys=True, default=str).encode())
+    return h.hexdigest()[:32]
+
+
+def save_index(vectorstore, path):
+    """Atomically write a vectorstore to `path` (readers never see partial files)."""
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=parent, prefix=".tmp-")
+    try:
+        vectorstore.save_local(tmp_dir)
+        write_vectorstore_docstore(vectorstore, os.path.join(tmp_dir, DOCSTORE_DIR))
+        os.replace(tmp_dir, path)
+    except OSError:
+        # Another process published the same key first; keep theirs.
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        if not os.path.exists(os.path.join(path, "index.faiss")):
+            raise
+
+
+def load_index(path, embeddings, mmap=True):
+    """Load a saved vectorstore, memory-mapping the FAISS index when supported.
+
+    With mmap=True the memory-mapped docstore is used when present; the result
+    is then read-only (no add_documents / delete).
+    """
+    index_path = os.path.join(path, "index.faiss")
+    index = None
+    if mmap:
+        try:
+            index = faiss.read_index(index_path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+        except RuntimeError:
+            index = None  # index type without mmap support, fall back to a full read
+    if index is None:
+        index = faiss.read_index(index_path)
+
+    if mmap and os.path.exists(os.path.join(path, DOCSTORE_DIR)):
+        docstore = MmapDocstore(os.path.join(path, DOCSTORE_DIR))
+        index_to_docstore_id = RowIds(len(docstore))
+    else:
+        with open(os.path.join(path, "index.pkl"), "rb") as f:
+            docstore, index_to_docstore_id = pickle.load(f)
+
+    return FAISS(
+        embedding_function=embeddings,
+        index=index,
+        docstore=docstore,
+        index_to_docstore_id=index_to_docstore_id,
+    )
+
+
+def load_or_build(key, build_fn, embeddings, cache_dir=".rag_cache", mmap=True):
+    """Return the cached vectorstore for `key`, or build it with `build_fn` and cache it."""
+    path = os.path.join(cache_dir, key)
+
+    if os.path.exists(os.path.join(path, "index.faiss")):
+        print(f"Index cache hit ({key[:12]}), skipping parse and embed.")
+        return load_index(path, embeddings, mmap=mmap)
+
+    print(f"Index cache miss ({key[:12]}), building index...")
+    vectorstore = build_fn()
+    save_index(vectorstore, path)
+    return vectorstore
@@ -0,0 +1,223 @@
+import json
+import mmap
+import numbers
+import os
+from collections.abc import Mapping
+
+import numpy as np
+from langchain_community.docstore.base import Docstore
+from langchain_core.documents import Document
+
+# ---------------------------
+# Memory-mapped docstore
+# ---------------------------
+# Chunk text and metadata for a FAISS index, stored by FAISS row:
+#   text.bin          every page_content, utf-8, back to back
+#   offsets.npy       int64 (n + 1): row i is text.bin[offsets[i]:offsets[i + 1]]
+#   col<j>.*.npy      one column per metadata key (see meta.json)
+#   meta.json         row count and the column layout
+# Column kinds:
+#   int / float       int64 / float64 values + uint8 "present" flags
+#   category          int32 codes into a small list of distinct values (-1: missing)
+#   json              per-row JSON in its own bytes file + offsets (anything else)
+#
+# Opening only maps the files, so load time does not depend on the corpus size
+# (category value lists are read, and they are small by construction). Pages
+# are shared through the OS page cache by every process that opens the same
+# directory. Whole metadata columns can be read without decoding any Document
+# (numeric_column / category_column). Docstore ids are row numbers as strings;
+# RowIds is the matching index_to_docstore_id, so the LangChain FAISS wrapper
+# works unchanged. The store is read-only: indexes that need add / delete keep
+# InMemoryDocstore.
+
+META_FILE = "meta.json"
+# String columns with more distinct values than this are stored as json
+MAX_CATEGORIES = 1 << 16
+
+
+class RowIds(Mapping):
+    """index_to_docstore_id for a store whose ids are row numbers."""
+
+    def __init__(self, n):
+        self.n = n
+
+    def __getitem__(self, row):
+        if not 0 <= row < self.n:
+            raise KeyError(row)
+        return str(row)
+
+    def __iter__(self):
+        return iter(range(self.n))
+
+    def __len__(self):
+        return self.n
+
+
+def _column_kind(values):
+    present = [v for v in values if v is not None]
+    if present and all(isinstance(v, numbers.Integral) and not isinstance(v, bool) for v in present):
+        return "int"
+    if present and all(isinstance(v, numbers.Real) and not isinstance(v, bool) for v in present):
+        return "float"
+    if all(isinstance(v, str) for v in present) and len(set(present)) <= MAX_CATEGORIES:
+        return "category"
+    return "json"
+
+
+def _write_blobs(path, blobs):
+    offsets = np.zeros(len(blobs) + 1, dtype=np.int64)
+    with open(path, "wb") as f:
+        for i, blob in enumerate(blobs):
+            f.write(blob)
+            offsets[i + 1] = offsets[i] + len(blob)
+    return offsets
+
+
+def write_docstore(path, documents):
+    """Write `documents` (in FAISS row order) as a memory-mappable store in `path`."""
+    os.makedirs(path, exist_ok=True)
+    documents = list(documents)
+    n = len(documents)
+
+    np.save(os.path.join(path, "offsets.npy"), _write_blobs(
+        os.path.join(path, "text.bin"), [doc.page_content.encode("utf-8") for doc in documents]
+    ))
+
+    keys = list(dict.fromkeys(key for doc in documents for key in doc.metadata))
+    columns = {}
+    for j, key in enumerate(keys):
+        values = [doc.metadata.get(key) for doc in documents]
+        kind = _column_kind(values)
+        spec = {"kind": kind, "file": f"col{j}"}
+        base = os.path.join(path, f"col{j}")
+        if kind in ("int", "float"):
+            dtype = np.int64 if kind == "int" else np.float64
+            np.save(base + ".data.npy", np.array([0 if v is None else v for v in values], dtype=dtype))
+            np.save(base + ".present.npy", np.array([v is not None for v in values], dtype=np.uint8))
+        elif kind == "category":
+            distinct = sorted({v for v in values if v is not None})
+            code = {v: i for i, v in enumerate(distinct)}
+            np.save(base + ".codes.npy", np.array([code.get(v, -1) for v in values], dtype=np.int32))
+            spec["values"] = distinct
+        else:
+            blobs = [b"" if v is None else json.dumps(v, default=str).encode("utf-8") for v in values]
+            np.save(base + ".offsets.npy", _write_blobs(base + ".bin", blobs))
+        columns[key] = spec
+
+    with open(os.path.join(path, META_FILE), "w", encoding="utf-8") as f:
+        json.dump({"count": n, "columns": columns}, f)
+
+
+def write_vectorstore_docstore(vectorstore, path):
+    """Write the docstore of a LangChain FAISS store, in FAISS row order."""
+    mapping = vectorstore.index_to_docstore_id
+    write_docstore(path, (vectorstore.docstore.search(mapping[i]) for i in range(vectorstore.index.ntotal)))
+
+
+def _map_bytes(path):
+    if os.path.getsize(path) == 0:
+        return b""
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class MmapDocstore(Docstore):
+    """Read-only docstore over files written by write_docstore."""
+
+    def __init__(self, path):
+        self.path = path
+        self._open()
+
+    def _open(self):
+        with open(os.path.join(self.path, META_FILE), encoding="utf-8") as f:
+            meta = json.load(f)
+        self.count = meta["count"]
+        self._text = _map_bytes(os.path.join(self.path, "text.bin"))
+        self._offsets = np.load(os.path.join(self.path, "offsets.npy"), mmap_mode="r")
+
+        self._columns = []
+        for key, spec in meta["columns"].items():
+            base = os.path.join(self.path, spec["file"])
+            kind = spec["kind"]
+            if kind in ("int", "float"):
+                arrays = (np.load(base + ".data.npy", mmap_mode="r"), np.load(base + ".present.npy", mmap_mode="r"))
+            elif kind == "category":
+                arrays = (np.load(base + ".codes.npy", mmap_mode="r"), spec["values"])
+            else:
+                arrays = (_map_bytes(base + ".bin"), np.load(base + ".offsets.npy", mmap_mode="r"))
+            self._columns.append((key, kind, arrays))
+
+    # Pickled (e.g. sent to a worker process) as its path; the receiver maps the same files
+    def __getstate__(self):
+        return {"path": self.path}
+
+    def __setstate__(self, state):
+        self.path = state["path"]
+        self._open()
+
+    def __len__(self):
+        return self.count
+
+    def text(self, row):
+        return self._text[self._offsets[row]:self._offsets[row + 1]].decode("utf-8")
+
+    def metadata(self, row):
+        meta = {}
+        for key, kind, arrays in self._columns:
+            if kind == "int":
+                if arrays[1][row]:
+                    meta[key] = int(arrays[0][row])
+            elif kind == "float":
+                if arrays[1][row]:
+                    meta[key] = float(arrays[0][row])
+            elif kind == "category":
+                code = arrays[0][row]
+                if code >= 0:
+                    meta[key] = arrays[1][code]
+            else:
+                blob, offsets = arrays
+                start, stop = offsets[row], offsets[row + 1]
+                if stop > start:
+                    meta[key] = json.loads(blob[start:stop])
+        return meta
+
+    def _column(self, key):
+        for name, kind, arrays in self._columns:
+            if name == key:
+                return kind, arrays
+        return None, None
+
+    def numeric_column(self, key):
+        """float64 value of `key` for every row, NaN where missing; None for non-numeric columns."""
+        kind, arrays = self._column(key)
+        if kind is None:
+            return np.full(self.count, np.nan)
+        if kind not in ("int", "float"):
+            return None
+        values = np.array(arrays[0], dtype=np.float64)
+        values[np.asarray(arrays[1]) == 0] = np.nan
+        return values
+
+    def category_column(self, key):
+        """(int32 codes per row, distinct values) of `key`, code -1 where missing; None for other kinds."""
+        kind, arrays = self._column(key)
+        if kind is None:
+            return np.full(self.count, -1, dtype=np.int32), []
+        if kind != "category":
+            return None
+        return np.asarray(arrays[0]), arrays[1]
+
+    def search(self, search):
+        try:
+            row = int(search)
+        except (TypeError, ValueError):
+            return f"ID {search} not found."
+        if not 0 <= row < self.count:
+            return f"ID {search} not found."
+        return Document(page_content=self.text(row), metadata=self.metadata(row))
+
+    def delete(self, ids):
+        raise TypeError(
+            "MmapDocstore is read-only: delete through IncrementalIndex (which keeps an "
+            "InMemoryDocstore) and save it again to rebuild the memory-mapped copy"
+        )
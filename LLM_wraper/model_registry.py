@@ -0,0 +1,163 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# ---------------------------
+# Process-wide model / pipeline registry
+# ---------------------------
+# transformers pipelines are loaded once per (task, model, dtype, device,
+# quantization mode, other kwargs) and shared by every caller in the process, so a second
+# LLMWrapper or classifier over the same model costs nothing. Models loaded
+# before worker processes fork are shared copy-on-write.
+#
+# Callers should ask the registry for the pipeline on each use (LLMWrapper.pipe
+# does) instead of keeping it: when the loaded weights exceed the memory
+# budget, the least recently used models that have been idle for at least
+# `min_idle_seconds` are dropped, and are reloaded transparently next time.
+# The budget is checked on every get(), hits included, so a model that was
+# still too recently used at one check is dropped at a later one.
+#
+#   MODEL_REGISTRY_BUDGET_MB   memory budget for loaded weights (unset: no limit)
+#   MODEL_REGISTRY_PRELOAD     "task=model,task=model" loaded at startup by the
+#                              entry points (generate_server.py, PROGRAM_2.PY)
+#                              through preload_from_env()
+
+
+def registry_key(task, model, quantize=None, **pipeline_kwargs):
+    """Hashable key; dtype and device are normalised to strings."""
+    kwargs = dict(pipeline_kwargs)
+    dtype = kwargs.pop("torch_dtype", kwargs.pop("dtype", None))
+    device = kwargs.pop("device", None)
+    return (
+        task,
+        model,
+        "default" if dtype is None else str(dtype),
+        "default" if device is None else str(device),
+        quantize or "fp32",
+        json.dumps(kwargs, sort_keys=True, default=str),
+    )
+
+
+def model_memory_bytes(pipe):
+    model = getattr(pipe, "model", None)
+    if model is None or not hasattr(model, "state_dict"):
+        return 0
+    # state_dict rather than parameters(): dynamically quantized layers keep
+    # their int8 weights in packed (weight, bias) tuples, not as parameters
+    total, seen = 0, set()
+    stack = list(model.state_dict().values())
+    while stack:
+        value = stack.pop()
+        if isinstance(value, (list, tuple)):
+            stack.extend(value)
+        elif hasattr(value, "numel") and value.data_ptr() not in seen:  # tied weights count once
+            seen.add(value.data_ptr())
+            total += value.numel() * value.element_size()
+    return total
+
+
+class ModelRegistry:
+    def __init__(self, memory_budget_mb=None, min_idle_seconds=60.0):
+        self.memory_budget = memory_budget_mb * 2**20 if memory_budget_mb else None
+        self.min_idle_seconds = min_idle_seconds
+        self._entries = OrderedDict()  # key -> {"pipe", "bytes", "last_used"}, in LRU order
+        self._lock = threading.Lock()
+        self._loading = {}  # key -> Lock, so concurrent callers load a model once
+        self.loads = 0
+        self.evictions = 0
+
+    def get(self, task, model, quantize=None, **pipeline_kwargs):
+        """Shared pipeline for these settings, loading it on first use.
+
+        `quantize` is one of quantization.QUANTIZE_MODES, applied after loading.
+        """
+        key = registry_key(task, model, quantize, **pipeline_kwargs)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                loading = self._loading.setdefault(key, threading.Lock())
+            else:
+                entry["last_used"] = time.monotonic()
+                self._entries.move_to_end(key)
+        if entry is not None:
+            # Models skipped at an earlier check may have gone idle since
+            self._enforce_budget(keep=key)
+            return entry["pipe"]
+
+        with loading:
+            with self._lock:
+                entry = self._entries.get(key)
+            if entry is None:
+                from transformers import pipeline
+
+                start = time.perf_counter()
+                pipe = pipeline(task, model=model, **pipeline_kwargs)
+                if quantize not in (None, "fp32"):
+                    from quantization import quantize_pipeline
+
+                    quantize_pipeline(pipe, quantize)
+                entry = {"pipe": pipe, "bytes": model_memory_bytes(pipe), "last_used": time.monotonic()}
+                with self._lock:
+                    self._entries[key] = entry
+                    self.loads += 1
+                print(f"Loaded {task} / {model} ({quantize or 'fp32'}) in {time.perf_counter() - start:.1f}s "
+                      f"({entry['bytes'] / 2**20:.0f} MiB)")
+                self._enforce_budget(keep=key)
+            return entry["pipe"]
+
+    def preload(self, specs):
+        """Load a list of {"task", "model", ["quantize"], **pipeline_kwargs} specs up front."""
+        for spec in specs:
+            spec = dict(spec)
+            self.get(spec.pop("task"), spec.pop("model"), **spec)
+
+    def preload_from_env(self, var="MODEL_REGISTRY_PRELOAD"):
+        value = os.getenv(var, "")
+        self.preload(
+            {"task": task.strip(), "model": model.strip()}
+            for task, _, model in (item.partition("=") for item in value.split(",") if item.strip())
+        )
+
+    @property
+    def memory_bytes(self):
+        return sum(entry["bytes"] for entry in self._entries.values())
+
+    def _enforce_budget(self, keep=None):
+        if self.memory_budget is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            for key in list(self._entries):
+                if self.memory_bytes <= self.memory_budget:
+                    break
+                entry = self._entries[key]
+                if key == keep or now - entry["last_used"] < self.min_idle_seconds:
+                    continue
+                del self._entries[key]
+                self.evictions += 1
+                print(f"Evicted {key[1]} ({entry['bytes'] / 2**20:.0f} MiB, idle {now - entry['last_used']:.0f}s)")
+
+    def stats(self):
+        now = time.monotonic()
+        return {
+            "models": [
+                {"task": key[0], "model": key[1], "dtype": key[2], "device": key[3], "quantize": key[4],
+                 "mib": round(entry["bytes"] / 2**20, 1), "idle_s": round(now - entry["last_used"], 1)}
+                for key, entry in self._entries.items()
+            ],
+            "memory_mib": round(self.memory_bytes / 2**20, 1),
+            "budget_mib": round(self.memory_budget / 2**20, 1) if self.memory_budget else None,
+            "loads": self.loads,
+            "evictions": self.evictions,
+        }
+
+
+_budget = os.getenv("MODEL_REGISTRY_BUDGET_MB")
+default_registry = ModelRegistry(memory_budget_mb=float(_budget) if _budget else None)
+
+
+def get_pipeline(task, model, quantize=None, **pipeline_kwargs):
+    """Shared pipeline from the process-wide registry."""
+    return default_registry.get(task, model, quantize, **pipeline_kwargs)
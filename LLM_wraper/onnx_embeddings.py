@@ -0,0 +1,178 @@
+import os
+import re
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+# ---------------------------
+# ONNX Runtime embedding backend
+# ---------------------------
+# Same vectors as HuggingFaceEmbeddings for sentence-transformers models with
+# mean pooling + L2 normalisation (all-MiniLM-L6-v2), computed by ONNX Runtime
+# instead of PyTorch:
+#   - the model is exported to ONNX once and cached on disk; "onnx-int8"
+#     additionally applies dynamic int8 quantization to the weights
+#   - texts are tokenized without padding, sorted by length and grouped so a
+#     batch holds at most `max_batch_tokens` padded tokens; short texts are not
+#     padded to the longest text of the whole call
+#   - intra-op threads default to the physical cores this process may use
+#
+# Backends: "torch" (HuggingFaceEmbeddings), "onnx" (fp32) and "onnx-int8".
+
+BACKENDS = ["torch", "onnx", "onnx-int8"]
+DEFAULT_ONNX_DIR = os.getenv(
+    "ONNX_MODEL_DIR", os.path.join(os.path.expanduser("~"), ".cache", "llm_rag", "onnx")
+)
+
+
+def default_threads():
+    """Physical cores available to this process (hyperthreads rarely help GEMM-bound inference)."""
+    try:
+        available = len(os.sched_getaffinity(0))
+    except AttributeError:  # macOS / Windows
+        available = os.cpu_count() or 1
+    try:
+        import psutil
+        physical = psutil.cpu_count(logical=False) or available
+    except ImportError:
+        physical = max(1, (os.cpu_count() or 2) // 2)
+    return max(1, min(available, physical))
+
+
+def export_onnx(model_name, out_dir, quantize=False):
+    """Export `model_name` to out_dir/model.onnx (and model-int8.onnx); returns the model path."""
+    fp32_path = os.path.join(out_dir, "model.onnx")
+    int8_path = os.path.join(out_dir, "model-int8.onnx")
+    target = int8_path if quantize else fp32_path
+    if os.path.exists(target):
+        return target
+
+    os.makedirs(out_dir, exist_ok=True)
+    if not os.path.exists(fp32_path):
+        import torch
+        from transformers import AutoModel, AutoTokenizer
+
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        model = AutoModel.from_pretrained(model_name).eval()
+        sample = tokenizer(["export sample"], return_tensors="pt")
+        tmp = fp32_path + ".tmp"
+        with torch.no_grad():
+            torch.onnx.export(
+                model,
+                (sample["input_ids"], sample["attention_mask"], sample["token_type_ids"]),
+                tmp,
+                input_names=["input_ids", "attention_mask", "token_type_ids"],
+                output_names=["last_hidden_state"],
+                dynamic_axes={
+                    "input_ids": {0: "batch", 1: "seq"},
+                    "attention_mask": {0: "batch", 1: "seq"},
+                    "token_type_ids": {0: "batch", 1: "seq"},
+                    "last_hidden_state": {0: "batch", 1: "seq"},
+                },
+                opset_version=14,
+            )
+        os.replace(tmp, fp32_path)
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        tmp = int8_path + ".tmp"
+        quantize_dynamic(fp32_path, tmp, weight_type=QuantType.QInt8)
+        os.replace(tmp, int8_path)
+    return target
+
+
+class OnnxEmbeddings(Embeddings):
+    """Drop-in for HuggingFaceEmbeddings backed by an exported (optionally int8) ONNX model."""
+
+    def __init__(
+        self,
+        model_name="sentence-transformers/all-MiniLM-L6-v2",
+        quantize=True,
+        threads=None,
+        max_batch_tokens=8192,
+        max_batch_size=128,
+        max_seq_length=256,
+        model_dir=DEFAULT_ONNX_DIR,
+    ):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        self.model_name = model_name
+        self.quantize = quantize
+        self.threads = threads or default_threads()
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max_batch_size
+        self.max_seq_length = max_seq_length
+
+        path = export_onnx(model_name, os.path.join(model_dir, re.sub(r"[^\w.-]+", "_", model_name)), quantize)
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = self.threads
+        options.inter_op_num_threads = 1
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name, use_fast=True)
+
+    def _batches(self, lengths):
+        """Index groups of similar length whose padded size fits max_batch_tokens."""
+        order = np.argsort(lengths, kind="stable")
+        batch = []
+        for i in order:
+            # Sorted ascending, so the newest text is the longest in the batch
+            if batch and ((len(batch) + 1) * lengths[i] > self.max_batch_tokens or len(batch) >= self.max_batch_size):
+                yield batch
+                batch = []
+            batch.append(i)
+        if batch:
+            yield batch
+
+    def _encode(self, texts):
+        encoded = self.tokenizer(list(texts), truncation=True, max_length=self.max_seq_length)
+        ids = encoded["input_ids"]
+        lengths = np.array([len(x) for x in ids])
+        out = None  # allocated once the hidden size is known
+
+        for batch in self._batches(lengths):
+            width = int(lengths[batch[-1]])
+            input_ids = np.zeros((len(batch), width), dtype=np.int64)
+            mask = np.zeros((len(batch), width), dtype=np.int64)
+            for row, i in enumerate(batch):
+                input_ids[row, :lengths[i]] = ids[i]
+                mask[row, :lengths[i]] = 1
+            feeds = {"input_ids": input_ids, "attention_mask": mask}
+            if "token_type_ids" in self.input_names:
+                feeds["token_type_ids"] = np.zeros_like(input_ids)
+
+            hidden = self.session.run(None, feeds)[0]
+            # Mean pooling over real tokens, then L2 normalisation
+            pooled = (hidden * mask[..., None]).sum(axis=1) / mask.sum(axis=1, keepdims=True)
+            pooled /= np.linalg.norm(pooled, axis=1, keepdims=True).clip(min=1e-12)
+            if out is None:
+                out = np.empty((len(texts), pooled.shape[1]), dtype=np.float32)
+            out[batch] = pooled
+        return out
+
+    def embed_documents(self, texts):
+        if not texts:
+            return []
+        return self._encode(texts).tolist()
+
+    def embed_query(self, text):
+        return self._encode([text])[0].tolist()
+
+
+def load_embeddings(model_name, backend="torch"):
+    """Base (uncached) embeddings for `backend`; see BACKENDS."""
+    if backend == "torch":
+        from langchain_huggingface import HuggingFaceEmbeddings
+        return HuggingFaceEmbeddings(model_name=model_name)
+    if backend in ("onnx", "onnx-int8"):
+        return OnnxEmbeddings(model_name, quantize=backend == "onnx-int8")
+    raise ValueError(f"unknown embedding backend {backend!r}; expected one of {BACKENDS}")
+
+
+def cache_namespace(model_name, backend="torch"):
+    """CachedEmbeddings namespace: int8 vectors differ slightly, so each backend gets its own."""
+    return model_name if backend == "torch" else f"{model_name}@{backend}"
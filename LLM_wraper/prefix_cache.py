@@ -0,0 +1,98 @@
+import copy
+import threading
+from collections import OrderedDict
+
+import torch
+
+# ---------------------------
+# Prompt-prefix KV cache
+# ---------------------------
+# Local generation prompts usually start with the same long block (instructions
+# plus few-shot examples). Its attention keys / values depend only on those
+# tokens, so they are computed once with cache_prefix() and reused: a prompt
+# whose token ids start with a cached prefix only runs its own tokens through
+# the model before decoding.
+#
+# Matching is on token ids, never on text, so a hit is always exact. Entries
+# are per model, kept in LRU order and dropped when their total size exceeds
+# `max_mb`. generate() extends the cache it is given in place, so each call
+# gets its own copy (copying the tensors is much cheaper than recomputing them).
+
+
+def cache_bytes(past_key_values):
+    """Size of the tensors in a past_key_values object (legacy tuples or a Cache)."""
+    total, stack, seen = 0, [past_key_values], set()
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        if torch.is_tensor(obj):
+            total += obj.numel() * obj.element_size()
+        elif isinstance(obj, (list, tuple)):
+            stack.extend(obj)
+        elif isinstance(obj, dict):
+            stack.extend(obj.values())
+        elif hasattr(obj, "__dict__"):
+            stack.extend(vars(obj).values())
+    return total
+
+
+class PrefixCache:
+    def __init__(self, max_mb=256):
+        self.max_bytes = max_mb * 2**20
+        self._entries = OrderedDict()  # (model key, token ids) -> {"past", "bytes"}, in LRU order
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.tokens_saved = 0
+
+    @property
+    def memory_bytes(self):
+        return sum(entry["bytes"] for entry in self._entries.values())
+
+    def put(self, model_key, ids, past_key_values):
+        key = (model_key, tuple(ids))
+        size = cache_bytes(past_key_values)
+        if size > self.max_bytes:
+            return False
+        with self._lock:
+            self._entries[key] = {"past": past_key_values, "bytes": size}
+            self._entries.move_to_end(key)
+            while self.memory_bytes > self.max_bytes:
+                self._entries.popitem(last=False)
+        return True
+
+    def lookup(self, model_key, ids):
+        """(prefix length, private copy of its past_key_values) for the longest
+        cached prefix of `ids`, leaving at least one token to run; (0, None) if none."""
+        ids = tuple(ids)
+        with self._lock:
+            best = None
+            for key in self._entries:
+                prefix = key[1]
+                if key[0] == model_key and len(prefix) < len(ids) and ids[:len(prefix)] == prefix:
+                    if best is None or len(prefix) > len(best[1]):
+                        best = key
+            if best is None:
+                self.misses += 1
+                return 0, None
+            self._entries.move_to_end(best)
+            past = self._entries[best]["past"]
+            self.hits += 1
+            self.tokens_saved += len(best[1])
+        return len(best[1]), copy.deepcopy(past)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "memory_mib": round(self.memory_bytes / 2**20, 1),
+            "max_mib": round(self.max_bytes / 2**20, 1),
+            "hits": self.hits,
+            "misses": self.misses,
+            "tokens_saved": self.tokens_saved,
+        }
@@ -0,0 +1,171 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from attribute_index import parse_filters, singularize, tokenize
+from catalog_ingest import build_catalog_frame, read_catalog
+
+# ---------------------------
+# Columnar product table + exact query path
+# ---------------------------
+# Questions like "cheapest indigo kurta" or "top 10 discounts in
+# Westernwear-Women" have one right answer that top-3 semantic neighbours
+# rarely contain. The table keeps one NumPy array per column and answers
+# sort / range / aggregate questions directly; anything it cannot fully
+# understand returns None so the caller falls back to the RAG chain.
+
+DEFAULT_TOP_N = 5
+
+# (pattern, column, descending)
+SORT_INTENTS = [
+    (r"\b(cheapest|least expensive|lowest[- ]priced?|lowest price)\b", "sell_price", False),
+    (r"\b(most expensive|costliest|priciest|highest[- ]priced?|highest price)\b", "sell_price", True),
+    (r"\b(biggest|highest|largest|top|best|max(imum)?|most)\s+(\d+\s+)?discount(s|ed)?\b|\bmost discounted\b",
+     "discount", True),
+    (r"\b(lowest|smallest|least|min(imum)?)\s+discount(s|ed)?\b", "discount", False),
+]
+AGGREGATE_INTENT = r"\b(average|avg|mean)\s+(selling\s+)?(price|mrp|discount)\b"
+COUNT_INTENT = r"\b(how many|count|number of)\b"
+
+AGGREGATE_COLUMNS = {"price": "sell_price", "mrp": "mrp", "discount": "discount"}
+
+# Words that carry no product meaning once the intent and filters are parsed
+STOPWORDS = set("""
+a about all an and any are at available be between buy by can category cheap cheaper cheapest
+costliest count customer do does expensive find for from get give have highest how i in is it
+items item least list lowest many max maximum me mean min minimum most my number of off on or price
+priced prices priciest product products rs inr sale sell selling show some than that the their
+them there these this those to top under upto up over above below less more greater within
+what which who with you your discount discounts discounted biggest largest smallest best avg
+average mrp brand brands percent sorted by order per please
+""".split())
+
+
+class ProductTable:
+    def __init__(self, frame):
+        self.size = len(frame)
+        self.brand = frame["brand"].to_numpy(dtype=object)
+        self.category = frame["category"].to_numpy(dtype=object)
+        self.details = frame["details"].to_numpy(dtype=object)
+        self.columns = {
+            "mrp": frame["mrp"].to_numpy(dtype=np.float64),
+            "sell_price": frame["sell_price"].to_numpy(dtype=np.float64),
+            "discount": frame["discount"].to_numpy(dtype=np.float64),
+        }
+
+        self.brand_key = np.array([b.lower() for b in self.brand], dtype=object)
+        self.category_key = np.array([c.lower() for c in self.category], dtype=object)
+        self.brands = set(self.brand_key)
+        self.categories = set(self.category_key)
+
+        # Inverted index over singularized detail words, for "indigo kurta"
+        postings = {}
+        for row, text in enumerate(self.details):
+            for token in {singularize(w) for w in tokenize(text)}:
+                postings.setdefault(token, []).append(row)
+        self.tokens = {t: np.asarray(rows, dtype=np.int64) for t, rows in postings.items()}
+
+    @classmethod
+    def from_csv(cls, csv_path, chunksize=5000, nrows=None):
+        """Load the catalog CSV chunk by chunk into one columnar table."""
+        frames = []
+        for df in read_catalog(csv_path, chunksize=chunksize, nrows=nrows):
+            frame = build_catalog_frame(df).drop(columns="text")
+            frame["details"] = df["Deatils"].fillna("N/A").astype(str)
+            frames.append(frame)
+        return cls(pd.concat(frames, ignore_index=True))
+
+    def select(self, filters, terms=()):
+        """Boolean row mask for parsed filters plus detail keywords."""
+        mask = np.ones(self.size, dtype=bool)
+        if filters.get("brand"):
+            mask &= np.isin(self.brand_key, filters["brand"])
+        if filters.get("category"):
+            mask &= np.isin(self.category_key, filters["category"])
+        for field in ("sell_price", "discount"):
+            if filters.get(field):
+                low, high = filters[field]
+                values = self.columns[field]
+                if low is not None:
+                    mask &= values >= low
+                if high is not None:
+                    mask &= values <= high
+        for term in terms:
+            term_mask = np.zeros(self.size, dtype=bool)
+            term_mask[self.tokens[term]] = True
+            mask &= term_mask
+        return mask
+
+    def top(self, mask, column, n, descending=False):
+        """Row numbers of the `n` smallest (or largest) values of `column` within `mask`."""
+        values = self.columns[column]
+        rows = np.flatnonzero(mask & ~np.isnan(values))
+        keys = -values[rows] if descending else values[rows]
+        if len(rows) > n:
+            part = np.argpartition(keys, n)[:n]
+            rows, keys = rows[part], keys[part]
+        return rows[np.argsort(keys, kind="stable")]
+
+    def describe(self, row):
+        return (
+            f"{self.brand[row]} - {self.details[row]} | Rs {self.columns['sell_price'][row]:.0f} "
+            f"(MRP {self.columns['mrp'][row]:.0f}, {self.columns['discount'][row]:.0f}% off) | {self.category[row]}"
+        )
+
+    def _terms(self, query, filters):
+        """Leftover content words, or None if any of them is unknown to the catalog."""
+        consumed = set()
+        for value in filters.get("brand", []) + filters.get("category", []):
+            consumed |= set(tokenize(value))
+        terms = []
+        for word in tokenize(query):
+            if word in STOPWORDS or word in consumed or word.isdigit():
+                continue
+            token = singularize(word)
+            if token not in self.tokens:
+                return None
+            terms.append(token)
+        return terms
+
+    def answer(self, query):
+        """Exact answer for sort / aggregate / count questions, else None."""
+        q = query.lower()
+
+        sort = next(((col, desc) for pattern, col, desc in SORT_INTENTS if re.search(pattern, q)), None)
+        aggregate = re.search(AGGREGATE_INTENT, q)
+        count = re.search(COUNT_INTENT, q)
+        if not (sort or aggregate or count):
+            return None
+
+        filters = parse_filters(query, self.brands, self.categories)
+        terms = self._terms(query, filters)
+        if terms is None:
+            return None
+        mask = self.select(filters, terms)
+        matches = int(mask.sum())
+        if matches == 0:
+            return "No products match that."
+
+        if aggregate:
+            column = AGGREGATE_COLUMNS[aggregate.group(3)]
+            values = self.columns[column][mask]
+            values = values[~np.isnan(values)]
+            if len(values) == 0:
+                return None
+            unit = "%" if column == "discount" else ""
+            prefix = "" if column == "discount" else "Rs "
+            return (
+                f"Average {aggregate.group(3)} over {len(values)} matching products: {prefix}{values.mean():.0f}{unit} "
+                f"(min {prefix}{values.min():.0f}{unit}, max {prefix}{values.max():.0f}{unit})."
+            )
+
+        if count and not sort:
+            return f"{matches} matching products."
+
+        n = re.search(r"\b(?:top|first)\s+(\d+)\b|\b(\d+)\s+(?:cheapest|most|biggest|highest|lowest)\b", q)
+        n = int(n.group(1) or n.group(2)) if n else DEFAULT_TOP_N
+        column, descending = sort
+        rows = self.top(mask, column, n, descending=descending)
+        lines = [f"{i}. {self.describe(row)}" for i, row in enumerate(rows, 1)]
+        return f"{matches} matching products, sorted by {column.replace('_', ' ')}:\n" + "\n".join(lines)
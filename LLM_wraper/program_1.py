@@ -1,24 +1,252 @@
-from transformers import pipeline
+import copy
+import threading
+import time
+
+import torch
+from transformers import StoppingCriteria, StoppingCriteriaList, TextIteratorStreamer
+
+from model_registry import default_registry, registry_key
+from token_stream import StreamStats
+
+
+class _StopConditions(StoppingCriteria):
+    """Ends generate() when the consumer gives up or the deadline passes; counts new tokens."""
+
+    def __init__(self, prompt_tokens, deadline, cancel):
+        self.prompt_tokens = prompt_tokens
+        self.deadline = deadline  # time.monotonic() value, or None
+        self.cancel = cancel
+        self.tokens = 0
+        self.reason = None
+
+    def __call__(self, input_ids, scores, **kwargs):
+        self.tokens = input_ids.shape[1] - self.prompt_tokens
+        if self.cancel.is_set():
+            self.reason = self.reason or "cancelled"
+        elif self.deadline is not None and time.monotonic() >= self.deadline:
+            self.reason = "deadline"
+        done = self.reason is not None
+        return torch.full((input_ids.shape[0],), done, dtype=torch.bool, device=input_ids.device)
+
+
+def _held_back(text, stops):
+    """Length of the longest tail of `text` that could still grow into a stop string."""
+    return max((n for stop in stops for n in range(1, len(stop)) if text.endswith(stop[:n])), default=0)
 
 class LLMWrapper:
-    def __init__(self, model_name="gpt2", task="text-generation", **pipeline_kwargs):
-        self.pipe = pipeline(task, model=model_name, **pipeline_kwargs)
-        print(f"Pipeline initialized for task: {task} with model: {model_name}")
+    def __init__(self, model_name="gpt2", task="text-generation", registry=None, prefix_cache=None,
+                 quantize=None, **pipeline_kwargs):
+        # The pipeline comes from a process-wide registry: wrappers over the same
+        # model and settings share one copy of the weights.
+        self.registry = registry or default_registry
+        self.task = task
+        self.model_name = model_name
+        self.pipeline_kwargs = pipeline_kwargs
+        # "fp32" (default), "int8" or "bf16": see quantization.py
+        self.quantize = quantize
+        # Optional PrefixCache (prefix_cache.py); it can be shared between wrappers
+        self.prefix_cache = prefix_cache
+        self.model_key = registry_key(task, model_name, quantize, **pipeline_kwargs)
+        self._batch_tokenizer = None  # (shared tokenizer, left-padding copy of it)
+        self.pipe  # load (or reuse) now rather than on the first call
+        print(f"Pipeline initialized for task: {task} with model: {model_name} ({quantize or 'fp32'})")
 
-    def generate_text(self, prompt, max_length=50, num_return_sequences=1):
-        outputs = self.pipe(prompt, max_length=max_length, num_return_sequences=num_return_sequences)
+    @property
+    def pipe(self):
+        # Looked up on every use, so the registry can evict idle models
+        return self.registry.get(self.task, self.model_name, self.quantize, **self.pipeline_kwargs)
+
+    def cache_prefix(self, prefix):
+        """Compute and keep the KV cache of a shared prompt prefix; returns its token count.
+
+        Later prompts starting with the same tokens skip recomputing them. End
+        the prefix where the tokenizer would split anyway (e.g. after a newline),
+        so it tokenizes the same on its own as inside a full prompt.
+        """
+        if self.prefix_cache is None:
+            raise ValueError("this LLMWrapper has no prefix_cache")
+        tokenizer, model = self.pipe.tokenizer, self.pipe.model
+        ids = tokenizer(prefix)["input_ids"]
+        with torch.inference_mode():
+            out = model(input_ids=torch.tensor([ids], device=model.device), use_cache=True)
+        self.prefix_cache.put(self.model_key, ids, out.past_key_values)
+        return len(ids)
+
+    def _model_inputs(self, prompt):
+        """Tokenized prompt for model.generate, plus past_key_values of a cached prefix if any."""
+        tokenizer, model = self.pipe.tokenizer, self.pipe.model
+        inputs = dict(tokenizer(prompt, return_tensors="pt").to(model.device))
+        if self.prefix_cache is not None:
+            cached, past = self.prefix_cache.lookup(self.model_key, inputs["input_ids"][0].tolist())
+            if cached:
+                inputs["past_key_values"] = past
+        return inputs
+
+    def generate_text(self, prompt, max_length=50, num_return_sequences=1, **generate_kwargs):
+        # max_new_tokens in generate_kwargs takes the place of max_length
+        if "max_new_tokens" not in generate_kwargs:
+            generate_kwargs["max_length"] = max_length
+
+        if self.prefix_cache is not None and num_return_sequences == 1:
+            # Straight to model.generate, so a cached prefix can be passed in
+            tokenizer, model = self.pipe.tokenizer, self.pipe.model
+            inputs = self._model_inputs(prompt)
+            with torch.inference_mode():
+                output = model.generate(**inputs, pad_token_id=tokenizer.eos_token_id, **generate_kwargs)
+            new_text = tokenizer.decode(output[0, inputs["input_ids"].shape[1]:], skip_special_tokens=True)
+            return [prompt + new_text]
+
+        outputs = self.pipe(prompt, num_return_sequences=num_return_sequences, **generate_kwargs)
 
         generated_texts = [output['generated_text'] for output in outputs]
         return generated_texts
 
-llm = LLMWrapper(
-    model_name="gpt2",
-    task="text-generation"
-)
+    def stream_text(self, prompt, max_new_tokens=50, stop=None, deadline=None, stats=None, **generate_kwargs):
+        """Yield the continuation of `prompt` piece by piece as it is decoded.
+
+        Decoding ends early at the first of `stop` strings (not included in the
+        output), after `max_new_tokens`, or `deadline` seconds after the call.
+        Pass a StreamStats to get time-to-first-token, tokens, tokens/sec and
+        the stop reason; closing the generator stops decoding too.
+        """
+        stats = stats if stats is not None else StreamStats()
+        stops = [stop] if isinstance(stop, str) else list(stop or [])
+        tokenizer, model = self.pipe.tokenizer, self.pipe.model
+        start = time.perf_counter()
+
+        inputs = self._model_inputs(prompt)
+        cancel = threading.Event()
+        conditions = _StopConditions(
+            inputs["input_ids"].shape[1], None if deadline is None else time.monotonic() + deadline, cancel
+        )
+        streamer = TextIteratorStreamer(tokenizer, skip_prompt=True, skip_special_tokens=True)
+        pad_token_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else tokenizer.eos_token_id
+        errors = []
+
+        def run():
+            try:
+                with torch.inference_mode():
+                    model.generate(
+                        **inputs,
+                        max_new_tokens=max_new_tokens,
+                        streamer=streamer,
+                        stopping_criteria=StoppingCriteriaList([conditions]),
+                        pad_token_id=pad_token_id,
+                        **generate_kwargs,
+                    )
+            except Exception as e:
+                errors.append(e)
+                streamer.end()
+
+        worker = threading.Thread(target=run, name="generate", daemon=True)
+        worker.start()
+
+        def emit(text):
+            if stats.ttft is None:
+                stats.ttft = time.perf_counter() - start
+            stats.chunks += 1
+            return text
+
+        pending = ""
+        try:
+            for piece in streamer:
+                pending += piece
+                hits = [i for i in (pending.find(s) for s in stops) if i >= 0]
+                if hits:
+                    conditions.reason = "stop"
+                    cancel.set()
+                    if min(hits):
+                        yield emit(pending[:min(hits)])
+                    pending = ""
+                    break
+                ready = len(pending) - _held_back(pending, stops)
+                if ready:
+                    yield emit(pending[:ready])
+                    pending = pending[ready:]
+            if pending:
+                yield emit(pending)
+        finally:
+            cancel.set()
+            worker.join()
+            stats.total = time.perf_counter() - start
+            stats.tokens = conditions.tokens
+            if conditions.reason:
+                stats.stop_reason = conditions.reason
+            elif conditions.tokens >= max_new_tokens:
+                stats.stop_reason = "length"
+            else:
+                stats.stop_reason = "eos"
+        if errors:
+            raise errors[0]
+
+    def left_padding_tokenizer(self):
+        """Private copy of the pipeline's tokenizer that pads on the left.
+
+        Decoder-only models continue from the last position, so batches are
+        padded on the left. The pipeline (and its tokenizer) is shared through
+        the model registry, so the copy is changed instead of the original.
+        """
+        shared = self.pipe.tokenizer
+        if self._batch_tokenizer is None or self._batch_tokenizer[0] is not shared:
+            tokenizer = copy.deepcopy(shared)
+            tokenizer.padding_side = "left"
+            if tokenizer.pad_token_id is None:
+                tokenizer.pad_token = tokenizer.eos_token
+            self._batch_tokenizer = (shared, tokenizer)
+        return self._batch_tokenizer[1]
+
+    def generate_batch(self, prompts, max_length=50, num_return_sequences=1, batch_size=8, bucket=True,
+                       **generate_kwargs):
+        """Generate for many prompts at once; returns one list of texts per prompt, in input order.
+
+        Prompts are sorted by token length (bucket=True) and run through the
+        model `batch_size` at a time, so each batch pads to almost the same
+        length. Without max_new_tokens, a batch generates up to `max_length`
+        tokens in total for its longest prompt.
+        """
+        tokenizer, model = self.left_padding_tokenizer(), self.pipe.model
+
+        lengths = [len(ids) for ids in tokenizer(list(prompts))["input_ids"]]
+        order = sorted(range(len(prompts)), key=lengths.__getitem__) if bucket else list(range(len(prompts)))
+
+        results = [None] * len(prompts)
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            inputs = tokenizer([prompts[i] for i in batch], return_tensors="pt", padding=True).to(model.device)
+            kwargs = dict(generate_kwargs)
+            if "max_new_tokens" not in kwargs:
+                kwargs["max_new_tokens"] = max(1, max_length - max(lengths[i] for i in batch))
+
+            with torch.inference_mode():
+                output = model.generate(
+                    **inputs,
+                    num_return_sequences=num_return_sequences,
+                    pad_token_id=tokenizer.pad_token_id,
+                    **kwargs,
+                )
+
+            # Same shape of result as the pipeline: prompt + continuation
+            new_text = tokenizer.batch_decode(output[:, inputs["input_ids"].shape[1]:], skip_special_tokens=True)
+            per_prompt = num_return_sequences
+            for n, i in enumerate(batch):
+                results[i] = [prompts[i] + text for text in new_text[n * per_prompt:(n + 1) * per_prompt]]
+        return results
+
+if __name__ == "__main__":
+    llm = LLMWrapper(
+        model_name="gpt2",
+        task="text-generation"
+    )
+
+    result = llm.generate_text(
+        prompt="Once upon a time in a futuristic city,",
+        max_length=50
+    )
 
-result = llm.generate_text(
-    prompt="Once upon a time in a futuristic city,",
-    max_length=50
-)
+    print(result)
 
-print(result)
+    stats = StreamStats()
+    for text in llm.stream_text("Once upon a time in a futuristic city,", max_new_tokens=60, stop=["\n\n"],
+                                deadline=10, stats=stats):
+        print(text, end="", flush=True)
+    print(f"\n({stats})")
@@ -0,0 +1,53 @@
+import torch
+
+# ---------------------------
+# CPU quantization modes for transformers models
+# ---------------------------
+#   fp32   unchanged
+#   int8   dynamic int8 quantization of every linear layer (weights stored as
+#          int8, activations quantized on the fly); typically ~2x faster matmuls
+#          and ~4x smaller linear weights on x86 / ARM CPUs
+#   bf16   all weights in bfloat16; only faster on CPUs with native bf16
+#          (AVX512-BF16 / AMX, recent ARM), elsewhere it just halves memory
+#
+# GPT-2 style models implement their projections with transformers' Conv1D
+# (a linear layer with a transposed weight), which quantize_dynamic does not
+# recognise, so those are converted to nn.Linear first.
+# Run bench_quantization.py before switching a model to a new mode.
+
+QUANTIZE_MODES = ("fp32", "int8", "bf16")
+
+
+def conv1d_to_linear(model):
+    """Replace transformers Conv1D modules with equivalent nn.Linear ones (in place)."""
+    from transformers.pytorch_utils import Conv1D
+
+    for parent in list(model.modules()):
+        for name, child in list(parent.named_children()):
+            if isinstance(child, Conv1D):
+                n_in, n_out = child.weight.shape
+                linear = torch.nn.Linear(n_in, n_out, dtype=child.weight.dtype)
+                with torch.no_grad():
+                    linear.weight.copy_(child.weight.t())
+                    linear.bias.copy_(child.bias)
+                setattr(parent, name, linear)
+    return model
+
+
+def quantize_model(model, mode):
+    """Return `model` in the given QUANTIZE_MODES mode (CPU inference only)."""
+    if mode in (None, "fp32"):
+        return model
+    if mode not in QUANTIZE_MODES:
+        raise ValueError(f"quantize must be one of {QUANTIZE_MODES}")
+    model.eval()
+    if mode == "bf16":
+        return model.to(torch.bfloat16)
+    model = conv1d_to_linear(model.to("cpu"))
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+
+def quantize_pipeline(pipe, mode):
+    """Quantize a transformers pipeline's model in place; returns the pipeline."""
+    pipe.model = quantize_model(pipe.model, mode)
+    return pipe
@@ -1,13 +1,32 @@
+import argparse
+import asyncio
 import os
+import threading
+from dataclasses import dataclass
+from typing import Any, Optional
+
 from dotenv import load_dotenv, find_dotenv
 
 from langchain_community.document_loaders import PyPDFLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_community.vectorstores import FAISS
-from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_huggingface import HuggingFaceEndpoint, ChatHuggingFace
 
+from ann_index import describe_index, rebuild_vectorstore, set_search_params
+from context_builder import assemble_context
+from embedding_cache import CachedEmbeddings
+from hybrid_search import BM25Index, HybridRetriever, row_order_key
+from incremental_index import IncrementalIndex
+from index_cache import cache_key, load_or_build
+from onnx_embeddings import cache_namespace, load_embeddings
+from rag_batch import answer_file
+from rag_server import serve
+from semantic_cache import SemanticCache
+from token_stream import StreamStats, print_stream, timed_stream
+from streaming_ingest import stream_index_pdfs
+from token_splitter import TokenTextSplitter
+
 # ---------------------------
 # 1. ENV
 # ---------------------------
@@ -15,49 +34,181 @@ load_dotenv(find_dotenv())
 HUGGINGFACE_API_KEY = os.getenv("HUGGINGFACE_API_KEY")
 
 # ---------------------------
-# 2. Load PDF
+# 2. Settings
 # ---------------------------
-pdf_path = "sample.pdf"
-loader = PyPDFLoader(pdf_path)
-documents = loader.load()
+PDF_PATH = "sample.pdf"
+CHUNK_SIZE = 500
+CHUNK_OVERLAP = 50
+# tokens: chunks sized in the embedding model's tokens (token_splitter.py);
+# chars: the original RecursiveCharacterTextSplitter with CHUNK_SIZE characters.
+SPLITTER = os.getenv("RAG_SPLITTER", "tokens")
+CHUNK_TOKENS = int(os.getenv("RAG_CHUNK_TOKENS", "128"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("RAG_CHUNK_OVERLAP_TOKENS", "16"))
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+# torch (HuggingFaceEmbeddings), onnx or onnx-int8 (ONNX Runtime, see onnx_embeddings.py)
+EMBEDDING_BACKEND = os.getenv("RAG_EMBEDDING_BACKEND", "torch")
+INDEX_CACHE_DIR = os.getenv("RAG_INDEX_CACHE", ".rag_cache")
+# Incremental mode re-reads the PDF on every start but only embeds pages whose
+# content changed; the default cache mode skips parsing when nothing changed.
+INCREMENTAL_INDEX = os.getenv("RAG_INCREMENTAL", "0") == "1"
+# Streaming ingestion parses pages in worker processes. Nothing heavy runs at
+# import time, so spawn-based platforms can re-import this script safely.
+STREAMING_INGEST = os.getenv("RAG_STREAMING_INGEST", "1") == "1"
 
-# ---------------------------
-# 3. Split into chunks
-# ---------------------------
-splitter = RecursiveCharacterTextSplitter(
-    chunk_size=500,
-    chunk_overlap=50
-)
-chunks = splitter.split_documents(documents)
+# Index mode: flat (exact), hnsw or ivfpq (compressed); see ann_index.py.
+# NPROBE / EF_SEARCH trade recall for latency at query time.
+INDEX_MODE = os.getenv("RAG_INDEX_MODE", "flat")
+NPROBE = int(os.getenv("RAG_NPROBE", "16"))
+EF_SEARCH = int(os.getenv("RAG_EF_SEARCH", "64"))
+
+# Semantic answer cache: paraphrased questions above this cosine similarity
+# reuse the stored answer for up to ANSWER_CACHE_TTL seconds.
+ANSWER_CACHE_THRESHOLD = float(os.getenv("RAG_ANSWER_CACHE_THRESHOLD", "0.92"))
+ANSWER_CACHE_TTL = float(os.getenv("RAG_ANSWER_CACHE_TTL", "3600"))
+
+# hybrid: BM25 and vector search in parallel, fused by reciprocal rank
+# (catches exact codes and rare terms); dense: vector search only.
+RETRIEVAL_MODE = os.getenv("RAG_RETRIEVAL", "hybrid")
+# Candidates taken from each search before fusion
+FUSION_FETCH_K = int(os.getenv("RAG_FUSION_FETCH_K", "20"))
+
+# Retrieved chunks are merged, deduplicated and packed into this many tokens
+CONTEXT_TOKEN_BUDGET = int(os.getenv("RAG_CONTEXT_TOKENS", "800"))
+
+# Print answers token by token as the endpoint generates them
+STREAM_ANSWERS = os.getenv("RAG_STREAM", "1") == "1"
+
+# Server mode: answers in flight at once, and requests allowed to wait for a slot
+SERVER_CONCURRENCY = int(os.getenv("RAG_SERVER_CONCURRENCY", "8"))
+SERVER_MAX_QUEUE = int(os.getenv("RAG_SERVER_MAX_QUEUE", "64"))
 
 # ---------------------------
-# 4. Embeddings (FREE local)
+# 3. Embeddings (FREE local)
 # ---------------------------
-embeddings = HuggingFaceEmbeddings(
-    model_name="sentence-transformers/all-MiniLM-L6-v2"
-)
+# Everything from here on runs when the app is created, not at import time, so
+# worker processes and the server can import this module cheaply.
+
+
+def make_embeddings():
+    # Wrapped in the on-disk cache shared with ecommerce.py: a chunk or question
+    # that was embedded before (by either app) never reaches the encoder again.
+    return CachedEmbeddings(
+        load_embeddings(EMBEDDING_MODEL, EMBEDDING_BACKEND),
+        namespace=cache_namespace(EMBEDDING_MODEL, EMBEDDING_BACKEND),
+    )
+
 
 # ---------------------------
-# 5. Vector DB
+# 4. Load PDF, split and index
 # ---------------------------
-vectorstore = FAISS.from_documents(chunks, embeddings)
+if SPLITTER == "tokens":
+    # Cheap to construct: the tokenizer is loaded on first use
+    splitter = TokenTextSplitter(
+        chunk_tokens=CHUNK_TOKENS,
+        overlap_tokens=CHUNK_OVERLAP_TOKENS,
+        tokenizer_name=EMBEDDING_MODEL,
+    )
+    index_settings = dict(
+        splitter="TokenTextSplitter",
+        chunk_tokens=CHUNK_TOKENS,
+        overlap_tokens=CHUNK_OVERLAP_TOKENS,
+    )
+else:
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP
+    )
+    index_settings = dict(
+        splitter="RecursiveCharacterTextSplitter",
+        chunk_size=CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP,
+    )
+index_settings.update(embedding_model=EMBEDDING_MODEL, embedding_backend=EMBEDDING_BACKEND, index_mode=INDEX_MODE)
+
+
+def build_vectorstore(embeddings):
+    if STREAMING_INGEST:
+        return stream_index_pdfs(
+            [PDF_PATH],
+            embeddings,
+            chunk_size=CHUNK_SIZE,
+            chunk_overlap=CHUNK_OVERLAP,
+            splitter=splitter,
+            index_mode=INDEX_MODE,
+        )
+
+    loader = PyPDFLoader(PDF_PATH)
+    documents = loader.load()
+
+    chunks = splitter.split_documents(documents)
+
+    vectorstore = FAISS.from_documents(chunks, embeddings)
+    if INDEX_MODE != "flat":
+        vectorstore = rebuild_vectorstore(vectorstore, INDEX_MODE)
+    return vectorstore
+
 
 # ---------------------------
-# 6. Retriever
+# 5. Vector DB (cached on disk) + 6. Retriever
 # ---------------------------
-retriever = vectorstore.as_retriever(search_kwargs={"k": 3})
+@dataclass
+class RagIndex:
+    vectorstore: Any
+    version: str
+    retriever: Any
+    bm25: Optional[Any] = None
+
+
+def load_index(embeddings):
+    """Load (or build) the index for the current PDF and wrap it in a retriever."""
+    if INCREMENTAL_INDEX:
+        # One live index per settings combination; pages are tracked by content hash.
+        # The live index is flat (it needs deletes); other modes are derived from it.
+        incremental = IncrementalIndex(
+            os.path.join(INDEX_CACHE_DIR, "incremental-" + cache_key([], **dict(index_settings, index_mode="flat"))),
+            embeddings,
+            chunk_fn=splitter.split_documents,
+        )
+        pages = PyPDFLoader(PDF_PATH).load()
+        incremental.sync((f"{doc.metadata['source']}:{doc.metadata['page']}", doc) for doc in pages)
+        vectorstore = incremental.vectorstore
+        version = incremental.version
+        if INDEX_MODE != "flat":
+            vectorstore = rebuild_vectorstore(vectorstore, INDEX_MODE)
+    else:
+        # Warm starts load the saved index and docstore for this exact PDF + settings
+        # and never run the loader or splitter or embed a single chunk.
+        version = cache_key([PDF_PATH], **index_settings)
+        vectorstore = load_or_build(
+            version, lambda: build_vectorstore(embeddings), embeddings, cache_dir=INDEX_CACHE_DIR
+        )
+
+    set_search_params(vectorstore.index, nprobe=NPROBE, ef_search=EF_SEARCH)
+    print(describe_index(vectorstore.index))
+
+    if RETRIEVAL_MODE == "hybrid":
+        # Lexical index over the same chunks, saved next to the vector index and
+        # keyed by row order as well, since BM25 hits are FAISS row numbers
+        bm25_path = os.path.join(INDEX_CACHE_DIR, "bm25", f"{version}-{row_order_key(vectorstore)}.npz")
+        bm25 = BM25Index.load_or_build(bm25_path, vectorstore)
+        retriever = HybridRetriever(vectorstore=vectorstore, bm25=bm25, k=3, fetch_k=FUSION_FETCH_K)
+        return RagIndex(vectorstore, version, retriever, bm25)
+    return RagIndex(vectorstore, version, vectorstore.as_retriever(search_kwargs={"k": 3}))
+
 
 # ---------------------------
 # 7. LLM (HF Free Endpoint)
 # ---------------------------
-llm = ChatHuggingFace(
-    llm=HuggingFaceEndpoint(
-        repo_id="Qwen/Qwen2.5-7B-Instruct",  # you can change
-        huggingfacehub_api_token=HUGGINGFACE_API_KEY,
-        temperature=0.2,
-        max_new_tokens=300
+def make_llm():
+    return ChatHuggingFace(
+        llm=HuggingFaceEndpoint(
+            repo_id="Qwen/Qwen2.5-7B-Instruct",  # you can change
+            huggingfacehub_api_token=HUGGINGFACE_API_KEY,
+            temperature=0.2,
+            max_new_tokens=300
+        )
     )
-)
+
 
 # ---------------------------
 # 8. Prompt
@@ -73,27 +224,141 @@ Question:
 {question}
 """)
 
+
+def format_docs(docs):
+    # Overlapping chunks merged, repeated sentences dropped, budget enforced
+    return assemble_context(docs, max_tokens=CONTEXT_TOKEN_BUDGET)
+
+
 # ---------------------------
 # 9. RAG Chain
 # ---------------------------
-def rag_chain(question):
-    docs = retriever.invoke(question)
-    context = "\n\n".join([doc.page_content for doc in docs])
+class RagApp:
+    """Embeddings, index, LLM and answer cache, created once and kept warm.
+
+    `reload()` loads or rebuilds the index and swaps it in with one assignment;
+    each question uses the index that was current when it arrived, so answers
+    in flight are unaffected.
+    """
+
+    def __init__(self):
+        self.embeddings = make_embeddings()
+        self.index = load_index(self.embeddings)
+        self.chain = prompt | make_llm()
+        # Answers are cached per index version: a paraphrase of an earlier
+        # question skips retrieval and the endpoint call.
+        self.answer_cache = SemanticCache(
+            self.embeddings,
+            threshold=ANSWER_CACHE_THRESHOLD,
+            ttl=ANSWER_CACHE_TTL,
+            index_version=self.index.version,
+        )
+
+    @property
+    def index_version(self):
+        return self.index.version
+
+    def reload(self):
+        self.index = load_index(self.embeddings)
+        self.answer_cache.set_index_version(self.index.version)
+
+    def build_context(self, question, index=None):
+        index = index or self.index
+        context, stats = format_docs(index.retriever.invoke(question))
+        print(f"[{stats}]")
+        return context
+
+    def generate_answer(self, question, index=None):
+        context = self.build_context(question, index)
+
+        response = self.chain.invoke({
+            "context": context,
+            "question": question
+        })
+
+        return response.content
+
+    def stream_answer(self, question, index=None):
+        context = self.build_context(question, index)
 
-    chain = prompt | llm
+        for chunk in self.chain.stream({"context": context, "question": question}):
+            if chunk.content:
+                yield chunk.content
 
-    response = chain.invoke({
-        "context": context,
-        "question": question
-    })
+    def answer(self, question):
+        """Return (answer, cached, index_version)."""
+        index = self.index
+        answer, hit = self.answer_cache.get_or_compute(question, lambda q: self.generate_answer(q, index))
+        return answer, hit, index.version
 
-    return response.content
+    def stream(self, question, stats=None):
+        """Yield the answer as it is generated; pass a StreamStats to get TTFT and total latency."""
+        index = self.index
+        return timed_stream(
+            self.answer_cache.get_or_stream(question, lambda q: self.stream_answer(q, index)), stats
+        )
+
+
+_app = None
+_app_lock = threading.Lock()
+
+
+def get_app():
+    """The process-wide RagApp, created on first use."""
+    global _app
+    with _app_lock:
+        if _app is None:
+            _app = RagApp()
+    return _app
+
+
+def rag_chain(question):
+    answer, _, _ = get_app().answer(question)
+    return answer
+
+
+def rag_chain_stream(question, stats=None):
+    """Yield the answer as it is generated; pass a StreamStats to get TTFT and total latency."""
+    return get_app().stream(question, stats)
 
 
 # ---------------------------
 # 10. Run
 # ---------------------------
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ask questions about the PDF.")
+    parser.add_argument("--batch", metavar="QUESTIONS_JSONL", help='answer {"id", "question"} lines instead of prompting')
+    parser.add_argument("--out", default="answers.jsonl", help="batch output; re-running resumes from it")
+    parser.add_argument("--concurrency", type=int, default=8, help="max endpoint requests in flight")
+    parser.add_argument("--serve", action="store_true", help="run the HTTP/JSON query server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    app = get_app()
+
+    if args.serve:
+        try:
+            asyncio.run(serve(app, args.host, args.port, SERVER_CONCURRENCY, SERVER_MAX_QUEUE))
+        except KeyboardInterrupt:
+            pass
+        raise SystemExit
+
+    if args.batch:
+        asyncio.run(answer_file(
+            args.batch,
+            args.out,
+            app.index.vectorstore,
+            app.embeddings,
+            app.chain,
+            format_docs,
+            k=3,
+            concurrency=args.concurrency,
+            bm25=app.index.bm25,
+            fetch_k=FUSION_FETCH_K,
+        ))
+        raise SystemExit
+
     print("RAG Ready 🔥\n")
 
     while True:
@@ -102,6 +367,14 @@ if __name__ == "__main__":
         if q.lower() in ["exit", "quit"]:
             break
 
-        ans = rag_chain(q)
-        print("\nAnswer:\n", ans)
+        if STREAM_ANSWERS:
+            stats = StreamStats()
+            print("\nAnswer:")
+            print_stream(app.stream(q), stats)
+            print(f"({stats})")
+        else:
+            ans, _, _ = app.answer(q)
+            print("\nAnswer:\n", ans)
         print("\n" + "-"*50)
+
+    print("Answer cache:", app.answer_cache.stats())
@@ -0,0 +1,116 @@
+import asyncio
+import json
+import os
+import time
+
+import numpy as np
+
+from hybrid_search import reciprocal_rank_fusion
+
+# ---------------------------
+# Batch question answering
+# ---------------------------
+# questions.jsonl -> one batched encoder call -> one batched FAISS search ->
+# generation with at most `concurrency` endpoint requests in flight.
+# Every answer is appended to the output file as soon as it completes, and a
+# restart skips the ids that already have an answer there.
+
+
+def read_questions(path):
+    """Load {"id", "question"} records; the line number is the id when none is given."""
+    questions = []
+    with open(path, encoding="utf-8") as f:
+        for n, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            questions.append({"id": str(record.get("id", n)), "question": record["question"]})
+    return questions
+
+
+def answered_ids(path):
+    """Ids that already have an answer in `path` (errors are retried)."""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # partial last line from an interrupted run
+            if "answer" in record:
+                done.add(record["id"])
+    return done
+
+
+def embed_questions(embeddings, texts):
+    # Batch query embedding; for MiniLM query and document encoding are the same
+    embed = getattr(embeddings, "embed_queries", embeddings.embed_documents)
+    return np.asarray(embed(texts), dtype=np.float32)
+
+
+def retrieve_batch(vectorstore, embeddings, questions, k=3, bm25=None, fetch_k=20):
+    """Top-k documents for every question with one encoder call and one FAISS search.
+
+    With a BM25Index the dense hits (fetch_k per question) are fused with its
+    hits by reciprocal rank.
+    """
+    vectors = embed_questions(embeddings, questions)
+    _, rows = vectorstore.index.search(vectors, fetch_k if bm25 is not None else k)
+    if bm25 is not None:
+        rows = [
+            reciprocal_rank_fusion([row[row >= 0], bm25.search(question, fetch_k)])[:k]
+            for row, question in zip(rows, questions)
+        ]
+    mapping = vectorstore.index_to_docstore_id
+    return [[vectorstore.docstore.search(mapping[int(i)]) for i in row if i >= 0] for row in rows]
+
+
+async def answer_file(
+    in_path, out_path, vectorstore, embeddings, chain, format_context, k=3, concurrency=8, bm25=None, fetch_k=20
+):
+    """Answer every question in `in_path`, appending results to `out_path` as they finish.
+
+    `format_context(docs)` returns (context_text, ContextStats); `bm25` turns on
+    hybrid retrieval (see retrieve_batch).
+    """
+    done = answered_ids(out_path)
+    pending = [q for q in read_questions(in_path) if q["id"] not in done]
+    print(f"{len(done)} already answered, {len(pending)} to go.")
+    if not pending:
+        return
+
+    start = time.perf_counter()
+    questions = [q["question"] for q in pending]
+    contexts = retrieve_batch(vectorstore, embeddings, questions, k=k, bm25=bm25, fetch_k=fetch_k)
+    print(f"Retrieved context for {len(pending)} questions in {time.perf_counter() - start:.1f}s")
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def answer_one(item, docs):
+        async with semaphore:
+            t0 = time.perf_counter()
+            record = {"id": item["id"], "question": item["question"]}
+            context, stats = format_context(docs)
+            record["context_tokens"] = stats.tokens_out
+            record["context_tokens_saved"] = stats.saved
+            try:
+                response = await chain.ainvoke({"context": context, "question": item["question"]})
+                record["answer"] = response.content
+            except Exception as e:
+                record["error"] = repr(e)
+            record["latency_s"] = round(time.perf_counter() - t0, 3)
+            record["sources"] = [doc.metadata for doc in docs]
+            return record
+
+    tasks = [answer_one(item, docs) for item, docs in zip(pending, contexts)]
+    failed = 0
+    with open(out_path, "a", encoding="utf-8") as out:
+        for n, finished in enumerate(asyncio.as_completed(tasks), 1):
+            record = await finished
+            failed += "error" in record
+            out.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+            out.flush()
+            if n % 50 == 0 or n == len(tasks):
+                print(f"{n}/{len(tasks)} done ({failed} failed), {time.perf_counter() - start:.1f}s elapsed")
@@ -0,0 +1,213 @@
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# ---------------------------
+# Long-lived RAG query server
+# ---------------------------
+# A small HTTP/1.1 + JSON server on asyncio streams (no web framework needed):
+#   POST /ask     {"question": "..."}  -> {"answer", "cached", "latency_s", "index_version"}
+#   POST /reload                       -> rebuilds or reloads the index and swaps it in
+#   GET  /health                       -> index version, load and cache stats
+#
+# The app (see rag.RagApp) is built once, so the encoder, index and endpoint
+# client stay warm between requests. Answers run on a thread pool with at most
+# `concurrency` in flight; beyond that up to `max_queue` requests wait, and the
+# rest get 503 straight away instead of piling up.
+# /reload builds the new index in the background while /ask keeps being served
+# from the old one; each request uses the index that was current when it
+# started, so the swap itself is a single reference assignment.
+
+MAX_BODY_BYTES = 1 << 20
+READ_TIMEOUT = 30.0
+
+_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    409: "Conflict",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+    504: "Gateway Timeout",
+}
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+async def read_request(reader):
+    """Parse one request; returns (method, path, headers, body) or None at EOF."""
+    line = await asyncio.wait_for(reader.readline(), READ_TIMEOUT)
+    if not line:
+        return None
+    try:
+        method, path, _ = line.decode("latin-1").split(" ", 2)
+    except ValueError:
+        raise HttpError(400, "malformed request line")
+
+    headers = {}
+    while True:
+        line = await asyncio.wait_for(reader.readline(), READ_TIMEOUT)
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    raw_length = headers.get("content-length", "0") or "0"
+    if not (raw_length.isascii() and raw_length.isdigit()):
+        raise HttpError(400, "invalid Content-Length")
+    length = int(raw_length)
+    if length > MAX_BODY_BYTES:
+        raise HttpError(413, "request body too large")
+    body = await asyncio.wait_for(reader.readexactly(length), READ_TIMEOUT) if length else b""
+    return method.upper(), path.split("?", 1)[0], headers, body
+
+
+def encode_response(status, payload, keep_alive=True):
+    body = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+    head = (
+        f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+        "Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    return head.encode("latin-1") + body
+
+
+async def serve_connection(reader, writer, dispatch):
+    """Answer keep-alive requests on one connection with `await dispatch(method, path, body)`."""
+    try:
+        while True:
+            try:
+                request = await read_request(reader)
+            except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                break
+            except HttpError as e:
+                writer.write(encode_response(e.status, {"error": str(e)}, keep_alive=False))
+                break
+            if request is None:
+                break
+
+            method, path, headers, body = request
+            keep_alive = headers.get("connection", "").lower() != "close"
+            try:
+                status, payload = 200, await dispatch(method, path, body)
+            except HttpError as e:
+                status, payload = e.status, {"error": str(e)}
+            except Exception as e:
+                status, payload = 500, {"error": repr(e)}
+            writer.write(encode_response(status, payload, keep_alive))
+            await writer.drain()
+            if not keep_alive:
+                break
+    finally:
+        writer.close()
+
+
+def parse_json_object(body):
+    try:
+        payload = json.loads(body or b"{}")
+    except json.JSONDecodeError:
+        raise HttpError(400, "body must be JSON")
+    if not isinstance(payload, dict):
+        raise HttpError(400, "body must be a JSON object")
+    return payload
+
+
+class RagServer:
+    def __init__(self, app, concurrency=8, max_queue=64):
+        self.app = app
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.executor = ThreadPoolExecutor(max_workers=concurrency + 1, thread_name_prefix="rag")
+        self.slots = asyncio.Semaphore(concurrency)
+        self.reload_lock = asyncio.Lock()
+        self.in_flight = 0
+        self.waiting = 0
+        self.served = 0
+        self.rejected = 0
+
+    async def ask(self, payload):
+        question = payload.get("question")
+        if not isinstance(question, str) or not question.strip():
+            raise HttpError(400, '"question" must be a non-empty string')
+        if self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise HttpError(503, "server busy, retry later")
+
+        self.waiting += 1
+        try:
+            await self.slots.acquire()
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        try:
+            start = time.perf_counter()
+            loop = asyncio.get_running_loop()
+            answer, cached, version = await loop.run_in_executor(self.executor, self.app.answer, question)
+            self.served += 1
+            return {
+                "answer": answer,
+                "cached": cached,
+                "latency_s": round(time.perf_counter() - start, 3),
+                "index_version": version,
+            }
+        finally:
+            self.in_flight -= 1
+            self.slots.release()
+
+    async def reload(self):
+        if self.reload_lock.locked():
+            raise HttpError(409, "reload already in progress")
+        async with self.reload_lock:
+            start = time.perf_counter()
+            loop = asyncio.get_running_loop()
+            old = self.app.index_version
+            await loop.run_in_executor(self.executor, self.app.reload)
+            return {
+                "previous_version": old,
+                "index_version": self.app.index_version,
+                "changed": old != self.app.index_version,
+                "seconds": round(time.perf_counter() - start, 2),
+            }
+
+    def health(self):
+        return {
+            "status": "reloading" if self.reload_lock.locked() else "ok",
+            "index_version": self.app.index_version,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "served": self.served,
+            "rejected": self.rejected,
+            "answer_cache": self.app.answer_cache.stats(),
+        }
+
+    async def dispatch(self, method, path, body):
+        routes = {"/ask": "POST", "/reload": "POST", "/health": "GET"}
+        if path not in routes:
+            raise HttpError(404, f"no route {path}")
+        if method != routes[path]:
+            raise HttpError(405, f"{path} expects {routes[path]}")
+
+        if path == "/health":
+            return self.health()
+        if path == "/reload":
+            return await self.reload()
+        return await self.ask(parse_json_object(body))
+
+    async def handle(self, reader, writer):
+        await serve_connection(reader, writer, self.dispatch)
+
+
+async def serve(app, host="127.0.0.1", port=8000, concurrency=8, max_queue=64):
+    server = RagServer(app, concurrency=concurrency, max_queue=max_queue)
+    listener = await asyncio.start_server(server.handle, host, port)
+    print(f"RAG server on http://{host}:{port} (concurrency {concurrency}, queue {max_queue})")
+    async with listener:
+        await listener.serve_forever()
@@ -0,0 +1,144 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+# ---------------------------
+# Semantic answer cache
+# ---------------------------
+# Questions are embedded and compared by cosine similarity with the questions
+# already answered; a close enough match returns the stored answer without
+# retrieval or an LLM call. Entries expire after `ttl` seconds, the least
+# recently used one is dropped when the cache is full, and everything is
+# cleared when the index version changes (new documents, new answers).
+#
+# Questions that differ only in a number ("under 2000" vs "under 3000") embed
+# almost identically, so a hit also requires the same numbers in both.
+
+_NUMBERS = re.compile(r"\d+(?:\.\d+)?")
+
+
+def _numbers(text):
+    return sorted(_NUMBERS.findall(text))
+
+
+class SemanticCache:
+    def __init__(self, embeddings, threshold=0.92, ttl=3600, max_entries=1000, index_version=None):
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.index_version = index_version
+
+        self._lock = threading.Lock()
+        self._matrix = None  # max_entries x dim, unit-normalised question vectors
+        self._entries = OrderedDict()  # slot -> entry dict, in LRU order
+        self.hits = 0
+        self.misses = 0
+        self.latency_saved = 0.0
+
+    def _embed(self, question):
+        vector = np.asarray(self.embeddings.embed_query(question), dtype=np.float32)
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    def set_index_version(self, version):
+        """Drop every entry if the index they were answered from has changed."""
+        with self._lock:
+            if version != self.index_version:
+                self._entries.clear()
+                self.index_version = version
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def lookup(self, question, vector=None):
+        """Return the cached answer for a near-duplicate question, or None."""
+        vector = self._embed(question) if vector is None else vector
+        now = time.monotonic()
+        with self._lock:
+            for slot in [s for s, e in self._entries.items() if now - e["created"] > self.ttl]:
+                del self._entries[slot]
+
+            if self._entries:
+                slots = np.fromiter(self._entries, dtype=np.int64)
+                sims = self._matrix[slots] @ vector
+                best = int(np.argmax(sims))
+                slot = int(slots[best])
+                entry = self._entries[slot]
+                if sims[best] >= self.threshold and entry["numbers"] == _numbers(question):
+                    self._entries.move_to_end(slot)
+                    self.hits += 1
+                    self.latency_saved += entry["latency"]
+                    return entry["answer"]
+
+            self.misses += 1
+            return None
+
+    def store(self, question, answer, latency, vector=None):
+        """Remember an answer together with the time it took to produce."""
+        vector = self._embed(question) if vector is None else vector
+        with self._lock:
+            if self._matrix is None:
+                self._matrix = np.zeros((self.max_entries, len(vector)), dtype=np.float32)
+            if len(self._entries) >= self.max_entries:
+                slot, _ = self._entries.popitem(last=False)
+            else:
+                used = set(self._entries)
+                slot = next(s for s in range(self.max_entries) if s not in used)
+            self._matrix[slot] = vector
+            self._entries[slot] = {
+                "question": question,
+                "answer": answer,
+                "numbers": _numbers(question),
+                "latency": latency,
+                "created": time.monotonic(),
+            }
+
+    def get_or_compute(self, question, compute):
+        """Return (answer, hit); on a miss run compute(question) and cache the result."""
+        vector = self._embed(question)
+        version = self.index_version
+        answer = self.lookup(question, vector)
+        if answer is not None:
+            return answer, True
+
+        start = time.perf_counter()
+        answer = compute(question)
+        # Not cached if the index was swapped while the answer was being computed
+        if self.index_version == version:
+            self.store(question, answer, time.perf_counter() - start, vector)
+        return answer, False
+
+    def get_or_stream(self, question, stream):
+        """Generator version of get_or_compute.
+
+        Yields the cached answer in one piece, or the pieces of stream(question)
+        as they arrive, caching the joined answer once the stream completes.
+        """
+        vector = self._embed(question)
+        version = self.index_version
+        answer = self.lookup(question, vector)
+        if answer is not None:
+            yield answer
+            return
+
+        start = time.perf_counter()
+        parts = []
+        for piece in stream(question):
+            parts.append(piece)
+            yield piece
+        if self.index_version == version:
+            self.store(question, "".join(parts), time.perf_counter() - start, vector)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "latency_saved_s": round(self.latency_saved, 2),
+        }
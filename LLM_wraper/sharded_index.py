@@ -0,0 +1,227 @@
+import hashlib
+import heapq
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.retrievers import BaseRetriever
+
+from ann_index import rebuild_vectorstore, set_search_params
+from attribute_index import AttributeIndex, filtered_search_by_vector, parse_filters
+from incremental_index import IncrementalIndex
+from index_cache import load_index
+
+# ---------------------------
+# Sharded catalog index
+# ---------------------------
+# The catalog is split into one IncrementalIndex per Category (or per hash
+# bucket of the unit id), each in its own directory under `root`:
+#   shards.json            shard key -> {dir, version, rows, categories, brands}
+#   <shard dir>/           index.faiss + index.pkl + manifest.json
+# A sync streams every unit to its shard's writer and re-embeds and re-saves
+# only the shards whose products changed; unchanged shards are checked
+# against their manifest.json without opening their index.
+#
+# Shards are opened lazily (memory-mapped, read-only) the first time a query
+# needs them, so memory follows the categories actually asked about. A query
+# is embedded once; a category filter in the question ("kurtas for women")
+# routes it to those shards only, otherwise it fans out to all of them on a
+# thread pool (FAISS releases the GIL), and the per-shard top-k lists are
+# merged by distance.
+
+SHARDS_FILE = "shards.json"
+SHARD_BY = ("category", "hash")
+
+
+def shard_dir_name(key):
+    slug = re.sub(r"[^\w.-]+", "_", key)[:40]
+    return f"{slug}-{hashlib.sha1(key.encode()).hexdigest()[:8]}"
+
+
+class ShardedCatalogIndex:
+    def __init__(self, root, embeddings, shard_by="category", hash_shards=16,
+                 index_mode="flat", nprobe=16, ef_search=64, max_workers=None):
+        if shard_by not in SHARD_BY:
+            raise ValueError(f"shard_by must be one of {SHARD_BY}")
+        self.root = root
+        self.embeddings = embeddings
+        self.shard_by = shard_by
+        self.hash_shards = hash_shards
+        self.index_mode = index_mode
+        self.nprobe = nprobe
+        self.ef_search = ef_search
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers or min(8, os.cpu_count() or 1), thread_name_prefix="shard"
+        )
+
+        self.shards = {}
+        path = os.path.join(root, SHARDS_FILE)
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("shard_by") == shard_by:
+                self.shards = meta["shards"]
+
+        self._loaded = {}  # shard key -> (vectorstore, AttributeIndex)
+        self._load_locks = {}
+        self._lock = threading.Lock()
+
+    # ---- building ----
+
+    def shard_key(self, unit_id, doc):
+        if self.shard_by == "hash":
+            bucket = int(hashlib.sha1(unit_id.encode()).hexdigest(), 16) % self.hash_shards
+            return f"hash-{bucket:03d}"
+        return str(doc.metadata.get("category", "")).strip().lower() or "n/a"
+
+    def sync(self, units, batch_size=256):
+        """Route (unit_id, Document) units to their shards and sync each shard.
+
+        Units are streamed to one IncrementalSync writer per shard, which
+        buffers at most `batch_size` chunks before embedding them. Shards are
+        compared by their manifests only: the index of a shard is opened only
+        when one of its units changed.
+        """
+        writers, attrs = {}, {}
+        for unit_id, doc in units:
+            key = self.shard_key(unit_id, doc)
+            writer = writers.get(key)
+            if writer is None:
+                entry = self.shards.get(key, {"dir": shard_dir_name(key)})
+                shard = IncrementalIndex(os.path.join(self.root, entry["dir"]), self.embeddings)
+                writer = writers[key] = shard.writer(batch_size=batch_size)
+                attrs[key] = (set(), set())
+            writer.add(unit_id, doc)
+            categories, brands = attrs[key]
+            categories.add(str(doc.metadata.get("category", "")).strip().lower())
+            brands.add(str(doc.metadata.get("brand", "")).strip().lower())
+
+        totals = {"added": 0, "modified": 0, "removed": 0, "embedded_chunks": 0, "shards_changed": 0}
+        for key, writer in sorted(writers.items()):
+            stats = writer.close()
+            for name in ("added", "modified", "removed", "embedded_chunks"):
+                totals[name] += stats[name]
+            if writer.changed or key not in self.shards:
+                totals["shards_changed"] += 1
+                self._unload(key)
+            shard = writer.index
+            self.shards[key] = {
+                "dir": os.path.basename(shard.path),
+                "version": shard.version,
+                "rows": shard.rows,
+                "categories": sorted(attrs[key][0]),
+                "brands": sorted(attrs[key][1]),
+            }
+
+        # Categories that disappeared from the catalog take their shard with them
+        for key in [k for k in self.shards if k not in writers]:
+            totals["removed"] += self.shards[key]["rows"]
+            totals["shards_changed"] += 1
+            self._unload(key)
+            shutil.rmtree(os.path.join(self.root, self.shards.pop(key)["dir"]), ignore_errors=True)
+
+        self._save_meta()
+        print(
+            f"Sharded sync: {len(self.shards)} shards ({totals['shards_changed']} changed), "
+            f"+{totals['added']} ~{totals['modified']} -{totals['removed']} units."
+        )
+        return totals
+
+    def _save_meta(self):
+        os.makedirs(self.root, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".json")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"shard_by": self.shard_by, "shards": self.shards}, f)
+        os.replace(tmp, os.path.join(self.root, SHARDS_FILE))
+
+    @property
+    def version(self):
+        h = hashlib.sha256()
+        for key in sorted(self.shards):
+            h.update(f"{key}={self.shards[key]['version']};".encode())
+        return h.hexdigest()[:16]
+
+    # ---- serving ----
+
+    def _unload(self, key):
+        with self._lock:
+            self._loaded.pop(key, None)
+
+    def shard(self, key):
+        """(vectorstore, AttributeIndex) for one shard, opened on first use."""
+        loaded = self._loaded.get(key)
+        if loaded is not None:
+            return loaded
+        with self._lock:
+            lock = self._load_locks.setdefault(key, threading.Lock())
+        with lock:
+            loaded = self._loaded.get(key)
+            if loaded is None:
+                vectorstore = load_index(os.path.join(self.root, self.shards[key]["dir"]), self.embeddings)
+                if self.index_mode != "flat":
+                    vectorstore = rebuild_vectorstore(vectorstore, self.index_mode)
+                set_search_params(vectorstore.index, nprobe=self.nprobe, ef_search=self.ef_search)
+                loaded = (vectorstore, AttributeIndex.from_vectorstore(vectorstore))
+                with self._lock:
+                    self._loaded[key] = loaded
+        return loaded
+
+    @property
+    def loaded_shards(self):
+        return sorted(self._loaded)
+
+    def parse_filters(self, query):
+        brands = {b for entry in self.shards.values() for b in entry["brands"]}
+        categories = {c for entry in self.shards.values() for c in entry["categories"]}
+        return parse_filters(query, brands, categories)
+
+    def route(self, filters):
+        """Shard keys a query with these filters has to search."""
+        wanted = {c.lower() for c in filters.get("category") or []}
+        if not wanted:
+            return sorted(self.shards)
+        return sorted(k for k, entry in self.shards.items() if wanted & set(entry["categories"]))
+
+    def _search_shard(self, key, vector, k, filters):
+        vectorstore, attr_index = self.shard(key)
+        if self.shard_by == "category":
+            filters = dict(filters, category=None)  # the shard is the category filter
+        return filtered_search_by_vector(vectorstore, attr_index, vector, k, filters)
+
+    def search(self, query, k=3, filters=None):
+        if filters is None:
+            filters = self.parse_filters(query)
+        if not self.route(filters):
+            return []
+        vector = np.asarray(self.embeddings.embed_query(query), dtype=np.float32)
+        return self.search_by_vector(vector, k, filters)
+
+    def search_by_vector(self, vector, k=3, filters=None):
+        """Top-k Documents for an already embedded query under `filters`."""
+        filters = filters or {}
+        keys = self.route(filters)
+        if not keys:
+            return []
+        if len(keys) == 1:
+            hits = self._search_shard(keys[0], vector, k, filters)
+        else:
+            futures = [self.executor.submit(self._search_shard, key, vector, k, filters) for key in keys]
+            hits = [hit for future in futures for hit in future.result()]
+        return [doc for _, doc in heapq.nsmallest(k, hits, key=lambda hit: hit[0])]
+
+
+class ShardedRetriever(BaseRetriever):
+    """Retriever over a ShardedCatalogIndex; attribute filters come from the question."""
+
+    index: Any
+    k: int = 3
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun):
+        return self.index.search(query, k=self.k)
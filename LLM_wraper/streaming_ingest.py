@@ -0,0 +1,131 @@
+import os
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from pypdf import PdfReader
+
+from ann_index import empty_vectorstore, rebuild_vectorstore
+
+# ---------------------------
+# Streaming PDF ingestion
+# ---------------------------
+# parse + split (process pool) -> bounded queue -> embed + add (one thread)
+#
+# Worker processes each own a PdfReader and turn a small range of pages into
+# chunks. The main process keeps at most `max_in_flight` page ranges
+# outstanding and packs their chunks into fixed-size batches; the bounded
+# queue stalls the producers whenever embedding falls behind, so memory stays
+# flat no matter how many pages the corpus has.
+#
+# Chunks always go into a flat index, which needs no training. Other index
+# modes are built from it at the end with rebuild_vectorstore, which sizes
+# the IVF lists from the real corpus and keeps small corpora flat.
+
+_readers = {}
+
+
+def _parse_pages(pdf_path, start, stop, splitter):
+    """Worker: extract and split pages [start, stop) of one PDF."""
+    reader = _readers.get(pdf_path)
+    if reader is None:
+        reader = _readers[pdf_path] = PdfReader(pdf_path)
+
+    chunks = []
+    for page_no in range(start, stop):
+        page = Document(
+            page_content=reader.pages[page_no].extract_text() or "",
+            metadata={"source": pdf_path, "page": page_no},
+        )
+        for chunk in splitter.split_documents([page]):
+            chunks.append((chunk.page_content, chunk.metadata))
+    return chunks
+
+
+def _page_ranges(pdf_paths, pages_per_task):
+    for path in pdf_paths:
+        n_pages = len(PdfReader(path).pages)
+        for start in range(0, n_pages, pages_per_task):
+            yield path, start, min(start + pages_per_task, n_pages)
+
+
+def stream_index_pdfs(
+    pdf_paths,
+    embeddings,
+    chunk_size=500,
+    chunk_overlap=50,
+    workers=None,
+    pages_per_task=8,
+    batch_size=64,
+    queue_size=4,
+    vectorstore=None,
+    splitter=None,
+    index_mode="flat",
+):
+    """Parse, split, embed and index PDFs as a stream; returns the vectorstore.
+
+    `splitter` (anything with split_documents, picklable) replaces the default
+    RecursiveCharacterTextSplitter(chunk_size, chunk_overlap). `vectorstore`
+    must not need training; use `index_mode` to get an IVF-PQ / HNSW store.
+    """
+    workers = workers or os.cpu_count() or 1
+    splitter = splitter or RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    max_in_flight = 2 * workers
+    vectorstore = vectorstore or empty_vectorstore(embeddings)
+    if not vectorstore.index.is_trained:
+        raise ValueError("cannot stream into an untrained index; pass index_mode instead")
+
+    batches = queue.Queue(maxsize=queue_size)
+    errors = []
+
+    def embed_loop():
+        while True:
+            batch = batches.get()
+            if batch is None:
+                return
+            if errors:
+                continue  # keep draining so the producer never blocks forever
+            try:
+                texts = [text for text, _ in batch]
+                metadatas = [meta for _, meta in batch]
+                vectors = embeddings.embed_documents(texts)
+                vectorstore.add_embeddings(zip(texts, vectors), metadatas=metadatas)
+            except Exception as e:
+                errors.append(e)
+
+    embedder = threading.Thread(target=embed_loop, name="embed-loop", daemon=True)
+    embedder.start()
+
+    buffer = []
+
+    def collect(future):
+        buffer.extend(future.result())
+        while len(buffer) >= batch_size:
+            batches.put(buffer[:batch_size])
+            del buffer[:batch_size]
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            in_flight = deque()
+            for path, start, stop in _page_ranges(pdf_paths, pages_per_task):
+                if errors:
+                    break
+                in_flight.append(pool.submit(_parse_pages, path, start, stop, splitter))
+                if len(in_flight) >= max_in_flight:
+                    collect(in_flight.popleft())
+            while in_flight:
+                collect(in_flight.popleft())
+        if buffer:
+            batches.put(buffer)
+    finally:
+        batches.put(None)
+        embedder.join()
+
+    if errors:
+        raise errors[0]
+    if index_mode != "flat":
+        vectorstore = rebuild_vectorstore(vectorstore, index_mode)
+    return vectorstore
@@ -0,0 +1,49 @@
+import types
+
+import numpy as np
+from langchain_core.documents import Document
+
+from attribute_index import AttributeIndex
+from mmap_docstore import MmapDocstore, RowIds, write_docstore
+
+METADATAS = [
+    {"brand": "Nike", "category": "Westernwear-Women", "sell_price": 1499.0, "discount": 50.0},
+    {"brand": "Biba", "category": "Indianwear-Women", "sell_price": 849.0},
+    {"brand": "nike ", "category": "Westernwear-Women", "sell_price": 1999.0, "discount": 20.0},
+    {"brand": "Puma", "category": "Footwear-Men", "sell_price": float("nan"), "discount": 10.0},
+    {"category": "Footwear-Men", "sell_price": 2499.0, "discount": 50.0},
+]
+
+
+def mmap_vectorstore(path):
+    write_docstore(path, [Document(page_content=f"row {i}", metadata=m) for i, m in enumerate(METADATAS)])
+    docstore = MmapDocstore(path)
+    return types.SimpleNamespace(
+        docstore=docstore, index=types.SimpleNamespace(ntotal=len(docstore)), index_to_docstore_id=RowIds(len(docstore))
+    )
+
+
+def test_mmap_columns_match_documents_without_decoding(tmp_path, monkeypatch):
+    vectorstore = mmap_vectorstore(str(tmp_path / "docstore"))
+    expected = AttributeIndex.from_metadatas(METADATAS)
+
+    def no_decode(*args):
+        raise AssertionError("a Document was decoded")
+
+    monkeypatch.setattr(MmapDocstore, "search", no_decode)
+    index = AttributeIndex.from_vectorstore(vectorstore)
+
+    for field, lists in expected.inverted.items():
+        assert index.inverted[field].keys() == lists.keys()
+        for value, positions in lists.items():
+            np.testing.assert_array_equal(index.inverted[field][value], positions)
+    for field, (values, order) in expected.sorted.items():
+        np.testing.assert_array_equal(index.sorted[field][0], values)
+        np.testing.assert_array_equal(index.sorted[field][1], order)
+
+
+def test_select_on_mmap_columns(tmp_path):
+    index = AttributeIndex.from_vectorstore(mmap_vectorstore(str(tmp_path / "docstore")))
+    assert index.select({"brand": ["Nike"]}).tolist() == [0, 2]
+    assert index.select({"category": ["footwear-men"], "discount": (20, None)}).tolist() == [4]
+    assert index.select({"sell_price": (None, 2000)}).tolist() == [0, 1, 2]
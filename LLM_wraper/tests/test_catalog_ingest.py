@@ -0,0 +1,36 @@
+import math
+
+import pandas as pd
+import pytest
+
+from attribute_index import parse_filters
+from catalog_ingest import to_number
+
+BRANDS = ["Nike", "Biba"]
+CATEGORIES = ["Westernwear-Women", "Indianwear-Women"]
+
+
+@pytest.mark.parametrize("raw, value", [
+    ("Rs. 1,699", 1699.0),
+    ("Rs\n1699", 1699.0),
+    ("₹ 12,499.50", 12499.5),
+    ("INR 999", 999.0),
+    ("40% off", 40.0),
+    ("1,299", 1299.0),
+])
+def test_to_number_strips_currency_and_separators(raw, value):
+    assert to_number(pd.Series([raw]))[0] == value
+
+
+def test_to_number_without_a_number_is_nan():
+    assert math.isnan(to_number(pd.Series(["n/a"]))[0])
+
+
+@pytest.mark.parametrize("query, price", [
+    ("dresses under 2,000", (None, 2000.0)),
+    ("kurtas above rs. 1,499", (1499.0, None)),
+    ("dresses between 1,000 and 2,500", (1000.0, 2500.0)),
+    ("dresses under 2000", (None, 2000.0)),
+])
+def test_parse_filters_reads_thousands_separators(query, price):
+    assert parse_filters(query, BRANDS, CATEGORIES)["sell_price"] == price
@@ -0,0 +1,37 @@
+import threading
+import time
+
+import numpy as np
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from embedding_cache import CachedEmbeddings
+
+
+def test_batch_larger_than_capacity_keeps_its_tail(tmp_path):
+    cache = CachedEmbeddings(DeterministicFakeEmbedding(size=8), "fake", cache_dir=str(tmp_path), capacity=1000)
+    texts = [f"text {i}" for i in range(1500)]
+    cache.embed_documents(texts)
+
+    cache.hits = cache.misses = 0
+    vectors = cache.embed_documents(texts[-100:])
+    assert cache.hits == 100 and cache.misses == 0
+    assert np.allclose(vectors, DeterministicFakeEmbedding(size=8).embed_documents(texts[-100:]), atol=1e-6)
+
+
+class SlowEmbeddings(DeterministicFakeEmbedding):
+    def embed_documents(self, texts):
+        time.sleep(0.3)
+        return super().embed_documents(texts)
+
+
+def test_hits_are_served_while_another_thread_encodes(tmp_path):
+    cache = CachedEmbeddings(SlowEmbeddings(size=8), "slow", cache_dir=str(tmp_path), capacity=100)
+    cache.embed_documents(["cached"])
+
+    encoding = threading.Thread(target=cache.embed_documents, args=(["not cached yet"],))
+    encoding.start()
+    time.sleep(0.05)
+    start = time.perf_counter()
+    cache.embed_documents(["cached"])
+    assert time.perf_counter() - start < 0.1
+    encoding.join()
@@ -0,0 +1,49 @@
+import threading
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from hybrid_search import BM25Index, HybridRetriever, row_order_key
+from incremental_index import IncrementalIndex
+
+PAGES = {
+    "p0": "Part XJ-77 is the replacement valve for the pump.",
+    "p1": "The gamma walrus chapter covers arctic wildlife.",
+    "p2": "Warranty terms apply for two years from purchase.",
+}
+
+
+def sync(index, pages):
+    index.sync((unit_id, Document(page_content=text)) for unit_id, text in pages.items())
+
+
+def test_bm25_cache_key_follows_row_order(tmp_path):
+    index = IncrementalIndex(str(tmp_path / "idx"), DeterministicFakeEmbedding(size=16))
+    sync(index, PAGES)
+    version, key = index.version, row_order_key(index.vectorstore)
+
+    # Edit a page, then revert it: same content version, rows moved
+    sync(index, dict(PAGES, p0="Part XJ-77 is discontinued."))
+    sync(index, PAGES)
+    assert index.version == version
+    assert row_order_key(index.vectorstore) != key
+
+    bm25 = BM25Index.from_vectorstore(index.vectorstore)
+    store = index.vectorstore
+    top = store.docstore.search(store.index_to_docstore_id[int(bm25.search("XJ-77", k=1)[0])])
+    assert "XJ-77" in top.page_content
+
+
+def test_rebuilt_retrievers_share_one_pool(tmp_path):
+    index = IncrementalIndex(str(tmp_path / "idx"), DeterministicFakeEmbedding(size=16))
+    sync(index, PAGES)
+
+    def hybrid_threads():
+        return sum(t.name.startswith("hybrid") for t in threading.enumerate())
+
+    retrievers = []  # as repeated /reload calls build them; kept alive like in-flight requests would
+    for _ in range(10):
+        retrievers.append(HybridRetriever(vectorstore=index.vectorstore,
+                                          bm25=BM25Index.from_vectorstore(index.vectorstore)))
+        assert retrievers[-1].invoke("XJ-77")
+    assert hybrid_threads() <= 4
@@ -0,0 +1,18 @@
+import pytest
+from langchain_core.documents import Document
+
+from mmap_docstore import MmapDocstore, write_docstore
+
+
+def test_round_trip_and_read_only(tmp_path):
+    docs = [
+        Document(page_content="Red floral dress", metadata={"brand": "Nike", "sell_price": 1499.0, "page": 0}),
+        Document(page_content="Indigo kurta ₹", metadata={"brand": "Biba", "tags": ["cotton"], "page": 1}),
+    ]
+    write_docstore(str(tmp_path), docs)
+    store = MmapDocstore(str(tmp_path))
+
+    assert [store.search(str(i)) for i in range(len(docs))] == docs
+    assert store.search("2") == "ID 2 not found."
+    with pytest.raises(TypeError, match="IncrementalIndex"):
+        store.delete(["0"])
@@ -0,0 +1,68 @@
+import sys
+import types
+
+import pytest
+
+import model_registry
+from model_registry import ModelRegistry
+
+MIB = 2**20
+
+
+class FakeWeight:
+    def __init__(self, nbytes):
+        self.nbytes = nbytes
+
+    def numel(self):
+        return self.nbytes
+
+    def element_size(self):
+        return 1
+
+    def data_ptr(self):
+        return id(self)
+
+
+class FakePipeline:
+    def __init__(self, task, model, mib=1):
+        self.task, self.name = task, model
+        weight = FakeWeight(mib * MIB)
+        self.model = types.SimpleNamespace(state_dict=lambda: {"weight": weight})
+
+
+@pytest.fixture
+def loads(monkeypatch):
+    """Stub transformers.pipeline; returns the list of (task, model) it was asked to load."""
+    calls = []
+
+    def pipeline(task, model=None, **kwargs):
+        calls.append((task, model))
+        return FakePipeline(task, model, **kwargs)
+
+    monkeypatch.setitem(sys.modules, "transformers", types.SimpleNamespace(pipeline=pipeline))
+    return calls
+
+
+def test_preload_from_env_loads_before_first_get(loads, monkeypatch):
+    monkeypatch.setenv("MODEL_REGISTRY_PRELOAD", "text-generation=gpt2, text-classification = sst2")
+    registry = ModelRegistry()
+    registry.preload_from_env()
+    assert loads == [("text-generation", "gpt2"), ("text-classification", "sst2")]
+
+    pipe = registry.get("text-generation", "gpt2")
+    assert pipe.name == "gpt2"
+    assert len(loads) == 2 and registry.loads == 2
+
+
+def test_budget_is_rechecked_on_cache_hits(loads, monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr(model_registry.time, "monotonic", lambda: clock[0])
+    registry = ModelRegistry(memory_budget_mb=1.5, min_idle_seconds=60)
+    registry.get("text-generation", "a")
+    registry.get("text-generation", "b")  # over budget, but "a" has only just been used
+    assert registry.memory_bytes == 2 * MIB and registry.evictions == 0
+
+    clock[0] = 120.0
+    registry.get("text-generation", "b")  # a hit: "a" is idle now and goes
+    assert [m["model"] for m in registry.stats()["models"]] == ["b"]
+    assert registry.evictions == 1 and len(loads) == 2
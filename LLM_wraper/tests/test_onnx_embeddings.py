@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from bench_rag import pdf_corpus
+from onnx_embeddings import load_embeddings
+
+# Parity of the ONNX backends with HuggingFaceEmbeddings; run before switching
+# RAG_EMBEDDING_BACKEND / ECOMMERCE_EMBEDDING_BACKEND
+pytest.importorskip("onnxruntime")
+pytest.importorskip("torch")
+pytest.importorskip("langchain_huggingface")
+
+MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+# Minimum per-text cosine to the PyTorch vectors
+THRESHOLDS = {"onnx": 0.9999, "onnx-int8": 0.98}
+
+
+@pytest.fixture(scope="module")
+def texts():
+    """Short queries up to over-length passages that hit truncation."""
+    pages, questions = pdf_corpus(16, 16)
+    passages = [p.page_content[:length] for p, length in zip(pages, [80, 400, 1500, 4000] * 4)]
+    return [q["question"] for q in questions] + passages
+
+
+def load(backend):
+    try:
+        return load_embeddings(MODEL, backend)
+    except OSError as e:  # model files neither cached nor downloadable
+        pytest.skip(f"{MODEL} not available: {e}")
+
+
+@pytest.fixture(scope="module")
+def reference(texts):
+    return np.asarray(load("torch").embed_documents(texts), dtype=np.float32)
+
+
+@pytest.fixture(scope="module", params=sorted(THRESHOLDS))
+def backend(request):
+    return request.param, load(request.param)
+
+
+def test_cosine_to_torch(backend, texts, reference):
+    name, embeddings = backend
+    vectors = np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+    cosine = (vectors * reference).sum(axis=1) / (
+        np.linalg.norm(vectors, axis=1) * np.linalg.norm(reference, axis=1)
+    )
+    worst = int(np.argmin(cosine))
+    assert cosine[worst] >= THRESHOLDS[name], f"{name}: cosine {cosine[worst]:.5f} for {texts[worst][:60]!r}"
+
+
+def test_single_text_matches_batch(backend, texts):
+    # Length-bucketed batches must not let padding leak into a text's vector
+    _, embeddings = backend
+    batched = np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+    for text, row in zip(texts, batched):
+        np.testing.assert_allclose(embeddings.embed_query(text), row, atol=1e-5)
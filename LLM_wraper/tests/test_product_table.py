@@ -0,0 +1,55 @@
+import pandas as pd
+import pytest
+
+from attribute_index import singularize
+from product_table import ProductTable
+
+ROWS = [
+    ("Nike", "Westernwear-Women", "Red floral dress", 2999, 1499, 50),
+    ("Nike", "Westernwear-Women", "Black bodycon dress", 1999, 1599, 20),
+    ("Zara", "Westernwear-Women", "Blue denim dress", 3999, 1999, 50),
+    ("Puma", "Footwear-Men", "White running shoes", 4999, 2499, 50),
+    ("Puma", "Footwear-Men", "Black training shoe", 3999, 3599, 10),
+    ("Biba", "Indianwear-Women", "Indigo cotton kurta", 1699, 849, 50),
+    ("Biba", "Indianwear-Women", "Green printed kurta", 1299, 1039, 20),
+    ("W", "Indianwear-Women", "Yellow straight kurtas set", 2499, 1749, 30),
+]
+
+
+@pytest.fixture(scope="module")
+def table():
+    frame = pd.DataFrame(ROWS, columns=["brand", "category", "details", "mrp", "sell_price", "discount"])
+    return ProductTable(frame)
+
+
+@pytest.mark.parametrize("plural, singular", [
+    ("dresses", "dress"), ("shoes", "shoe"), ("kurtas", "kurta"), ("watches", "watch"), ("hoodies", "hoodie"),
+])
+def test_singularize_maps_both_forms_together(plural, singular):
+    assert singularize(plural) == singularize(singular)
+
+
+def test_plural_question_matches_singular_details(table):
+    answer = table.answer("cheapest Nike dresses")
+    assert answer is not None
+    assert answer.startswith("2 matching products")
+    assert answer.index("Red floral dress") < answer.index("Black bodycon dress")
+
+
+def test_singular_question_matches_plural_details(table):
+    answer = table.answer("most expensive shoes")
+    assert answer is not None
+    assert answer.startswith("2 matching products")
+    assert answer.splitlines()[1].endswith("| Footwear-Men") and "Black training shoe" in answer.splitlines()[1]
+
+
+def test_how_many(table):
+    assert table.answer("how many kurtas for women") == "3 matching products."
+
+
+def test_top_n_discounts(table):
+    answer = table.answer("top 10 discounts in Westernwear-Women")
+    assert answer is not None
+    lines = answer.splitlines()
+    assert lines[0] == "3 matching products, sorted by discount:"
+    assert "Black bodycon dress" in lines[-1]
@@ -0,0 +1,132 @@
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+from langchain_core.documents import Document
+
+# ---------------------------
+# Token-aware text splitting
+# ---------------------------
+# Chunks are sized in tokens of the embedding model's own tokenizer, so a
+# chunk never runs past the encoder's sequence limit and chunk sizes are
+# comparable across languages and layouts. Each page is tokenized once with
+# character offsets; a window of `chunk_tokens` tokens is cut at the best
+# break (paragraph > sentence > line) in its last third, and consecutive
+# chunks share `overlap_tokens` tokens.
+#
+# Chunk metadata keeps provenance: the source page's metadata plus
+# start_index / end_index (character offsets in the page text) and tokens.
+#
+# Large inputs are split in a process pool; each worker loads the tokenizer
+# once. Without a tokenizer name, words and punctuation marks count as tokens.
+
+_WORD = re.compile(r"\w+|[^\w\s]")
+_tokenizers = {}  # per process: tokenizer name -> tokenizer
+
+# Break priorities between two tokens
+_PARAGRAPH, _SENTENCE, _LINE = 3, 2, 1
+
+
+def _load_tokenizer(name):
+    tokenizer = _tokenizers.get(name)
+    if tokenizer is None:
+        from transformers import AutoTokenizer
+        tokenizer = _tokenizers[name] = AutoTokenizer.from_pretrained(name, use_fast=True)
+    return tokenizer
+
+
+def token_offsets(text, tokenizer_name=None):
+    """(start, end) character span of every token in `text`."""
+    if tokenizer_name is None:
+        return [m.span() for m in _WORD.finditer(text)]
+    tokenizer = _load_tokenizer(tokenizer_name)
+    # The Rust backend has no sequence-length warning and skips tensor building
+    encoding = tokenizer.backend_tokenizer.encode(text, add_special_tokens=False)
+    return [span for span in encoding.offsets if span[1] > span[0]]
+
+
+def _break_priority(text, before_end, after_start):
+    gap = text[before_end:after_start]
+    if "\n\n" in gap:
+        return _PARAGRAPH
+    if gap and text[before_end - 1] in ".!?":
+        return _SENTENCE
+    if "\n" in gap:
+        return _LINE
+    return 0
+
+
+def split_spans(text, offsets, chunk_tokens=128, overlap_tokens=16):
+    """Yield (start_char, end_char, n_tokens) for each chunk of `text`."""
+    n = len(offsets)
+    start = 0
+    while start < n:
+        end = min(start + chunk_tokens, n)
+        if end < n:
+            best, best_priority = end, 0
+            for i in range(end, start + (2 * chunk_tokens) // 3, -1):
+                priority = _break_priority(text, offsets[i - 1][1], offsets[i][0])
+                if priority > best_priority:
+                    best, best_priority = i, priority
+                    if priority == _PARAGRAPH:
+                        break
+            end = best
+        yield offsets[start][0], offsets[end - 1][1], end - start
+        if end >= n:
+            break
+        start = max(end - overlap_tokens, start + 1)
+
+
+def _split_pages(pages, chunk_tokens, overlap_tokens, tokenizer_name):
+    """Worker: split (text, metadata) pages into (text, metadata) chunks."""
+    chunks = []
+    for text, metadata in pages:
+        offsets = token_offsets(text, tokenizer_name)
+        for start, end, n_tokens in split_spans(text, offsets, chunk_tokens, overlap_tokens):
+            chunks.append((
+                text[start:end],
+                dict(metadata, start_index=start, end_index=end, tokens=n_tokens),
+            ))
+    return chunks
+
+
+class TokenTextSplitter:
+    """Drop-in for RecursiveCharacterTextSplitter.split_documents, measured in tokens."""
+
+    def __init__(
+        self,
+        chunk_tokens=128,
+        overlap_tokens=16,
+        tokenizer_name=None,
+        workers=None,
+        min_parallel_chars=200_000,
+        pages_per_task=16,
+    ):
+        if overlap_tokens >= chunk_tokens:
+            raise ValueError("overlap_tokens must be smaller than chunk_tokens")
+        self.chunk_tokens = chunk_tokens
+        self.overlap_tokens = overlap_tokens
+        self.tokenizer_name = tokenizer_name
+        self.workers = workers or os.cpu_count() or 1
+        self.min_parallel_chars = min_parallel_chars
+        self.pages_per_task = pages_per_task
+
+    def split_documents(self, documents):
+        pages = [(doc.page_content, doc.metadata) for doc in documents]
+        args = (self.chunk_tokens, self.overlap_tokens, self.tokenizer_name)
+
+        if self.workers == 1 or sum(len(text) for text, _ in pages) < self.min_parallel_chars:
+            chunks = _split_pages(pages, *args)
+        else:
+            tasks = [pages[i:i + self.pages_per_task] for i in range(0, len(pages), self.pages_per_task)]
+            chunks = []
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(tasks))) as pool:
+                for part in pool.map(_split_pages, tasks, *[[a] * len(tasks) for a in args]):
+                    chunks.extend(part)
+        return [Document(page_content=text, metadata=metadata) for text, metadata in chunks]
+
+    def split_text(self, text):
+        return [doc.page_content for doc in self.split_documents([Document(page_content=text)])]
+
+    def count_tokens(self, text):
+        return len(token_offsets(text, self.tokenizer_name))
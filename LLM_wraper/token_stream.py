@@ -0,0 +1,61 @@
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+# ---------------------------
+# Token streaming helpers
+# ---------------------------
+
+
+@dataclass
+class StreamStats:
+    ttft: Optional[float] = None  # seconds from the request to the first token
+    total: Optional[float] = None  # seconds from the request to the last token
+    chunks: int = 0
+    tokens: Optional[int] = None  # generated tokens, when the producer counts them
+    stop_reason: Optional[str] = None  # why generation ended: "eos", "length", "stop", "deadline", ...
+
+    @property
+    def tokens_per_sec(self):
+        if not self.tokens or not self.total:
+            return None
+        return self.tokens / self.total
+
+    def __str__(self):
+        ttft = f"{self.ttft:.2f}s" if self.ttft is not None else "-"
+        total = f"{self.total:.2f}s" if self.total is not None else "-"
+        text = f"first token {ttft}, total {total}, {self.chunks} chunks"
+        if self.tokens is not None:
+            rate = self.tokens_per_sec
+            text += f", {self.tokens} tokens" + (f" ({rate:.1f} tok/s)" if rate else "")
+        if self.stop_reason:
+            text += f", stopped: {self.stop_reason}"
+        return text
+
+
+def timed_stream(chunks, stats=None):
+    """Yield the text of each streamed chunk, recording time-to-first-token and total latency.
+
+    `chunks` may yield strings or LangChain message chunks (anything with `.content`).
+    """
+    stats = stats if stats is not None else StreamStats()
+    start = time.perf_counter()
+    for chunk in chunks:
+        text = chunk if isinstance(chunk, str) else chunk.content
+        if not text:
+            continue
+        if stats.ttft is None:
+            stats.ttft = time.perf_counter() - start
+        stats.chunks += 1
+        yield text
+    stats.total = time.perf_counter() - start
+
+
+def print_stream(chunks, stats=None):
+    """Print streamed text as it arrives and return the full answer."""
+    parts = []
+    for text in timed_stream(chunks, stats):
+        print(text, end="", flush=True)
+        parts.append(text)
+    print()
+    return "".join(parts)
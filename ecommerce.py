@@ -1,14 +1,24 @@
 import os
-import pandas as pd
+import sys
+import time
 from dotenv import load_dotenv, find_dotenv
 
 # LangChain Imports
-from langchain_huggingface import HuggingFaceEndpoint, ChatHuggingFace, HuggingFaceEmbeddings
-from langchain_community.vectorstores import FAISS
-from langchain_core.documents import Document
+from langchain_huggingface import HuggingFaceEndpoint, ChatHuggingFace
 from langchain.chains import RetrievalQA
 from langchain.prompts import PromptTemplate
 
+# Shared RAG helpers live next to the PDF bot in LLM_wraper/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "LLM_wraper"))
+from catalog_ingest import catalog_units
+from context_builder import ContextAssemblingRetriever
+from embedding_cache import CachedEmbeddings
+from onnx_embeddings import cache_namespace, load_embeddings
+from product_table import ProductTable
+from semantic_cache import SemanticCache
+from sharded_index import ShardedCatalogIndex, ShardedRetriever
+from token_stream import StreamStats, print_stream
+
 # 1. SETUP & CONFIGURATION
 load_dotenv(find_dotenv())
 HUGGINGFACE_API_KEY = os.getenv("HUGGINGFACE_API_KEY")
@@ -17,42 +27,89 @@ if not HUGGINGFACE_API_KEY:
     raise ValueError("HUGGINGFACE_API_KEY not found in environment variables.")
 
 DATASET_PATH = r"C:\Users\Lenovo\Downloads\archive (3)\FashionDataset.csv"
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+# torch (HuggingFaceEmbeddings), onnx or onnx-int8 (see LLM_wraper/onnx_embeddings.py)
+EMBEDDING_BACKEND = os.getenv("ECOMMERCE_EMBEDDING_BACKEND", "torch")
+# The catalog index is kept on disk and synced row by row: only products whose
+# text changed since the last run are re-embedded.
+INDEX_DIR = os.getenv("ECOMMERCE_INDEX_DIR", ".rag_cache/ecommerce")
+# The catalog index is sharded by Category (or by a hash of the product id with
+# ECOMMERCE_SHARD_BY=hash); shards are re-embedded independently and opened
+# only when a question needs them.
+SHARD_BY = os.getenv("ECOMMERCE_SHARD_BY", "category")
+# Serving index mode: flat (exact), hnsw or ivfpq (compressed); see ann_index.py.
+INDEX_MODE = os.getenv("ECOMMERCE_INDEX_MODE", "flat")
+NPROBE = int(os.getenv("ECOMMERCE_NPROBE", "16"))
+EF_SEARCH = int(os.getenv("ECOMMERCE_EF_SEARCH", "64"))
+# Ingestion memory is bounded by these, not by the catalog size.
+CSV_CHUNK_ROWS = 5000
+EMBED_BATCH_SIZE = 256
+# Retrieved products are deduplicated (shared "Brand: … Category: …" fields
+# written once) and packed into this many context tokens
+CONTEXT_TOKEN_BUDGET = int(os.getenv("ECOMMERCE_CONTEXT_TOKENS", "600"))
+# Print answers token by token as the endpoint generates them
+STREAM_ANSWERS = os.getenv("ECOMMERCE_STREAM", "1") == "1"
+# Set ECOMMERCE_ROWS to index only the first N rows (e.g. for a quick demo).
+CATALOG_ROWS = int(os.environ["ECOMMERCE_ROWS"]) if os.getenv("ECOMMERCE_ROWS") else None
+
+def stream_answer(retriever, prompt, llm, query):
+    """Yield the answer to `query` piece by piece as the LLM generates it.
+
+    Same retrieve-then-"stuff" flow as the RetrievalQA chain, but with
+    llm.stream instead of a blocking invoke.
+    """
+    docs = retriever.invoke(query)
+    context = "\n\n".join(doc.page_content for doc in docs)
+    for chunk in (prompt | llm).stream({"context": context, "question": query}):
+        if chunk.content:
+            yield chunk.content
+
 
 def run_rag_bot():
     print("--- Starting E-commerce RAG Bot Pipeline ---")
 
     # 2. LOAD & PREPROCESS DATA
-    print("\n[Step 1/5] Loading and cleaning dataset...")
-    df = pd.read_csv(DATASET_PATH)
-    
-    # We'll take a sample of 1000 products for a quick demonstration.
-    # You can increase this to include the full 50k+ dataset if your machine allows.
-    df_sample = df.sample(n=min(1000, len(df)), random_state=42).fillna("N/A")
-
-    # Convert each row into a single descriptive string (Document)
-    documents = []
-    for _, row in df_sample.iterrows():
-        content = (
-            f"Brand: {row['BrandName']}. "
-            f"Category: {row['Category']}. "
-            f"Product: {row['Deatils']}. "
-            f"Available Sizes: {row['Sizes']}. "
-            f"MRP: {row['MRP']}. "
-            f"Selling Price: {row['SellPrice']}. "
-            f"Discount: {row['Discount']}."
-        )
-        # We store metadata so we can display it if needed
-        doc = Document(page_content=content, metadata={"brand": row['BrandName'], "category": row['Category']})
-        documents.append(doc)
+    # The full catalog is streamed from the CSV in chunks; page_content and
+    # metadata are built column-wise (see LLM_wraper/catalog_ingest.py).
+    print("\n[Step 1/5] Streaming and cleaning dataset...")
+    units = catalog_units(DATASET_PATH, chunksize=CSV_CHUNK_ROWS, nrows=CATALOG_ROWS)
 
     # 3. EMBEDDINGS & VECTOR DATABASE
     print("\n[Step 2/5] Creating local Vector Database (Indexing)...")
-    # Using a small, fast local embedding model
-    embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+    # Using a small, fast local embedding model, behind the on-disk cache
+    # shared with LLM_wraper/rag.py
+    embeddings = CachedEmbeddings(
+        load_embeddings(EMBEDDING_MODEL, EMBEDDING_BACKEND),
+        namespace=cache_namespace(EMBEDDING_MODEL, EMBEDDING_BACKEND),
+    )
     
-    # Build FAISS index (this stays on your local machine)
-    vector_db = FAISS.from_documents(documents, embeddings)
-    print("Vector Database initialized successfully.")
+    # Sync the sharded FAISS index (this stays on your local machine); the
+    # first run embeds everything in bounded batches, later runs only the
+    # added or modified rows, and only the shards they belong to are re-saved.
+    # Vectors from different backends are not mixed in one index.
+    catalog_dir = "catalog-shards" if EMBEDDING_BACKEND == "torch" else f"catalog-shards-{EMBEDDING_BACKEND}"
+    index = ShardedCatalogIndex(
+        os.path.join(INDEX_DIR, catalog_dir),
+        embeddings,
+        shard_by=SHARD_BY,
+        # Shards are synced flat (they need deletes); compressed modes are
+        # derived from each shard when it is opened, without re-embedding.
+        index_mode=INDEX_MODE,
+        nprobe=NPROBE,
+        ef_search=EF_SEARCH,
+    )
+    index.sync(units, batch_size=EMBED_BATCH_SIZE)
+    # Brand / category / price / discount filters parsed from the question
+    # ("Nike dresses under 2000") pick the shards and shrink the candidate set
+    # inside each one before the search.
+    print(f"Vector Database initialized successfully ({len(index.shards)} shards, opened on demand).")
+
+    # Paraphrased questions reuse earlier answers until the catalog changes
+    answer_cache = SemanticCache(embeddings, index_version=f"{index.version}-{INDEX_MODE}")
+
+    # Columnar price table: sort / range / aggregate questions ("cheapest
+    # indigo kurta") are answered exactly from it without the LLM.
+    product_table = ProductTable.from_csv(DATASET_PATH, chunksize=CSV_CHUNK_ROWS, nrows=CATALOG_ROWS)
 
     # 4. LLM SETUP
     print("\n[Step 3/5] Initializing Zephyr Generator (Hugging Face API)...")
@@ -81,10 +138,14 @@ def run_rag_bot():
     rag_prompt = PromptTemplate(template=template, input_variables=["context", "question"])
 
     # Create the RAG chain
+    retriever = ContextAssemblingRetriever(
+        base=ShardedRetriever(index=index, k=3),
+        max_tokens=CONTEXT_TOKEN_BUDGET,
+    )
     qa_chain = RetrievalQA.from_chain_type(
         llm=llm,
         chain_type="stuff",
-        retriever=vector_db.as_retriever(search_kwargs={"k": 3}),
+        retriever=retriever,
         chain_type_kwargs={"prompt": rag_prompt}
     )
 
@@ -98,12 +159,38 @@ def run_rag_bot():
         if query.lower() in ['exit', 'quit']:
             break
         
-        print("Searching and generating answer...")
+        start = time.perf_counter()
+        answer = product_table.answer(query)
+        if answer is not None:
+            elapsed_us = (time.perf_counter() - start) * 1e6
+            print(f"\nBot: {answer}\n(answered from the catalog table in {elapsed_us:.0f} µs)\n")
+            continue
+
+        retriever.last_stats = None
         try:
-            result = qa_chain.invoke(query)
-            print(f"\nBot: {result['result']}\n")
+            if STREAM_ANSWERS:
+                stats = StreamStats()
+                print("\nBot: ", end="", flush=True)
+                print_stream(
+                    answer_cache.get_or_stream(query, lambda q: stream_answer(retriever, rag_prompt, llm, q)),
+                    stats,
+                )
+                print(f"({stats})\n")
+                if retriever.last_stats:
+                    print(f"[{retriever.last_stats}]\n")
+                continue
+
+            print("Searching and generating answer...")
+            answer, hit = answer_cache.get_or_compute(query, lambda q: qa_chain.invoke(q)["result"])
+            print(f"\nBot: {answer}\n")
+            if hit:
+                print("(answered from the semantic cache)\n")
+            elif retriever.last_stats:
+                print(f"[{retriever.last_stats}]\n")
         except Exception as e:
             print(f"\nError: {e}\n")
 
+    print("Answer cache:", answer_cache.stats())
+
 if __name__ == "__main__":
     run_rag_bot()